@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+from build_sqlite_db import create_views, ensure_meta_table, load_table
+from schema import infer_sql_type
+from staging import list_tables
+from statistics_model import migrate_wide
+from synthetic import make_tables, write_tables
+
+# Times the common Power BI joins on the old inferred schema vs the declared schema
+N_FIXTURES = int(os.getenv("BENCH_FIXTURES", "50000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "20"))
+
+
+def build_legacy(db_path, folder):
+    # The previous builder: inferred types, no keys, no indexes
+    conn = sqlite3.connect(db_path)
+    for filename in sorted(os.listdir(folder)):
+        table_name = os.path.splitext(filename)[0]
+        df = pd.read_csv(os.path.join(folder, filename))
+        col_defs = ", ".join(f'"{col}" {infer_sql_type(df[col])}' for col in df.columns)
+        conn.execute(f"CREATE TABLE {table_name} ({col_defs});")
+        df.to_sql(table_name, conn, if_exists="append", index=False)
+    conn.commit()
+    return conn
+
+
+def build_declared(db_path, folder):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        ensure_meta_table(conn.cursor())
+    # Same steps as build_sqlite_db.main: statistics go long, statistics_dim becomes a view
+    migrate_wide(folder)
+    for table_name, path in list_tables(folder).items():
+        load_table(conn, table_name, path)
+    create_views(conn)
+    return conn
+
+
+# Per-stat queries on the long model read statistics_fact directly; the wide
+# statistics_dim view is there for compatibility, not speed
+LONG_FORM = """SELECT t.TeamName,
+                      AVG(CASE WHEN s.ColumnName = 'Ball_Possession' THEN sf.Value END),
+                      SUM(CASE WHEN s.ColumnName = 'Total_Shots' THEN sf.Value END),
+                      SUM(CASE WHEN s.ColumnName = 'expected_goals' THEN sf.Value END)
+               FROM statistics_fact sf
+               JOIN stat_type_dim s ON s.StatTypeID = sf.StatTypeID
+               JOIN fixture_dim f ON f.FixtureID = sf.FixtureID
+               JOIN team_dim t ON t.TeamID = sf.TeamID
+               WHERE f.Season = ? AND sf.TeamID = ?
+               GROUP BY t.TeamID"""
+LONG_RANKING = """SELECT sf.TeamID, AVG(sf.Value) AS shots
+                  FROM statistics_fact sf
+                  WHERE sf.StatTypeID = (SELECT StatTypeID FROM stat_type_dim WHERE ColumnName = 'Total_Shots')
+                  GROUP BY sf.TeamID ORDER BY shots DESC LIMIT 10"""
+
+
+def queries(possession, long=False):
+    return {
+        "match list (league/season)": (
+            """SELECT f.FixtureID, f.Date, h.TeamName, a.TeamName, s.Name
+               FROM fixture_dim f
+               JOIN team_dim h ON h.TeamID = f.HomeTeamID
+               JOIN team_dim a ON a.TeamID = f.AwayTeamID
+               LEFT JOIN stadium_dim s ON s.VenueID = f.VenueID
+               WHERE f.LeagueID = ? AND f.Season = ?""", (3, 2024)),
+        "team season form": (
+            f"""SELECT t.TeamName, AVG({possession}), SUM(st.Total_Shots), SUM(st.expected_goals)
+                FROM statistics_dim st
+                JOIN fixture_dim f ON f.FixtureID = st.FixtureID
+                JOIN team_dim t ON t.TeamID = st.TeamID
+                WHERE f.Season = ? AND st.TeamID = ?
+                GROUP BY t.TeamID""" if not long else LONG_FORM, (2024, 7)),
+        "stat ranking (all teams)": (
+            """SELECT st.TeamID, AVG(st.Total_Shots) AS shots
+               FROM statistics_dim st
+               GROUP BY st.TeamID ORDER BY shots DESC LIMIT 10""" if not long else LONG_RANKING, ()),
+        "one team's fixtures": (
+            """SELECT f.FixtureID, f.Date, f.Status
+               FROM fixture_dim f
+               WHERE f.HomeTeamID = ? OR f.AwayTeamID = ?""", (7, 7)),
+        "fixture stat sheet": (
+            """SELECT t.TeamName, st.*
+               FROM statistics_dim st JOIN team_dim t ON t.TeamID = st.TeamID
+               WHERE st.FixtureID = ?""", (1_000_123,)),
+    }
+
+
+def time_query(conn, sql, params):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "data")
+        write_tables(make_tables(N_FIXTURES), folder)
+
+        legacy = build_legacy(os.path.join(tmp, "legacy.sqlite"), folder)
+        declared = build_declared(os.path.join(tmp, "declared.sqlite"), folder)
+
+        legacy_queries = queries("CAST(REPLACE(st.Ball_Possession, '%', '') AS REAL)")
+        declared_queries = queries("st.Ball_Possession", long=True)
+
+        print(f"\n{N_FIXTURES:,} fixtures, mean of {REPEAT} runs")
+        for name in legacy_queries:
+            before = time_query(legacy, *legacy_queries[name])
+            after = time_query(declared, *declared_queries[name])
+            print(f"{name:<28} before {before:9.3f} ms | after {after:8.3f} ms | {before / after:7.1f}x")
@@ -0,0 +1,197 @@
+import gc
+import os
+import sys
+import time
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+from flatten import pa, to_frame
+from stub_api import PAGE_SIZE, SEASON_FIXTURES, StubData
+
+# Flattening API pages into DataFrames: the per-row loops the fetchers used vs
+# flatten.to_frame with each engine, page by page as the fetchers do it, and the
+# fixtures once more as a single page (one large backfill batch). Payloads come
+# from the stub API at BENCH_SCALE times a season, padded with the fields the real
+# API sends and nobody reads (logos, score breakdowns, player stat blocks), which
+# is most of every entry. Reports wall time and the extra peak RSS over the
+# payloads, and checks every method gives the same frame.
+SCALE = float(os.getenv("BENCH_SCALE", "30"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "3"))
+
+
+# The loops as they were in fetch_fixtures_2.py, fetch_players_2.py,
+# fetch_teams_venues.py and statistics_model.py
+def legacy_fixtures(payload):
+    rows = []
+    for entry in payload.get("response", []):
+        fixture = entry.get("fixture", {})
+        league = entry.get("league", {})
+        teams = entry.get("teams", {})
+        goals = entry.get("goals") or {}
+        rows.append({
+            "FixtureID": fixture.get("id"),
+            "Date": fixture.get("date"),
+            "Timestamp": fixture.get("timestamp"),
+            "VenueID": fixture.get("venue", {}).get("id"),
+            "HomeTeamID": teams.get("home", {}).get("id"),
+            "AwayTeamID": teams.get("away", {}).get("id"),
+            "Status": fixture.get("status", {}).get("short"),
+            "Round": league.get("round"),
+            "LeagueID": league.get("id"),
+            "Season": league.get("season"),
+            "HomeGoals": goals.get("home"),
+            "AwayGoals": goals.get("away")
+        })
+    return pd.DataFrame(rows)
+
+
+def legacy_players(payload):
+    rows = []
+    for entry in payload.get("response", []):
+        player_info = entry.get("player", {})
+        stats = entry.get("statistics")[0] if entry.get("statistics") else {}
+        team_info = stats.get("team", {}) if stats else {}
+        rows.append({
+            "PlayerID": player_info.get("id"),
+            "PlayerName": player_info.get("name"),
+            "TeamID": team_info.get("id"),
+            "Nationality": player_info.get("nationality"),
+            "Position": stats.get("games", {}).get("position") if stats else None,
+            "DateOfBirth": player_info.get("birth", {}).get("date") if player_info.get("birth") else None,
+            "Height": player_info.get("height"),
+            "Weight": player_info.get("weight"),
+        })
+    return pd.DataFrame(rows)
+
+
+def legacy_teams(payload):
+    teams = []
+    for team_entry in payload.get("response", []):
+        team_info = team_entry.get("team", {})
+        teams.append({
+            "TeamID":    team_info.get("id"),
+            "TeamName":  team_info.get("name"),
+            "ShortName": team_info.get("code"),
+            "Country":   team_info.get("country"),
+            "Founded":   team_info.get("founded"),
+            "National":  team_info.get("national")
+        })
+    return pd.DataFrame(teams)
+
+
+def legacy_statistics(payload):
+    records = [dict(entry, fixture_id=fixture_id) for fixture_id, response in payload for entry in response]
+    long = pd.json_normalize(records, record_path="statistics", meta=["fixture_id", ["team", "id"]])
+    return pd.DataFrame({
+        "FixtureID": long["fixture_id"].astype("int64"),
+        "TeamID":    long["team.id"].astype("int64"),
+        "StatType":  long["type"],
+        "Value":     long["value"],
+    })
+
+
+def padded_fixture(entry):
+    entry["fixture"].update(referee="M. Oliver", timezone="UTC", periods={"first": 1, "second": 2},
+                            venue=dict(entry["fixture"]["venue"], name="Stadium", city="City"))
+    entry["fixture"]["status"].update({"long": "Match Finished", "elapsed": 90, "extra": None})
+    entry["league"].update(name="League", country="Country", logo="https://media/league.png", flag=None)
+    for side in ("home", "away"):
+        entry["teams"][side].update(name="Team", logo="https://media/team.png", winner=None)
+    entry["score"] = {period: {"home": 1, "away": 0} for period in ("halftime", "fulltime", "extratime", "penalty")}
+    return entry
+
+
+def padded_player(entry):
+    entry["player"].update(firstname="First", lastname="Last", age=25, injured=False, photo="https://media/p.png",
+                           birth=dict(entry["player"]["birth"], place="City", country="Country"))
+    entry["statistics"][0].update(league={"id": 1, "name": "League", "season": 2025},
+                                  games={"appearences": 30, "lineups": 28, "minutes": 2500, "number": None,
+                                         "position": entry["statistics"][0]["games"]["position"], "rating": "7.1",
+                                         "captain": False},
+                                  shots={"total": 20, "on": 9}, goals={"total": 5, "conceded": 0, "assists": 3},
+                                  passes={"total": 900, "key": 30, "accuracy": 85})
+    entry["statistics"].append(dict(entry["statistics"][0], team={"id": 0}))
+    return entry
+
+
+def pages(data):
+    # Payload pages as the fetchers receive them
+    fixtures = [{"response": [padded_fixture(data.fixture_entry(row)) for row in group.itertuples()]}
+                for group in data.fixtures.values()]
+    players = []
+    for league in data.players:
+        total = 1
+        page = 1
+        while page <= total:
+            response, total = data.players_payload({"league": league, "page": page})
+            players.append({"response": [padded_player(entry) for entry in response]})
+            page += 1
+    teams = [{"response": data.teams_payload({"league": league})} for league in data.teams]
+    statistics = [[(fixture_id, data.statistics_payload({"fixture": fixture_id})) for fixture_id in data.statistics]]
+    one_page = [{"response": [entry for page in fixtures for entry in page["response"]]}]
+    return {"fixture_dim": (fixtures, legacy_fixtures), "fixture_dim, one page": (one_page, legacy_fixtures),
+            "player_dim": (players, legacy_players), "team_dim": (teams, legacy_teams),
+            "fixture_statistics": (statistics, legacy_statistics)}
+
+
+def peak_rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmHWM")) / 1024
+
+
+def current_rss_mb():
+    with open("/proc/self/status") as f:
+        return next(int(line.split()[1]) for line in f if line.startswith("VmRSS")) / 1024
+
+
+def run(flatten_page, name, page_list):
+    # Returns (seconds per run, extra peak MB, concatenated frame)
+    best = float("inf")
+    extra_mb = 0.0
+    for _ in range(REPEAT):
+        gc.collect()
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before = current_rss_mb()
+        start = time.perf_counter()
+        frame = pd.concat([flatten_page(name, page) for page in page_list], ignore_index=True)
+        best = min(best, time.perf_counter() - start)
+        extra_mb = max(extra_mb, peak_rss_mb() - before)
+    return best, extra_mb, frame
+
+
+def same(a, b):
+    # Same values whatever the dtype: the loops give floats where a null hit an int column
+    a = a.astype(object).where(a.notna(), None).sort_values(list(a.columns)).reset_index(drop=True)
+    b = b.astype(object).where(b.notna(), None).sort_values(list(b.columns)).reset_index(drop=True)
+    return a.shape == b.shape and ((a == b) | (a.isna() & b.isna())).all().all()
+
+
+if __name__ == "__main__":
+    data = StubData(scale=SCALE)
+    cases = pages(data)
+
+    def flattener(engine):
+        def flatten_page(case, page):
+            name = case.split(",")[0]
+            if name == "fixture_statistics":
+                entries = [dict(entry, fixture_id=fixture_id) for fixture_id, response in page for entry in response]
+            else:
+                entries = page["response"]
+            return to_frame(name, entries, engine=engine)
+        return flatten_page
+
+    methods = {"per-row loop": lambda case, page: cases[case][1](page)}
+    methods.update({f"to_frame {engine}": flattener(engine)
+                    for engine in ("python", "arrow", "auto") if engine == "python" or pa is not None})
+
+    print(f"\n{int(SEASON_FIXTURES * SCALE):,} fixtures, {PAGE_SIZE}-player pages, best of {REPEAT} runs")
+    for name, (page_list, _) in cases.items():
+        results = {method: run(flatten_page, name, page_list) for method, flatten_page in methods.items()}
+        base_seconds, _, base_frame = results["per-row loop"]
+        print(f"{name} ({len(base_frame):,} rows, {len(page_list)} pages)")
+        for method, (seconds, extra_mb, frame) in results.items():
+            print(f"   {method:<16} {seconds * 1000:9.1f} ms {extra_mb:7.1f} MB peak {base_seconds / seconds:6.1f}x"
+                  f"  {'same' if same(base_frame[frame.columns], frame) else 'DIFFERENT'}")
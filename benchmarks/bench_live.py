@@ -0,0 +1,150 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.join(HERE, "..", "scripts")
+sys.path.insert(0, SCRIPTS)
+from bench_dashboard_joins import build_declared
+from bench_pipeline import run_stage, stage_env
+from build_sqlite_db import refresh_aggregates
+from stub_api import SEASON, SEASON_FIXTURES, StubData, start
+from synthetic import make_tables, write_tables
+
+# A simulated matchday against the stub API, SPEEDUP times faster than real time:
+# MATCHDAY_FIXTURES fixtures of the current season kick off in three waves 15
+# minutes apart and go NS -> 1H -> HT -> 2H -> FT. Keeping the DB current the old
+# way means a full refresh every interval (fixtures for every league/season, then
+# statistics for every finished fixture, then a build); live_matchday.py polls only
+# what is in play. Reports requests per interval and for the whole matchday, and
+# checks the DB ends up with every fixture final, with statistics and aggregates.
+SCALE             = float(os.getenv("BENCH_SCALE", "10"))
+MATCHDAY_FIXTURES = int(os.getenv("MATCHDAY_FIXTURES", "30"))
+SPEEDUP           = float(os.getenv("BENCH_SPEEDUP", "600"))
+# Simulated minutes between polls
+INTERVAL_MINUTES  = float(os.getenv("BENCH_INTERVAL_MINUTES", "5"))
+
+
+def match_status(minute):
+    if minute < 0:
+        return "NS"
+    if minute < 45:
+        return "1H"
+    if minute < 60:
+        return "HT"
+    if minute < 110:
+        return "2H"
+    return "FT"
+
+
+class MatchdayStub(StubData):
+    # Stub whose matchday fixtures are scheduled today and play out on a sped-up clock
+    def __init__(self, scale):
+        super().__init__(scale=scale)
+        self.kickoffs = {}
+
+    def schedule(self, matchday, kickoff_at):
+        # Kick-offs in three waves 15 simulated minutes apart, from kickoff_at
+        wave = 15 * 60 / SPEEDUP
+        self.kickoffs = {fixture_id: kickoff_at + (i % 3) * wave for i, fixture_id in enumerate(matchday)}
+        kickoffs = self.kickoffs
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        rows = self.fixture_rows.index.isin(matchday)
+        self.fixture_rows.loc[rows, "Timestamp"] = self.fixture_rows.index[rows].map(kickoffs).astype("int64")
+        self.fixture_rows.loc[rows, "Date"] = f"{today}T12:00:00+00:00"
+
+    def fixture_entry(self, row):
+        entry = super().fixture_entry(row)
+        kickoff = self.kickoffs.get(entry["fixture"]["id"])
+        if kickoff is not None:
+            minute = (time.time() - kickoff) * SPEEDUP / 60
+            entry["fixture"]["status"]["short"] = match_status(minute)
+            # The score builds up to the final one over 90 minutes
+            progress = min(1.0, max(0.0, minute / 90))
+            entry["goals"] = {side: int(goals * progress) for side, goals in entry["goals"].items()}
+        return entry
+
+
+def matchday_tables():
+    # Staged tables as they stand the morning of the matchday: the matchday
+    # fixtures not started, without statistics
+    tables = make_tables(int(SEASON_FIXTURES * SCALE))
+    fixtures = tables["fixture_dim"]
+    matchday = fixtures[fixtures["Season"] == SEASON].head(MATCHDAY_FIXTURES)["FixtureID"].tolist()
+    fixtures.loc[fixtures["FixtureID"].isin(matchday), "Status"] = "NS"
+    statistics = tables["statistics_dim"]
+    tables["statistics_dim"] = statistics[~statistics["FixtureID"].isin(matchday)]
+    return tables, matchday
+
+
+def full_refresh(server, n_leagues):
+    # One interval of the old way: returns (requests, seconds)
+    with tempfile.TemporaryDirectory() as tmp:
+        env = stage_env(tmp, server, n_leagues)
+        with open(os.devnull, "w") as log:
+            run_stage("fetch_leagues.py", env, tmp, log)
+            requests_before = sum(server.requests.values())
+            start_time = time.perf_counter()
+            for script, extra in [("fetch_fixtures_2.py", {"PARTITION_MAX_AGE_HOURS": "0"}),
+                                  ("fetch_multiple_statistics.py", {"INCREMENTAL": "0"}),
+                                  ("build_sqlite_db.py", {})]:
+                run_stage(script, dict(env, **extra), tmp, log)
+        return sum(server.requests.values()) - requests_before, time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        tables, matchday = matchday_tables()
+        folder = os.path.join(tmp, "data")
+        db_path = os.path.join(tmp, "football_data.sqlite")
+        write_tables(tables, folder)
+        conn = build_declared(db_path, folder)
+        refresh_aggregates(conn)
+        conn.close()
+
+        data = MatchdayStub(SCALE)
+        server = start(data, port=0)
+        try:
+            refresh_requests, refresh_seconds = full_refresh(server, len(data.leagues))
+            data.schedule(matchday, time.time() + 1)
+
+            env = dict(stage_env(tmp, server, len(data.leagues)), **{
+                "DB_NAME": db_path,
+                "SERVE_DB": os.path.join(tmp, "football_data.serve.sqlite"),
+                "LIVE_LEAGUES": "all",
+                "LIVE_POLL_SECONDS": str(INTERVAL_MINUTES * 60 / SPEEDUP),
+            })
+            requests_before = sum(server.requests.values())
+            start_time = time.perf_counter()
+            result = subprocess.run([sys.executable, os.path.join(SCRIPTS, "live_matchday.py")], env=env,
+                                    cwd=tmp, capture_output=True, text=True, timeout=600)
+            live_seconds = time.perf_counter() - start_time
+            live_requests = sum(server.requests.values()) - requests_before
+            if result.returncode != 0:
+                print(result.stdout[-3000:], result.stderr[-3000:])
+                raise SystemExit("live_matchday.py failed")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        polls = [line for line in result.stdout.splitlines() if line.startswith("🔁 Poll")]
+        busiest = max(int(line.split(" requests")[0].rsplit(" ", 1)[1]) for line in polls)
+        conn = sqlite3.connect(db_path)
+        ids = ", ".join(map(str, matchday))
+        final = conn.execute(f"SELECT COUNT(*) FROM fixture_dim WHERE FixtureID IN ({ids}) AND Status = 'FT';").fetchone()[0]
+        with_stats = conn.execute(f"SELECT COUNT(DISTINCT FixtureID) FROM statistics_fact WHERE FixtureID IN ({ids});").fetchone()[0]
+        in_agg = conn.execute(f"SELECT COUNT(DISTINCT FixtureID) FROM team_match WHERE FixtureID IN ({ids});").fetchone()[0]
+        conn.close()
+
+        n_polls = len(polls)
+        print(f"\n{int(SEASON_FIXTURES * SCALE):,} fixtures, {len(data.leagues)} leagues, {MATCHDAY_FIXTURES} playing, "
+              f"{INTERVAL_MINUTES:g}-minute interval ({SPEEDUP:g}x speed)")
+        print(f"full refresh per interval  {refresh_requests:6,} requests {refresh_seconds:7.2f}s  "
+              f"-> {refresh_requests * n_polls:,} requests over the matchday")
+        print(f"live mode, busiest poll    {busiest:6,} requests")
+        print(f"live mode, whole matchday  {live_requests:6,} requests over {n_polls} polls ({live_seconds:.1f}s wall)")
+        print(f"after the matchday: {final}/{len(matchday)} final, {with_stats} with statistics, {in_agg} in team_match")
@@ -0,0 +1,186 @@
+import csv
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.join(HERE, "..", "scripts")
+sys.path.insert(0, SCRIPTS)
+from staging import count_rows, table_path
+from stub_api import SEASON, SEASON_FIXTURES, StubData, load_recordings, start
+
+# End-to-end fetch -> merge -> build -> export run against the stub API, per scale
+# (BENCH_SCALES=1,10,100 times a 380-fixture season). Every stage runs as its own
+# process, like run_pipeline.py runs it, and reports wall time, API requests,
+# rows produced, throughput and peak RSS. BENCH_RESULTS=results.csv appends the
+# numbers tagged with the git revision, to compare versions; stage logs go to
+# BENCH_LOG_DIR if set. The export stage writes to fake_sheets.FakeSpreadsheet,
+# whose in-memory grid counts towards that stage's memory.
+SCALES      = [float(x) for x in os.getenv("BENCH_SCALES", "1,10").split(",")]
+LATENCY_MS  = float(os.getenv("BENCH_LATENCY_MS", "0"))
+RPM         = int(os.getenv("BENCH_RPM", "0"))
+RESULTS     = os.getenv("BENCH_RESULTS")
+LOG_DIR     = os.getenv("BENCH_LOG_DIR")
+RECORDINGS  = os.getenv("STUB_RECORDINGS")
+
+DB = "@db"
+# (stage, script, outputs, extra env)
+STAGES = [
+    ("leagues",      "fetch_leagues.py",             ["league_dim"],                {}),
+    ("teams_venues", "fetch_teams_venues.py",        ["team_dim", "stadium_dim"],   {}),
+    ("players",      "fetch_players_2.py",           ["player_dim"],                {}),
+    ("fixtures",     "fetch_fixtures_2.py",          ["fixture_dim"],               {}),
+    ("statistics",   "fetch_multiple_statistics.py", ["statistics_fact"],           {}),
+    ("build",        "build_sqlite_db.py",           [DB],                          {}),
+    # Same fixtures again: every partition is refetched and upserted into fixture_dim
+    ("fixtures_merge", "fetch_fixtures_2.py",        ["fixture_dim"],               {"PARTITION_MAX_AGE_HOURS": "0"}),
+    ("build_again",  "build_sqlite_db.py",           [DB],                          {}),
+    ("export",       None,                           [DB],                          {}),
+]
+
+# Stages run under this wrapper, which writes the process's peak RSS (VmHWM) to
+# argv[1] on exit. ru_maxrss from wait4 would also count the bench process's own
+# memory, which the child holds between fork and exec.
+STAGE_CODE = f"""
+import atexit, os, resource, runpy, sys
+sys.path[:0] = [{SCRIPTS!r}, {HERE!r}]
+peak_file = sys.argv.pop(1)
+
+def report_peak():
+    try:
+        with open("/proc/self/status") as f:
+            peak_kb = next(int(line.split()[1]) for line in f if line.startswith("VmHWM"))
+    except OSError:
+        peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    with open(peak_file, "w") as f:
+        f.write(str(peak_kb))
+
+atexit.register(report_peak)
+if sys.argv[1:]:
+    sys.argv = sys.argv[1:]
+    runpy.run_path(sys.argv[0], run_name="__main__")
+else:
+    # The exporter, with the fake spreadsheet in place of gspread
+    import export_to_google_sheets
+    from fake_sheets import FakeSpreadsheet
+    export_to_google_sheets.open_spreadsheet = FakeSpreadsheet
+    export_to_google_sheets.main()
+"""
+
+
+def git_revision():
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def stage_env(tmp, server, n_leagues):
+    data = os.path.join(tmp, "data")
+    db_name = os.path.join(tmp, "football_data.sqlite")
+    env = dict(os.environ)
+    env.update({
+        "OUTPUT_DIR": data,
+        "DATA_FOLDER": data,
+        "FIXTURE_FILE": table_path(data, "fixture_dim"),
+        "LEAGUE_FILE": table_path(data, "league_dim"),
+        "DB_NAME": db_name,
+        "DB_FILE": db_name,
+        "API_FOOTBALL_KEY": "bench",
+        "API_FOOTBALL_BASE_URL": server.base_url,
+        "API_CACHE": "0",
+        "API_FOOTBALL_RPM": str(RPM or 1_000_000),
+        "FOOTBALL_SEASON": str(SEASON),
+        "FIXTURE_LEAGUES": "all",
+        "FIXTURE_SEASONS": ",".join(str(season) for season in range(SEASON - 2, SEASON + 1)),
+        "PLAYER_LEAGUES": ",".join(str(league) for league in range(1, n_leagues + 1)),
+        "PLAYER_SEASONS": str(SEASON),
+        "SHEETS_SNAPSHOT_DIR": os.path.join(data, "_sheets_snapshot"),
+        "SHEETS_WRITES_PER_MINUTE": "1000000",
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def output_rows(env, outputs):
+    if outputs == [DB]:
+        conn = sqlite3.connect(env["DB_NAME"])
+        try:
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\';")]
+            return sum(conn.execute(f'SELECT COUNT(*) FROM "{name}";').fetchone()[0] for name in tables)
+        finally:
+            conn.close()
+    return sum(count_rows(table_path(env["OUTPUT_DIR"], name)) for name in outputs)
+
+
+def run_stage(script, env, cwd, log):
+    # Returns (wall seconds, peak RSS in MB, exit code) of the stage's process
+    peak_file = os.path.join(cwd, "_peak_kb")
+    command = [sys.executable, "-c", STAGE_CODE, peak_file] + ([os.path.join(SCRIPTS, script)] if script else [])
+    start_time = time.perf_counter()
+    code = subprocess.run(command, env=env, cwd=cwd, stdout=log, stderr=subprocess.STDOUT).returncode
+    wall = time.perf_counter() - start_time
+    if not os.path.exists(peak_file):
+        return wall, 0.0, code
+    with open(peak_file) as f:
+        peak_kb = int(f.read())
+    os.remove(peak_file)
+    return wall, peak_kb / 1024, code
+
+
+def run_scale(scale, revision):
+    recordings = load_recordings(RECORDINGS) if RECORDINGS else None
+    data = StubData(scale=scale, recordings=recordings)
+    server = start(data, port=0, latency_ms=LATENCY_MS, rpm=RPM)
+    results = []
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = stage_env(tmp, server, len(data.leagues))
+            for stage, script, outputs, extra in STAGES:
+                requests_before, throttled_before = sum(server.requests.values()), server.throttled
+                log_path = os.path.join(LOG_DIR or tmp, f"{scale:g}x_{stage}.log")
+                if LOG_DIR:
+                    os.makedirs(LOG_DIR, exist_ok=True)
+                with open(log_path, "w") as log:
+                    wall, peak_mb, code = run_stage(script, dict(env, **extra), tmp, log)
+                if code != 0:
+                    with open(log_path) as log:
+                        print(log.read()[-3000:])
+                    raise RuntimeError(f"{stage} failed at scale {scale:g}x (exit {code})")
+                rows = output_rows(env, outputs)
+                results.append({
+                    "revision": revision, "scale": f"{scale:g}", "stage": stage,
+                    "wall_s": round(wall, 3), "requests": sum(server.requests.values()) - requests_before,
+                    "throttled": server.throttled - throttled_before,
+                    "rows": rows, "rows_per_s": round(rows / wall), "peak_mb": round(peak_mb, 1),
+                })
+    finally:
+        server.shutdown()
+        server.server_close()
+    return results
+
+
+if __name__ == "__main__":
+    revision = git_revision()
+    all_results = []
+    for scale in SCALES:
+        results = run_scale(scale, revision)
+        all_results += results
+        print(f"\n{scale:g}x season ({int(SEASON_FIXTURES * scale):,} fixtures), {LATENCY_MS:g} ms latency, "
+              f"{RPM or 'unlimited'} rpm, staging {os.getenv('STAGING_FORMAT', 'csv')}, rev {revision}")
+        print(f"{'stage':<16} {'wall s':>8} {'requests':>9} {'429s':>6} {'rows':>10} {'rows/s':>10} {'peak MB':>8}")
+        for row in results:
+            print(f"{row['stage']:<16} {row['wall_s']:8.2f} {row['requests']:9,} {row['throttled']:6,} {row['rows']:10,} "
+                  f"{row['rows_per_s']:10,} {row['peak_mb']:8.1f}")
+        print(f"{'total':<16} {sum(row['wall_s'] for row in results):8.2f}")
+
+    if RESULTS:
+        is_new = not os.path.exists(RESULTS)
+        with open(RESULTS, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(all_results[0]))
+            if is_new:
+                writer.writeheader()
+            writer.writerows(all_results)
+        print(f"\n📁 Appended {len(all_results)} rows to {RESULTS}")
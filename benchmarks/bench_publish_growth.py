@@ -0,0 +1,121 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS = os.path.join(HERE, "..", "scripts")
+sys.path.insert(0, SCRIPTS)
+from build_sqlite_db import create_views, ensure_meta_table, load_table, refresh_aggregates
+from db_snapshot import rebuild_db
+from staging import list_tables
+from statistics_model import migrate_wide
+from synthetic import make_tables, write_tables
+
+# Growth of the publish repo over repeated refreshes: PUBLISH_MODE=binary commits
+# the whole .sqlite every time, PUBLISH_MODE=snapshot commits sorted per-table
+# dumps. Each refresh finishes CHANGED_SHARE of the fixtures; both modes push to
+# local bare repos, which are then gc'd, measured and cloned.
+N_FIXTURES = int(os.getenv("BENCH_FIXTURES", "20000"))
+CHANGED_SHARE = float(os.getenv("BENCH_CHANGED", "0.01"))
+REFRESHES = int(os.getenv("BENCH_REFRESHES", "5"))
+
+
+def build(db_path, folder):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        ensure_meta_table(conn.cursor())
+    migrate_wide(folder)
+    for table_name, path in list_tables(folder).items():
+        load_table(conn, table_name, path)
+    create_views(conn)
+    refresh_aggregates(conn)
+    conn.close()
+
+
+def refresh(db_path, n):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("""
+            UPDATE fixture_dim SET Status = 'FT', HomeGoals = abs(random() % 4), AwayGoals = abs(random() % 4)
+            WHERE FixtureID IN (SELECT FixtureID FROM fixture_dim WHERE Status <> 'FT' ORDER BY random() LIMIT ?)
+        """, (n,))
+    refresh_aggregates(conn)
+    conn.close()
+
+
+def publish(mode, db_path, remote, work):
+    env = dict(os.environ, PUBLISH_MODE=mode, GITHUB_REPO=remote, REPO_PATH=work, DB_FILE=db_path)
+    subprocess.run([sys.executable, os.path.join(SCRIPTS, "github_push_db.py")], env=env, check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def repo_bytes(remote):
+    subprocess.run(["git", "--git-dir", remote, "gc", "-q"], check=True)
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(os.path.join(remote, "objects")) for name in names)
+
+
+def clone_seconds(remote, target):
+    start = time.perf_counter()
+    subprocess.run(["git", "clone", "-q", "-b", "main", remote, target], check=True)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "data")
+        db_path = os.path.join(tmp, "football_data.sqlite")
+        write_tables(make_tables(N_FIXTURES), folder)
+        build(db_path, folder)
+        n_changed = max(1, int(N_FIXTURES * CHANGED_SHARE))
+
+        modes = ["binary", "snapshot"]
+        for mode in modes:
+            subprocess.run(["git", "init", "-q", "--bare", os.path.join(tmp, f"{mode}.git")], check=True)
+
+        growth = {mode: [] for mode in modes}
+        publish_time = {mode: 0.0 for mode in modes}
+        for cycle in range(REFRESHES + 1):
+            if cycle:
+                refresh(db_path, n_changed)
+            for mode in modes:
+                remote = os.path.join(tmp, f"{mode}.git")
+                start = time.perf_counter()
+                publish(mode, db_path, remote, os.path.join(tmp, f"{mode}-work"))
+                publish_time[mode] += time.perf_counter() - start
+                growth[mode].append(repo_bytes(remote))
+        # Publishing an unchanged database must not add a commit
+        for mode in modes:
+            remote = os.path.join(tmp, f"{mode}.git")
+            before = subprocess.run(["git", "--git-dir", remote, "rev-list", "--count", "main"],
+                                    capture_output=True, text=True, check=True).stdout
+            publish(mode, db_path, remote, os.path.join(tmp, f"{mode}-work"))
+            after = subprocess.run(["git", "--git-dir", remote, "rev-list", "--count", "main"],
+                                   capture_output=True, text=True, check=True).stdout
+            assert before == after, f"{mode}: unchanged publish added a commit"
+
+        # The snapshot rebuilds into the same data
+        rebuilt = os.path.join(tmp, "rebuilt.sqlite")
+        clone = os.path.join(tmp, "snapshot-clone")
+        snapshot_clone = clone_seconds(os.path.join(tmp, "snapshot.git"), clone)
+        start = time.perf_counter()
+        rebuild_db(os.path.join(clone, "snapshot"), rebuilt)
+        rebuild_time = time.perf_counter() - start
+        original, copy = sqlite3.connect(db_path), sqlite3.connect(rebuilt)
+        for table in ("fixture_dim", "statistics_fact", "team_season_agg"):
+            query = f'SELECT * FROM "{table}" ORDER BY 1, 2, 3'
+            assert original.execute(query).fetchall() == copy.execute(query).fetchall(), f"{table} differs"
+        binary_clone = clone_seconds(os.path.join(tmp, "binary.git"), os.path.join(tmp, "binary-clone"))
+
+        print(f"\n{N_FIXTURES:,} fixtures, DB {os.path.getsize(db_path) / 1e6:.1f} MB, "
+              f"{REFRESHES} refreshes of {n_changed} fixtures")
+        for mode, clone_time in (("binary", binary_clone), ("snapshot", snapshot_clone)):
+            sizes = growth[mode]
+            per_refresh = (sizes[-1] - sizes[0]) / REFRESHES
+            print(f"{mode:<9} first publish {sizes[0] / 1e6:7.2f} MB | +{per_refresh / 1e3:9.1f} KB per refresh | "
+                  f"after {REFRESHES}: {sizes[-1] / 1e6:7.2f} MB | publish {publish_time[mode]:6.2f}s | "
+                  f"clone {clone_time:5.2f}s")
+        print(f"rebuild from snapshot {rebuild_time:.2f}s")
@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+from bench_dashboard_joins import build_declared, queries
+from build_sqlite_db import finish_load, load_table, refresh_aggregates
+from serving import connect_readonly, optimize, write_snapshot
+from staging import list_tables
+from synthetic import make_tables, write_tables
+
+# Dashboard queries against the built DB opened the default way vs the serving
+# snapshot (ANALYZE'd, VACUUM INTO-compacted, opened immutable with mmap), plus
+# whether a reader gets through while the builder holds its write lock. The DB is
+# built, then rebuilt over slightly changed data so it carries upsert churn.
+N_FIXTURES = int(os.getenv("BENCH_FIXTURES", "50000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "20"))
+DASHBOARD = dict(queries("st.Ball_Possession", long=True), **{
+    "league table (aggregate)": (
+        """SELECT TeamID, Points, GoalsFor - GoalsAgainst AS GoalDiff FROM team_season_agg
+           WHERE LeagueID = ? AND Season = ? ORDER BY Points DESC, GoalDiff DESC""", (3, 2024)),
+})
+
+
+def time_query(conn, sql, params):
+    conn.execute(sql, params).fetchall()
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def reader_gets_through(conn):
+    try:
+        conn.execute("SELECT COUNT(*) FROM fixture_dim;").fetchone()
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "data")
+        db_path = os.path.join(tmp, "football_data.sqlite")
+        serve_path = os.path.join(tmp, "football_data.serve.sqlite")
+        tables = make_tables(N_FIXTURES)
+        write_tables(tables, folder)
+        conn = build_declared(db_path, folder)
+        refresh_aggregates(conn)
+
+        # A later run: a tenth of the fixtures change, so the upsert rewrites pages
+        fixtures = tables["fixture_dim"]
+        changed = fixtures.sample(frac=0.1, random_state=1).index
+        fixtures.loc[changed, "Status"] = "FT"
+        fixtures.loc[changed, "HomeGoals"] += 1
+        fixtures.to_csv(os.path.join(folder, "fixture_dim.csv"), index=False)
+        for table_name, path in list_tables(folder).items():
+            load_table(conn, table_name, path)
+        refresh_aggregates(conn)
+
+        start = time.perf_counter()
+        optimize(conn)
+        finish_load(conn)
+        optimize_time = time.perf_counter() - start
+        start = time.perf_counter()
+        size = write_snapshot(conn, serve_path)
+        snapshot_time = time.perf_counter() - start
+        conn.close()
+
+        # "Before": what consumers did, a plain connection to a DB without statistics
+        plain_path = os.path.join(tmp, "plain.sqlite")
+        source = sqlite3.connect(db_path)
+        source.execute("VACUUM INTO ?;", (plain_path,))
+        source.close()
+        plain = sqlite3.connect(plain_path)
+        plain.execute("DROP TABLE IF EXISTS sqlite_stat1;")
+        plain.execute("DROP TABLE IF EXISTS sqlite_stat4;")
+        plain.commit()
+        serving = connect_readonly(serve_path)
+
+        print(f"\n{N_FIXTURES:,} fixtures, mean of {REPEAT} runs")
+        print(f"ANALYZE + optimize {optimize_time:.2f}s, VACUUM INTO {snapshot_time:.2f}s, "
+              f"DB {os.path.getsize(db_path) / 1e6:.1f} MB -> snapshot {size / 1e6:.1f} MB")
+        for name, (sql, params) in DASHBOARD.items():
+            before = time_query(plain, sql, params)
+            after = time_query(serving, sql, params)
+            print(f"{name:<28} plain {before:9.3f} ms | serving {after:8.3f} ms | {before / after:6.1f}x")
+
+        # The builder mid-write: a plain reader of the DB is locked out, the snapshot is not
+        writer = sqlite3.connect(db_path, isolation_level=None)
+        writer.execute("BEGIN EXCLUSIVE;")
+        writer.execute("DELETE FROM _dirty_fixtures;")
+        blocked_reader = sqlite3.connect(db_path, timeout=0)
+        print(f"reader during a build: DB {'ok' if reader_gets_through(blocked_reader) else 'database is locked'}"
+              f" | snapshot {'ok' if reader_gets_through(connect_readonly(serve_path)) else 'database is locked'}")
+        writer.execute("ROLLBACK;")
@@ -0,0 +1,96 @@
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+# API calls and cells written by a full Sheets export vs a delta export after a
+# typical refresh (some fixtures finish, a few new ones appear), against a fake
+# spreadsheet that also checks every sheet ends up equal to its table. A last run
+# exports in small chunks through flaky writes, dies midway and is resumed.
+N_FIXTURES = int(os.getenv("BENCH_FIXTURES", "5000"))
+CHANGED_SHARE = float(os.getenv("BENCH_CHANGED", "0.01"))
+os.environ.setdefault("SHEETS_WRITES_PER_MINUTE", "600000")
+os.environ.setdefault("SHEETS_BACKOFF", "0.01")
+
+
+def refresh(tables, rng):
+    # Finish CHANGED_SHARE of the fixtures and schedule as many new ones
+    fixtures = tables["fixture_dim"].copy()
+    n = max(1, int(len(fixtures) * CHANGED_SHARE))
+    changed = rng.choice(len(fixtures), n, replace=False)
+    fixtures.loc[changed, "Status"] = "FT"
+    new = fixtures.tail(n).copy()
+    new["FixtureID"] += n
+    new["Status"] = "NS"
+    return dict(tables, fixture_dim=pd.concat([fixtures, new], ignore_index=True))
+
+
+def check(spreadsheet, tables):
+    from export_to_google_sheets import to_values
+
+    # Same header and rows; a delta export keeps each key on its row, so the order may differ
+    for name, df in tables.items():
+        expected = to_values(df)
+        actual = spreadsheet.worksheet(name).get_all_values()
+        width = max(len(row) for row in expected)
+        actual = [row + [""] * (width - len(row)) for row in actual]
+        assert actual[0] == expected[0] and sorted(row for row in actual[1:] if any(row)) == sorted(expected[1:]), \
+            f"{name} differs from its sheet"
+
+
+def run(label, spreadsheet, tables, full, expect_failure=False):
+    from export_to_google_sheets import export
+
+    calls_before, cells_before = sum(spreadsheet.calls.values()), spreadsheet.cells_written
+    start = time.perf_counter()
+    try:
+        export(spreadsheet, tables, full=full)
+        assert not expect_failure, "export should have been interrupted"
+    except RuntimeError:
+        if not expect_failure:
+            raise
+    elapsed = time.perf_counter() - start
+    if not expect_failure:
+        check(spreadsheet, tables)
+    return label, sum(spreadsheet.calls.values()) - calls_before, spreadsheet.cells_written - cells_before, elapsed
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SHEETS_SNAPSHOT_DIR"] = os.path.join(tmp, "snapshot")
+        from fake_sheets import FakeSpreadsheet
+        from synthetic import make_tables
+
+        rng = np.random.default_rng(1)
+        tables = make_tables(N_FIXTURES)
+        refreshed = refresh(tables, rng)
+
+        results = []
+        full_sheet = FakeSpreadsheet()
+        run("initial", full_sheet, tables, full=True)
+        results.append(run("full rewrite", full_sheet, refreshed, full=True))
+
+        delta_sheet = FakeSpreadsheet()
+        run("initial", delta_sheet, tables, full=False)
+        results.append(run("delta", delta_sheet, refreshed, full=False))
+        results.append(run("delta, no change", delta_sheet, refreshed, full=False))
+
+        # Fresh snapshot dir: every table is new, written in 500-row chunks
+        import export_to_google_sheets as exporter
+
+        exporter.SNAPSHOT_DIR = os.path.join(tmp, "snapshot-resume")
+        exporter.CHUNK_ROWS = 500
+        flaky = FakeSpreadsheet(transient_every=5, fail_after=6)
+        results.append(run("interrupted", flaky, tables, full=False, expect_failure=True))
+        flaky.fail_after = None
+        results.append(run("resumed", flaky, tables, full=False))
+
+        print(f"\n{N_FIXTURES:,} fixtures, {CHANGED_SHARE:.0%} changed + {CHANGED_SHARE:.0%} new")
+        for label, calls, cells, elapsed in results:
+            print(f"{label:<18} {calls:5d} API calls {cells:>12,} cells written {elapsed:7.2f}s")
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+
+# Load throughput and peak memory of the old read_csv + to_sql build (no keys,
+# no indexes) vs the streaming chunked loader. Each loader runs in its own process.
+N_FIXTURES = int(os.getenv("BENCH_FIXTURES", "500000"))
+
+
+def load_legacy(folder, db_path):
+    from schema import infer_sql_type
+
+    conn = sqlite3.connect(db_path)
+    for filename in sorted(os.listdir(folder)):
+        table_name = os.path.splitext(filename)[0]
+        df = pd.read_csv(os.path.join(folder, filename))
+        col_defs = ", ".join(f'"{col}" {infer_sql_type(df[col])}' for col in df.columns)
+        conn.execute(f"CREATE TABLE {table_name} ({col_defs});")
+        df.to_sql(table_name, conn, if_exists="append", index=False)
+    conn.commit()
+    conn.close()
+
+
+def load_streaming(folder, db_path):
+    os.environ["DATA_FOLDER"] = folder
+    os.environ["DB_NAME"] = db_path
+    import build_sqlite_db
+
+    build_sqlite_db.main()
+
+
+def peak_rss_mb():
+    # VmHWM is per address space; ru_maxrss would also count the forking parent
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def run_child(mode, folder, db_path):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, __file__, mode, folder, db_path],
+                         check=True, capture_output=True, text=True).stdout
+    elapsed = time.perf_counter() - start
+    return elapsed, float(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__" and len(sys.argv) == 4:
+    mode, folder, db_path = sys.argv[1:]
+    {"legacy": load_legacy, "streaming": load_streaming}[mode](folder, db_path)
+    print(peak_rss_mb())
+elif __name__ == "__main__":
+    from synthetic import make_tables, write_tables
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = os.path.join(tmp, "data")
+        tables = make_tables(N_FIXTURES)
+        total_rows = sum(len(df) for df in tables.values())
+        write_tables(tables, folder)
+        del tables
+
+        results = {}
+        # Legacy first: the streaming build migrates the wide statistics_dim CSV in place
+        for mode in ("legacy", "streaming"):
+            results[mode] = run_child(mode, folder, os.path.join(tmp, f"{mode}.sqlite"))
+
+        print(f"\n{total_rows:,} rows across {len(os.listdir(folder))} CSVs")
+        for mode, (elapsed, peak_mb) in results.items():
+            print(f"{mode:<10} {elapsed:7.2f}s  {total_rows / elapsed:>10,.0f} rows/s  peak RSS {peak_mb:,.0f} MB")
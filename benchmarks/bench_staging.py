@@ -0,0 +1,61 @@
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "..", "scripts"))
+from staging import read_table, table_path, write_table
+from synthetic import make_tables
+
+# Size on disk and read time of CSV vs Parquet staging for the reads the fetchers
+# and builder actually do: the full table, one column, and one season.
+N_FIXTURES = int(os.getenv("BENCH_FIXTURES", "200000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "3"))
+
+
+def size_mb(path):
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names) / 1e6
+    return os.path.getsize(path) / 1e6
+
+
+def best_of(fn):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+if __name__ == "__main__":
+    tables = make_tables(N_FIXTURES)
+    season = int(tables["fixture_dim"]["Season"].max())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        reads = {
+            "fixture_dim": [
+                ("full table",         {}),
+                ("FixtureID only",     {"columns": ["FixtureID"]}),
+                (f"season {season}",   {"filters": [("Season", "=", season)]}),
+                ("one league/season",  {"filters": [("LeagueID", "=", 1), ("Season", "=", season)]}),
+            ],
+            "statistics_dim": [
+                ("full table",         {}),
+                ("FixtureID, TeamID",  {"columns": ["FixtureID", "TeamID"]}),
+            ],
+        }
+
+        for name, cases in reads.items():
+            paths = {fmt: table_path(tmp, name, fmt) for fmt in ("csv", "parquet")}
+            for path in paths.values():
+                write_table(path, tables[name])
+
+            print(f"\n{name}: {len(tables[name]):,} rows, "
+                  f"CSV {size_mb(paths['csv']):.1f} MB vs Parquet {size_mb(paths['parquet']):.1f} MB")
+            for label, kwargs in cases:
+                csv_s = best_of(lambda: read_table(paths["csv"], **kwargs))
+                parquet_s = best_of(lambda: read_table(paths["parquet"], **kwargs))
+                print(f"   {label:<20} CSV {csv_s * 1000:8.1f} ms   Parquet {parquet_s * 1000:8.1f} ms   "
+                      f"{csv_s / parquet_s:5.1f}x")
@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scripts"))
+from upsert import upsert
+
+# Compares the old iterrows/set-of-tuples merge with the vectorized key upsert
+ROWS = [int(n) for n in os.getenv("BENCH_ROWS", "10000,100000,300000").split(",")]
+NEW_FRACTION = 0.1
+
+
+def make_statistics(n, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "FixtureID":       np.repeat(np.arange(n // 2), 2)[:n],
+        "TeamID":          np.tile([1, 2], n // 2 + 1)[:n],
+        "Ball_Possession": rng.integers(20, 80, n).astype(str),
+        "Corner_Kicks":    rng.integers(0, 15, n),
+        "Fouls":           rng.integers(0, 25, n),
+        "Total_Shots":     rng.integers(0, 30, n).astype(float),
+        "expected_goals":  rng.random(n).round(2),
+    })
+
+
+def set_merge(df_existing, df_new):
+    def row_to_tuple(row):
+        return tuple(row[col] if col in row else None for col in sorted(row.keys()))
+
+    new_set = set(row_to_tuple(row) for _, row in df_new.iterrows())
+    existing_set = set(row_to_tuple(row) for _, row in df_existing.iterrows())
+    combined_set = existing_set.union(new_set)
+    all_columns = sorted(df_new.columns)
+    df_combined = pd.DataFrame([dict(zip(all_columns, t)) for t in combined_set], columns=all_columns)
+    return df_combined.sort_values(by=["FixtureID", "TeamID"])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+for n in ROWS:
+    existing = make_statistics(n, seed=1)
+    # Updated copies of the last 10% of rows plus the same number of brand new rows
+    n_new = int(n * NEW_FRACTION)
+    new = make_statistics(n + n_new, seed=2).iloc[n - n_new:]
+
+    old_time, old_df = timed(set_merge, existing, new)
+    new_time, new_df = timed(upsert, existing, new, ["FixtureID", "TeamID"])
+    print(f"{n:>9,} rows | set-of-tuples {old_time:8.3f}s ({len(old_df):,} rows) | "
+          f"upsert {new_time:7.3f}s ({len(new_df):,} rows) | {old_time / new_time:6.1f}x")
@@ -0,0 +1,111 @@
+import re
+import threading
+from collections import Counter
+
+# In-memory stand-in for a gspread Spreadsheet: keeps every worksheet's grid and
+# counts API calls and cells written, so exports can be checked and measured offline.
+# transient_every=N fails every Nth write with a 503; fail_after=N fails every write
+# after the first N with a 400, like a run that dies midway.
+RANGE = re.compile(r"^'((?:[^']|'')*)'!([A-Z]+)(\d+):([A-Z]+)(\d+)$")
+
+
+def column_index(letters):
+    index = 0
+    for char in letters:
+        index = index * 26 + ord(char) - 64
+    return index
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = FakeResponse(status_code)
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, title, rows, cols):
+        self.spreadsheet = spreadsheet
+        self.title = title
+        self.row_count = rows
+        self.col_count = cols
+        self.cells = {}
+
+    def clear(self):
+        self.spreadsheet.calls["clear"] += 1
+        self.cells.clear()
+
+    def resize(self, rows=None, cols=None):
+        self.spreadsheet.calls["resize"] += 1
+        self.row_count = rows or self.row_count
+        self.col_count = cols or self.col_count
+
+    def get_all_values(self):
+        if not self.cells:
+            return []
+        rows = max(row for row, _ in self.cells) + 1
+        cols = max(col for _, col in self.cells) + 1
+        grid = [[self.cells.get((row, col), "") for col in range(cols)] for row in range(rows)]
+        # Like the Sheets API, trailing empty rows and columns are not returned
+        while grid and not any(grid[-1]):
+            grid.pop()
+        width = max((max((i + 1 for i, v in enumerate(row) if v), default=0) for row in grid), default=0)
+        return [row[:width] for row in grid]
+
+
+class FakeSpreadsheet:
+    def __init__(self, titles=("Sheet1",), transient_every=None, fail_after=None):
+        self.calls = Counter()
+        self.cells_written = 0
+        self.transient_every = transient_every
+        self.fail_after = fail_after
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._worksheets = [FakeWorksheet(self, title, 1000, 26) for title in titles]
+
+    def worksheets(self):
+        self.calls["worksheets"] += 1
+        return list(self._worksheets)
+
+    def add_worksheet(self, title, rows, cols):
+        self.calls["add_worksheet"] += 1
+        if any(ws.title == title for ws in self._worksheets):
+            raise ValueError(f"A sheet with the name {title!r} already exists")
+        ws = FakeWorksheet(self, title, rows, cols)
+        self._worksheets.append(ws)
+        return ws
+
+    def del_worksheet(self, worksheet):
+        self.calls["del_worksheet"] += 1
+        self._worksheets.remove(worksheet)
+
+    def worksheet(self, title):
+        return next(ws for ws in self._worksheets if ws.title == title)
+
+    def values_batch_update(self, body):
+        with self._lock:
+            return self._values_batch_update(body)
+
+    def _values_batch_update(self, body):
+        self.calls["values_batch_update"] += 1
+        self._writes += 1
+        if self.transient_every and self._writes % self.transient_every == 0:
+            raise FakeAPIError(503)
+        if self.fail_after is not None and self._writes > self.fail_after:
+            raise FakeAPIError(400)
+        sheets = {ws.title: ws for ws in self._worksheets}
+        for item in body["data"]:
+            title, first_col, first_row, last_col, last_row = RANGE.match(item["range"]).groups()
+            ws = sheets[title.replace("''", "'")]
+            first_row, first_col = int(first_row) - 1, column_index(first_col) - 1
+            if int(last_row) > ws.row_count or column_index(last_col) > ws.col_count:
+                raise ValueError(f"Range {item['range']} exceeds grid limits of {ws.title}")
+            for r, row in enumerate(item["values"]):
+                for c, value in enumerate(row):
+                    ws.cells[(first_row + r, first_col + c)] = value
+                self.cells_written += len(row)
+        return {"totalUpdatedCells": sum(len(row) for item in body["data"] for row in item["values"])}
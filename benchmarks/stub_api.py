@@ -0,0 +1,257 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic import make_tables
+
+# Local stand-in for API-Football v3 serving /leagues, /teams, /players, /fixtures
+# and /fixtures/statistics, so fetchers can run and be timed without a key.
+# Responses are replayed from a response cache recorded by a real run
+# (STUB_RECORDINGS=.cache/api_responses.sqlite) when one matches the request and
+# synthesized from synthetic.make_tables otherwise. STUB_SCALE multiplies a
+# 380-fixture season; STUB_LATENCY_MS delays every response, STUB_RPM answers
+# 429s above that rate and STUB_QUOTA counts down x-ratelimit-requests-remaining.
+# /fixtures?date=YYYY-MM-DD lists one day's fixtures across all leagues.
+# /fixtures?ids=a-b-c (at most 20 ids) embeds each fixture's statistics like the
+# real API; STUB_BATCH_DROP_EVERY=n leaves every nth id out of those answers, to
+# exercise the per-fixture fallback.
+SEASON_FIXTURES = 380
+MAX_IDS = 20
+PAGE_SIZE = 20
+SEASON = 2025
+
+PORT         = int(os.getenv("STUB_PORT", "8768"))
+SCALE        = float(os.getenv("STUB_SCALE", "1"))
+LATENCY_MS   = float(os.getenv("STUB_LATENCY_MS", "0"))
+RPM          = int(os.getenv("STUB_RPM", "0"))
+QUOTA        = int(os.getenv("STUB_QUOTA", "1000000"))
+RECORDINGS   = os.getenv("STUB_RECORDINGS")
+BATCH_DROP_EVERY = int(os.getenv("STUB_BATCH_DROP_EVERY", "0"))
+
+
+def request_key(endpoint, params):
+    return endpoint.strip("/"), tuple(sorted((str(k), str(v)) for k, v in params.items()))
+
+
+def load_recordings(path):
+    # ResponseCache rows -> {(endpoint, params): payload}
+    conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT endpoint, params, body FROM responses;").fetchall()
+    finally:
+        conn.close()
+    return {request_key(endpoint, json.loads(params)): json.loads(zlib.decompress(body))
+            for endpoint, params, body in rows}
+
+
+def integer(value):
+    return None if value != value else int(value)
+
+
+class StubData:
+    def __init__(self, scale=SCALE, seed=0, recordings=None, batch_drop_every=BATCH_DROP_EVERY):
+        tables = make_tables(int(SEASON_FIXTURES * scale), seed=seed)
+        self.recordings = recordings or {}
+        self.batch_drop_every = batch_drop_every
+        self.leagues = tables["league_dim"]
+        n_leagues = len(self.leagues)
+
+        teams = tables["team_dim"].merge(
+            tables["stadium_dim"].assign(TeamID=tables["stadium_dim"]["VenueID"] - 10_000), on="TeamID")
+        teams["LeagueID"] = (teams["TeamID"] - 1) % n_leagues + 1
+        self.teams = {league: group for league, group in teams.groupby("LeagueID")}
+
+        players = tables["player_dim"]
+        players = players.assign(LeagueID=(players["TeamID"] - 1) % n_leagues + 1)
+        self.players = {league: group for league, group in players.groupby("LeagueID")}
+
+        fixtures = tables["fixture_dim"]
+        self.fixtures = {key: group for key, group in fixtures.groupby(["LeagueID", "Season"])}
+        self.fixture_rows = fixtures.set_index("FixtureID", drop=False)
+
+        statistics = tables["statistics_dim"]
+        self.stat_columns = [col for col in statistics.columns if col not in ("FixtureID", "TeamID")]
+        self.statistics = {fixture_id: group for fixture_id, group in statistics.groupby("FixtureID")}
+
+    def leagues_payload(self, params):
+        return [{"league": {"id": int(row.LeagueID), "name": row.LeagueName}, "seasons": [{"year": SEASON}]}
+                for row in self.leagues.itertuples()]
+
+    def teams_payload(self, params):
+        teams = self.teams.get(int(params["league"]))
+        if teams is None:
+            return []
+        return [{
+            "team": {"id": int(row.TeamID), "name": row.TeamName, "code": row.ShortName, "country": row.Country,
+                     "founded": integer(row.Founded), "national": bool(row.National)},
+            "venue": {"id": int(row.VenueID), "name": row.Name, "city": row.City, "capacity": int(row.Capacity),
+                      "surface": row.Surface, "address": row.Address},
+        } for row in teams.itertuples()]
+
+    def players_payload(self, params):
+        players = self.players.get(int(params["league"]))
+        if players is None:
+            return [], 1
+        page = int(params.get("page", 1))
+        total = max(1, -(-len(players) // PAGE_SIZE))
+        chunk = players.iloc[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+        # Earlier seasons were spent at another club: TeamID + 1000 per season back
+        moved = 1000 * max(0, SEASON - int(params.get("season", SEASON)))
+        return [{
+            "player": {"id": int(row.PlayerID), "name": row.PlayerName, "nationality": row.Nationality,
+                       "birth": {"date": row.DateOfBirth}, "height": row.Height, "weight": row.Weight},
+            "statistics": [{"team": {"id": int(row.TeamID) + moved}, "games": {"position": row.Position}}],
+        } for row in chunk.itertuples()], total
+
+    def fixtures_payload(self, params):
+        if "ids" in params:
+            return self.fixtures_by_ids_payload(params)
+        if "date" in params:
+            rows = self.fixture_rows[self.fixture_rows["Date"].str.startswith(params["date"])]
+            return [self.fixture_entry(row) for row in rows.itertuples()]
+        fixtures = self.fixtures.get((int(params["league"]), int(params["season"])))
+        if fixtures is None:
+            return []
+        return [self.fixture_entry(row) for row in fixtures.itertuples()]
+
+    def fixtures_by_ids_payload(self, params):
+        ids = [int(x) for x in params["ids"].split("-")]
+        if self.batch_drop_every:
+            ids = [fixture_id for i, fixture_id in enumerate(ids, 1) if i % self.batch_drop_every]
+        rows = self.fixture_rows[self.fixture_rows.index.isin(ids)]
+        return [dict(self.fixture_entry(row), statistics=self.statistics_payload({"fixture": row.FixtureID}))
+                for row in rows.itertuples()]
+
+    def fixture_entry(self, row):
+        return {
+            "fixture": {"id": int(row.FixtureID), "date": row.Date, "timestamp": int(row.Timestamp),
+                        "venue": {"id": integer(row.VenueID)}, "status": {"short": row.Status}},
+            "league": {"id": int(row.LeagueID), "season": int(row.Season), "round": row.Round},
+            "teams": {"home": {"id": int(row.HomeTeamID)}, "away": {"id": int(row.AwayTeamID)}},
+            "goals": {"home": int(row.HomeGoals), "away": int(row.AwayGoals)},
+        }
+
+    def statistics_payload(self, params):
+        statistics = self.statistics.get(int(params["fixture"]))
+        if statistics is None:
+            return []
+        return [{
+            "team": {"id": int(row["TeamID"])},
+            "statistics": [{"type": col.replace("Percent", "%").replace("_", " "), "value": row[col]}
+                           for col in self.stat_columns],
+        } for row in statistics.to_dict("records")]
+
+    def payload(self, endpoint, params):
+        # None for an endpoint the stub does not serve
+        recorded = self.recordings.get(request_key(endpoint, params))
+        if recorded is not None:
+            return recorded
+        paging = {"current": int(params.get("page", 1)), "total": 1}
+        if endpoint == "leagues":
+            response = self.leagues_payload(params)
+        elif endpoint == "teams":
+            response = self.teams_payload(params)
+        elif endpoint == "players":
+            response, paging["total"] = self.players_payload(params)
+        elif endpoint == "fixtures":
+            if len(params.get("ids", "").split("-")) > MAX_IDS:
+                return {"get": endpoint, "parameters": params, "results": 0, "paging": paging, "response": [],
+                        "errors": {"ids": f"Maximum of {MAX_IDS} ids allowed."}}
+            response = self.fixtures_payload(params)
+        elif endpoint == "fixtures/statistics":
+            response = self.statistics_payload(params)
+        else:
+            return None
+        return {"get": endpoint, "parameters": params, "errors": [], "results": len(response),
+                "paging": paging, "response": response}
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, data, port=PORT, latency_ms=LATENCY_MS, rpm=RPM, quota=QUOTA):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.data = data
+        self.latency = latency_ms / 1000
+        self.rpm = rpm
+        self.remaining = quota
+        self.requests = Counter()
+        self.throttled = 0
+        self.bytes_sent = 0
+        self._window = []
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v3"
+
+    def admit(self):
+        # Sliding one-minute window; False means answer 429
+        with self._lock:
+            now = time.monotonic()
+            if self.rpm:
+                self._window = [t for t in self._window if now - t < 60]
+                if len(self._window) >= self.rpm:
+                    self.throttled += 1
+                    return False
+                self._window.append(now)
+            self.remaining = max(0, self.remaining - 1)
+            return True
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("x-ratelimit-requests-remaining", str(self.server.remaining))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        with self.server._lock:
+            self.server.bytes_sent += len(data)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        endpoint = url.path.split("/v3/", 1)[-1].strip("/")
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if not self.server.admit():
+            self.send_json(429, {"message": "Too many requests"}, [("Retry-After", "1")])
+            return
+        body = self.server.data.payload(endpoint, params)
+        if body is None:
+            self.send_json(404, {"message": f"Unknown endpoint {endpoint}"})
+            return
+        with self.server._lock:
+            self.server.requests[endpoint] += 1
+        self.send_json(200, body)
+
+
+def start(data, **kwargs):
+    # Serve from a daemon thread; returns the server (port=0 picks a free port)
+    server = StubServer(data, **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    data = StubData(recordings=load_recordings(RECORDINGS) if RECORDINGS else None)
+    server = StubServer(data)
+    print(f"Stub API-Football at {server.base_url} (scale {SCALE:g}, {LATENCY_MS:g} ms latency, "
+          f"{RPM or 'unlimited'} rpm, {len(data.recordings)} recorded responses)")
+    server.serve_forever()
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Synthetic tables shaped like the fetcher CSVs (same columns, same "55%" / "180 cm"
+# strings), scaled by number of fixtures. A real league season is ~300-400 fixtures.
+STAT_COLUMNS = [
+    "Ball_Possession", "Blocked_Shots", "Corner_Kicks", "Fouls", "Goalkeeper_Saves", "Offsides",
+    "Passes_Percent", "Passes_accurate", "Red_Cards", "Shots_insidebox", "Shots_off_Goal",
+    "Shots_on_Goal", "Shots_outsidebox", "Total_Shots", "Total_passes", "Yellow_Cards",
+    "expected_goals", "goals_prevented",
+]
+
+
+def make_tables(n_fixtures, n_teams=None, seed=0):
+    rng = np.random.default_rng(seed)
+    n_teams = n_teams or max(20, n_fixtures // 20)
+    n_leagues = max(1, n_teams // 20)
+
+    team_ids = np.arange(1, n_teams + 1)
+    teams = pd.DataFrame({
+        "TeamID":    team_ids,
+        "TeamName":  [f"Team {i}" for i in team_ids],
+        "ShortName": [f"T{i:03d}"[:3] for i in team_ids],
+        "Country":   rng.choice(["England", "Spain", "Italy", "Germany", "France"], n_teams),
+        "Founded":   rng.integers(1860, 2010, n_teams).astype(float),
+        "National":  False,
+    })
+    teams["UUID"] = teams["Country"] + "_" + teams["TeamID"].astype(str)
+
+    venues = pd.DataFrame({
+        "VenueID":  team_ids + 10_000,
+        "Name":     [f"Stadium {i}" for i in team_ids],
+        "City":     [f"City {i % 97}" for i in team_ids],
+        "Capacity": rng.integers(2_000, 90_000, n_teams),
+        "Surface":  "grass",
+        "Address":  [f"{i} Main Street" for i in team_ids],
+    })
+
+    home = rng.integers(1, n_teams + 1, n_fixtures)
+    away = (home + rng.integers(1, n_teams, n_fixtures) - 1) % n_teams + 1
+    timestamps = 1_700_000_000 + np.sort(rng.integers(0, 3 * 365 * 86_400, n_fixtures))
+    fixture_ids = np.arange(1_000_000, 1_000_000 + n_fixtures)
+    fixtures = pd.DataFrame({
+        "FixtureID":  fixture_ids,
+        "Date":       pd.to_datetime(timestamps, unit="s", utc=True).strftime("%Y-%m-%dT%H:%M:%S+00:00"),
+        "Timestamp":  timestamps,
+        "VenueID":    (home + 10_000).astype(float),
+        "HomeTeamID": home,
+        "AwayTeamID": away,
+        "Status":     rng.choice(["FT", "FT", "FT", "FT", "NS", "PST"], n_fixtures),
+        "Round":      [f"Regular Season - {r}" for r in rng.integers(1, 39, n_fixtures)],
+        "LeagueID":   (home - 1) % n_leagues + 1,
+        "Season":     2023 + (timestamps - timestamps.min()) // (365 * 86_400),
+        "HomeGoals":  rng.poisson(1.5, n_fixtures),
+        "AwayGoals":  rng.poisson(1.2, n_fixtures),
+    })
+
+    n_stats = 2 * n_fixtures
+    possession = rng.integers(25, 76, n_fixtures)
+    statistics = pd.DataFrame({
+        "FixtureID": np.repeat(fixture_ids, 2),
+        "TeamID":    np.column_stack([home, away]).ravel(),
+    })
+    for col in STAT_COLUMNS:
+        statistics[col] = rng.integers(0, 30, n_stats).astype(float)
+    statistics["Ball_Possession"] = pd.Series(np.column_stack([possession, 100 - possession]).ravel()).astype(str) + "%"
+    statistics["Passes_Percent"] = pd.Series(rng.integers(60, 95, n_stats)).astype(str) + "%"
+    statistics["expected_goals"] = rng.random(n_stats).round(2) * 3
+    statistics = statistics[sorted(statistics.columns)]
+
+    n_players = n_teams * 25
+    players = pd.DataFrame({
+        "PlayerID":    np.arange(1, n_players + 1),
+        "PlayerName":  [f"P. Player{i}" for i in range(n_players)],
+        "TeamID":      np.repeat(team_ids, 25),
+        "Nationality": rng.choice(["England", "Spain", "Brazil", "France"], n_players),
+        "Position":    rng.choice(["Goalkeeper", "Defender", "Midfielder", "Attacker"], n_players),
+        "DateOfBirth": "1995-01-01",
+        "Height":      pd.Series(rng.integers(165, 200, n_players)).astype(str) + " cm",
+        "Weight":      pd.Series(rng.integers(60, 95, n_players)).astype(str) + " kg",
+    })
+
+    leagues = pd.DataFrame({
+        "LeagueID":   np.arange(1, n_leagues + 1),
+        "LeagueName": [f"League {i}" for i in range(1, n_leagues + 1)],
+        "Season":     2025,
+    })
+
+    return {
+        "fixture_dim": fixtures,
+        "team_dim": teams,
+        "stadium_dim": venues,
+        "statistics_dim": statistics,
+        "player_dim": players,
+        "league_dim": leagues,
+    }
+
+
+def write_tables(tables, folder):
+    os.makedirs(folder, exist_ok=True)
+    for name, df in tables.items():
+        df.to_csv(os.path.join(folder, f"{name}.csv"), index=False)
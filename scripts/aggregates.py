@@ -0,0 +1,183 @@
+import hashlib
+
+# Summary tables materialized at the end of every build, so dashboards read a few
+# hundred pre-aggregated rows instead of scanning fixture_dim and statistics_fact.
+#   team_match        - one row per finished fixture and side, with that side's
+#                       goals and key stats next to its opponent's
+#   AGGREGATES        - GROUP BYs over team_match
+# Triggers on the TRACKED_TABLES log every fixture an upsert touches (or a build
+# deletes) into DIRTY_TABLE; the next build recomputes only the groups those
+# fixtures belong to.
+FINISHED_STATUSES = ("FT", "AET", "PEN")
+TEAM_MATCH = "team_match"
+DIRTY_TABLE = "_dirty_fixtures"
+TRACKED_TABLES = ("fixture_dim", "statistics_fact")
+
+# team_match column -> stat_type_dim.ColumnName
+MATCH_STATS = {
+    "Possession":  "Ball_Possession",
+    "XG":          "expected_goals",
+    "Shots":       "Total_Shots",
+    "ShotsOnGoal": "Shots_on_Goal",
+}
+
+# Columns a fixture_dim update or delete logs from the OLD row: the groups it used to count in
+GROUP_COLUMNS = ["LeagueID", "Season", "VenueID", "HomeTeamID", "AwayTeamID"]
+
+# Fixture filter used by incremental refreshes
+DIRTY_FIXTURES = f'(SELECT FixtureID FROM "{DIRTY_TABLE}")'
+
+
+def team_match_sql(only_dirty=False):
+    # SELECT producing team_match rows, for every fixture or just the dirty ones
+    only = f"AND {{alias}}.FixtureID IN {DIRTY_FIXTURES}" if only_dirty else ""
+    pivots = ",\n               ".join(
+        f"MAX(CASE WHEN st.ColumnName = '{name}' THEN sf.Value END) AS {col}" for col, name in MATCH_STATS.items()
+    )
+    names = ", ".join(f"'{name}'" for name in MATCH_STATS.values())
+    statuses = ", ".join(f"'{status}'" for status in FINISHED_STATUSES)
+    sides = "\n        UNION ALL\n".join(
+        f"""        SELECT f.FixtureID, f.LeagueID, f.Season, f.Round, f.VenueID,
+               f.{team}TeamID AS TeamID, f.{opponent}TeamID AS OpponentID, {is_home} AS IsHome,
+               f.{team}Goals AS GoalsFor, f.{opponent}Goals AS GoalsAgainst
+        FROM fixture_dim f
+        WHERE f.Status IN ({statuses}) {only.format(alias="f")}"""
+        for team, opponent, is_home in (("Home", "Away", 1), ("Away", "Home", 0))
+    )
+    stats = ", ".join(f"ts.{col}" for col in MATCH_STATS)
+    return f"""
+    WITH stats AS (
+        SELECT sf.FixtureID, sf.TeamID,
+               {pivots}
+        FROM statistics_fact sf
+        JOIN stat_type_dim st ON st.StatTypeID = sf.StatTypeID
+        WHERE st.ColumnName IN ({names}) {only.format(alias="sf")}
+        GROUP BY sf.FixtureID, sf.TeamID
+    ),
+    sides AS (
+{sides}
+    )
+    SELECT s.*,
+           CASE WHEN s.GoalsFor > s.GoalsAgainst THEN 3 WHEN s.GoalsFor = s.GoalsAgainst THEN 1
+                WHEN s.GoalsFor < s.GoalsAgainst THEN 0 END AS Points,
+           {stats}, os.XG AS XGAgainst
+    FROM sides s
+    LEFT JOIN stats ts ON ts.FixtureID = s.FixtureID AND ts.TeamID = s.TeamID
+    LEFT JOIN stats os ON os.FixtureID = s.FixtureID AND os.TeamID = s.OpponentID
+    """
+
+
+# Aggregate table -> grouping keys, the team_match columns its groups are found by
+# ("team" or "venue" scope), dashboard filter indexes and the SELECT; {where} is "1" for a full refresh or a
+# filter to the affected groups for an incremental one. Real-valued results are
+# rounded so an incremental refresh matches a full rebuild exactly.
+AGGREGATES = {
+    "team_season_agg": {
+        "keys": ["TeamID", "LeagueID", "Season"],
+        "scope": "team",
+        "indexes": [["LeagueID", "Season"]],
+        "select": """
+            SELECT TeamID, LeagueID, Season,
+                   COUNT(*) AS Matches,
+                   SUM(Points = 3) AS Wins, SUM(Points = 1) AS Draws, SUM(Points = 0) AS Losses,
+                   SUM(Points) AS Points,
+                   SUM(GoalsFor) AS GoalsFor, SUM(GoalsAgainst) AS GoalsAgainst,
+                   SUM(IsHome) AS HomeMatches,
+                   SUM(CASE WHEN IsHome = 1 THEN Points END) AS HomePoints,
+                   SUM(CASE WHEN IsHome = 1 THEN GoalsFor END) AS HomeGoalsFor,
+                   SUM(CASE WHEN IsHome = 1 THEN GoalsAgainst END) AS HomeGoalsAgainst,
+                   SUM(CASE WHEN IsHome = 0 THEN Points END) AS AwayPoints,
+                   SUM(CASE WHEN IsHome = 0 THEN GoalsFor END) AS AwayGoalsFor,
+                   SUM(CASE WHEN IsHome = 0 THEN GoalsAgainst END) AS AwayGoalsAgainst,
+                   ROUND(1.0 * SUM(GoalsFor) / COUNT(*), 3) AS GoalsPerMatch,
+                   ROUND(1.0 * SUM(GoalsAgainst) / COUNT(*), 3) AS GoalsAgainstPerMatch,
+                   ROUND(SUM(XG), 3) AS XG, ROUND(SUM(XGAgainst), 3) AS XGAgainst,
+                   ROUND(SUM(GoalsFor) - SUM(XG), 3) AS GoalsMinusXG,
+                   ROUND(AVG(XG), 3) AS XGPerMatch,
+                   ROUND(AVG(Possession), 3) AS AvgPossession,
+                   SUM(Shots) AS Shots, SUM(ShotsOnGoal) AS ShotsOnGoal
+            FROM team_match
+            WHERE {where}
+            GROUP BY TeamID, LeagueID, Season""",
+    },
+    "team_round_agg": {
+        "keys": ["TeamID", "LeagueID", "Season", "Round"],
+        "scope": "team",
+        "indexes": [["LeagueID", "Season"]],
+        "select": """
+            SELECT TeamID, LeagueID, Season, Round,
+                   COUNT(*) AS Matches, SUM(Points) AS Points,
+                   SUM(GoalsFor) AS GoalsFor, SUM(GoalsAgainst) AS GoalsAgainst,
+                   ROUND(SUM(XG), 3) AS XG, ROUND(SUM(XGAgainst), 3) AS XGAgainst,
+                   ROUND(AVG(Possession), 3) AS AvgPossession,
+                   SUM(Shots) AS Shots, SUM(ShotsOnGoal) AS ShotsOnGoal
+            FROM team_match
+            WHERE {where}
+            GROUP BY TeamID, LeagueID, Season, Round""",
+    },
+    "venue_season_agg": {
+        "keys": ["VenueID", "LeagueID", "Season"],
+        "scope": "venue",
+        "indexes": [["LeagueID", "Season"]],
+        "select": """
+            SELECT VenueID, LeagueID, Season,
+                   COUNT(*) AS Matches,
+                   SUM(Points = 3) AS HomeWins, SUM(Points = 1) AS Draws, SUM(Points = 0) AS AwayWins,
+                   SUM(GoalsFor + GoalsAgainst) AS Goals,
+                   ROUND(1.0 * SUM(GoalsFor + GoalsAgainst) / COUNT(*), 3) AS GoalsPerMatch,
+                   ROUND(SUM(XG + XGAgainst), 3) AS XG,
+                   ROUND(AVG(Possession), 3) AS AvgHomePossession
+            FROM team_match
+            WHERE IsHome = 1 AND {where}
+            GROUP BY VenueID, LeagueID, Season""",
+    },
+}
+
+# Groups touched by the dirty fixtures, as they are now and (for updated fixtures)
+# as they were before the update
+AFFECTED_SQL = {
+    "team": f"""
+        SELECT TeamID, LeagueID, Season FROM (
+            SELECT HomeTeamID AS TeamID, LeagueID, Season FROM fixture_dim WHERE FixtureID IN {DIRTY_FIXTURES}
+            UNION SELECT AwayTeamID, LeagueID, Season FROM fixture_dim WHERE FixtureID IN {DIRTY_FIXTURES}
+            UNION SELECT HomeTeamID, LeagueID, Season FROM "{DIRTY_TABLE}" WHERE Season IS NOT NULL
+            UNION SELECT AwayTeamID, LeagueID, Season FROM "{DIRTY_TABLE}" WHERE Season IS NOT NULL
+        )""",
+    "venue": f"""
+        SELECT VenueID, LeagueID, Season FROM (
+            SELECT VenueID, LeagueID, Season FROM fixture_dim WHERE FixtureID IN {DIRTY_FIXTURES}
+            UNION SELECT VenueID, LeagueID, Season FROM "{DIRTY_TABLE}" WHERE Season IS NOT NULL
+        )""",
+}
+SCOPE_KEYS = {"team": ["TeamID", "LeagueID", "Season"], "venue": ["VenueID", "LeagueID", "Season"]}
+
+
+def dirty_table_sql():
+    return f'CREATE TABLE IF NOT EXISTS "{DIRTY_TABLE}" (FixtureID INTEGER, {", ".join(GROUP_COLUMNS)});'
+
+
+def trigger_sql(table_name):
+    # Change-log triggers: inserts log the new fixture, deletes the old one; fixture_dim
+    # updates and deletes also log the old group columns, so a fixture moving
+    # league/season/team/venue (or dropped) fixes the groups it used to count in
+    old_cols = ", ".join(f"OLD.{col}" for col in GROUP_COLUMNS) if table_name == "fixture_dim" else None
+    statements = []
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        if event != "INSERT" and old_cols:
+            log = (f'INSERT INTO "{DIRTY_TABLE}" (FixtureID, {", ".join(GROUP_COLUMNS)}) '
+                   f"VALUES (OLD.FixtureID, {old_cols});")
+        elif event == "DELETE":
+            log = f'INSERT INTO "{DIRTY_TABLE}" (FixtureID) VALUES (OLD.FixtureID);'
+        else:
+            log = f'INSERT INTO "{DIRTY_TABLE}" (FixtureID) VALUES (NEW.FixtureID);'
+        statements.append(
+            f'CREATE TRIGGER IF NOT EXISTS "trg_{table_name}_{event.lower()}" AFTER {event} ON "{table_name}" '
+            f"BEGIN {log} END;"
+        )
+    return statements
+
+
+def definition_hash():
+    # Changing any aggregate definition forces a full refresh on the next build
+    parts = [team_match_sql()] + [spec["select"] for spec in AGGREGATES.values()]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
@@ -0,0 +1,178 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from api_metrics import METRICS_ENABLED, ApiMetrics, remaining_quota
+from response_cache import CACHE_ENABLED, ResponseCache
+
+# Load environment variables
+load_dotenv()
+
+API_HOST = "api-football-v1.p.rapidapi.com"
+
+# Point API_FOOTBALL_BASE_URL at a local stub server to run the fetchers offline
+BASE_URL            = os.getenv("API_FOOTBALL_BASE_URL", f"https://{API_HOST}/v3")
+REQUESTS_PER_MINUTE = int(os.getenv("API_FOOTBALL_RPM", "30"))
+MAX_WORKERS         = int(os.getenv("API_FOOTBALL_WORKERS", "8"))
+MAX_RETRIES         = int(os.getenv("API_FOOTBALL_MAX_RETRIES", "5"))
+REQUEST_TIMEOUT     = float(os.getenv("API_FOOTBALL_TIMEOUT", "30"))
+
+# Low-priority clients (API_FOOTBALL_PRIORITY=low, e.g. slowly changing dimensions)
+# stop requesting once the daily quota drops below API_QUOTA_RESERVE, leaving it
+# to fixtures and statistics
+PRIORITY      = os.getenv("API_FOOTBALL_PRIORITY", "high")
+QUOTA_RESERVE = int(os.getenv("API_QUOTA_RESERVE", "100"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_BACKOFF = 60.0
+
+
+class TokenBucket:
+    # Shared limiter: refills `per_minute` tokens a minute and holds at most
+    # `capacity`, so workers can never burst past the plan's quota.
+    def __init__(self, per_minute, capacity=1):
+        if per_minute <= 0:
+            raise ValueError("per_minute must be positive")
+        self.rate = per_minute / 60.0
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class QuotaReserved(RuntimeError):
+    pass
+
+
+class ApiClient:
+    # One pooled session + one limiter + one response cache shared by every worker thread
+    def __init__(self, api_key=None, base_url=BASE_URL, requests_per_minute=REQUESTS_PER_MINUTE,
+                 max_workers=MAX_WORKERS, max_retries=MAX_RETRIES, backoff=1.0, timeout=REQUEST_TIMEOUT,
+                 cache=None, priority=PRIORITY, quota_reserve=QUOTA_RESERVE):
+        api_key = api_key or os.getenv("API_FOOTBALL_KEY")
+        if not api_key:
+            raise ValueError("Please set API_FOOTBALL_KEY in your .env file.")
+
+        self.base_url = base_url.rstrip("/")
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.limiter = TokenBucket(requests_per_minute)
+        self.cache = cache if cache is not None else (ResponseCache() if CACHE_ENABLED else None)
+        self.metrics = ApiMetrics()
+        self.priority = priority
+        self.quota_reserve = quota_reserve
+        # Quota left after earlier runs today, until this session sees a fresher header
+        self._known_quota = remaining_quota() if priority == "low" else None
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({
+            "x-rapidapi-key": api_key,
+            "x-rapidapi-host": API_HOST
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.session.close()
+        self.metrics.report()
+        if METRICS_ENABLED:
+            self.metrics.save()
+        if self.cache is not None:
+            self.cache.report()
+            self.cache.close()
+
+    def _retry_delay(self, attempt, resp=None):
+        # Honour Retry-After on 429s, otherwise exponential backoff with jitter
+        if resp is not None and resp.headers.get("Retry-After"):
+            try:
+                return min(float(resp.headers["Retry-After"]), MAX_BACKOFF)
+            except ValueError:
+                pass
+        return min(self.backoff * 2 ** attempt + random.uniform(0, self.backoff), MAX_BACKOFF)
+
+    def get(self, endpoint, params=None, ttl=None):
+        # ttl overrides the cache policy, e.g. FOREVER for stats of a finished fixture;
+        # ttl=0 bypasses the cache both ways, for answers known to have changed
+        if self.cache is not None and ttl != 0:
+            data = self.cache.get(endpoint, params, self.base_url)
+            if data is not None:
+                self.metrics.record_cache_hit(endpoint.strip("/"))
+                return data
+        data = self._request(endpoint, params)
+        if self.cache is not None:
+            self.cache.put(endpoint, params, data, ttl, self.base_url)
+        return data
+
+    def check_quota(self, endpoint):
+        quota = self.metrics.quota_remaining if self.metrics.quota_remaining is not None else self._known_quota
+        if self.priority == "low" and quota is not None and quota < self.quota_reserve:
+            raise QuotaReserved(f"Deferred {endpoint}: {quota} requests left today, "
+                                f"{self.quota_reserve} reserved for high-priority fetches")
+
+    def _request(self, endpoint, params):
+        url = f"{self.base_url}/{endpoint.lstrip('/')}"
+        name = endpoint.strip("/")
+        for attempt in range(self.max_retries + 1):
+            self.check_quota(name)
+            self.limiter.acquire()
+            resp = None
+            start = time.perf_counter()
+            try:
+                resp = self.session.get(url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.record_attempt(name, time.perf_counter() - start, attempt, error=e)
+                if attempt == self.max_retries:
+                    raise
+            else:
+                self.metrics.record_attempt(name, time.perf_counter() - start, attempt, resp.status_code,
+                                            len(resp.content), resp.headers)
+                if resp.status_code not in RETRY_STATUSES:
+                    resp.raise_for_status()
+                    data = resp.json()
+                    # API-Football sometimes reports throttling as a 200 with an errors block
+                    errors = data.get("errors")
+                    if not (isinstance(errors, dict) and "rateLimit" in errors):
+                        return data
+                    if attempt == self.max_retries:
+                        raise RuntimeError(f"Rate limited on {endpoint}: {errors['rateLimit']}")
+                elif attempt == self.max_retries:
+                    resp.raise_for_status()
+            time.sleep(self._retry_delay(attempt, resp))
+
+    def fetch_all(self, endpoint, params_list, ttl=None):
+        # Fetch every params dict concurrently; yields (params, payload, error) as each completes
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.get, endpoint, params, ttl): params for params in params_list}
+            for future in as_completed(futures):
+                params = futures[future]
+                try:
+                    yield params, future.result(), None
+                except Exception as e:
+                    yield params, None, e
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+# Per-run API-Football call metrics, kept in SQLite next to the response cache:
+#   api_runs             - one row per client session: script, timing, last quota seen
+#   api_endpoint_metrics - per endpoint: HTTP attempts, cache hits, errors, retries,
+#                          429s, bytes received and latency summary
+#   api_latency_buckets  - per endpoint latency histogram (count per upper bound)
+# API_METRICS=0 turns it off. remaining_quota() reads the last quota RapidAPI
+# reported today (x-ratelimit-requests-remaining), for schedulers.
+METRICS_ENABLED = os.getenv("API_METRICS", "1") == "1"
+METRICS_PATH    = os.getenv("API_METRICS_PATH", ".cache/api_metrics.sqlite")
+
+# Latency histogram upper bounds in milliseconds; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf")]
+
+QUOTA_HEADER = "x-ratelimit-requests-remaining"
+QUOTA_LIMIT_HEADER = "x-ratelimit-requests-limit"
+
+
+def connect(path):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS api_runs (
+            run_id          INTEGER PRIMARY KEY,
+            script          TEXT NOT NULL,
+            started_at      REAL NOT NULL,
+            finished_at     REAL NOT NULL,
+            quota_remaining INTEGER,
+            quota_limit     INTEGER,
+            quota_seen_at   REAL
+        );
+        CREATE TABLE IF NOT EXISTS api_endpoint_metrics (
+            run_id     INTEGER NOT NULL,
+            endpoint   TEXT NOT NULL,
+            requests   INTEGER NOT NULL,
+            cache_hits INTEGER NOT NULL,
+            errors     INTEGER NOT NULL,
+            retries    INTEGER NOT NULL,
+            throttled  INTEGER NOT NULL,
+            bytes      INTEGER NOT NULL,
+            total_ms   REAL NOT NULL,
+            max_ms     REAL NOT NULL,
+            last_error TEXT,
+            PRIMARY KEY (run_id, endpoint)
+        );
+        CREATE TABLE IF NOT EXISTS api_latency_buckets (
+            run_id   INTEGER NOT NULL,
+            endpoint TEXT NOT NULL,
+            le_ms    REAL NOT NULL,
+            count    INTEGER NOT NULL,
+            PRIMARY KEY (run_id, endpoint, le_ms)
+        );
+    """)
+    return conn
+
+
+def same_utc_day(a, b):
+    day = lambda t: datetime.fromtimestamp(t, timezone.utc).date()
+    return day(a) == day(b)
+
+
+def remaining_quota(path=METRICS_PATH):
+    # Last daily quota RapidAPI reported, or None if nothing was seen since the
+    # quota last reset (00:00 UTC)
+    if not os.path.exists(path):
+        return None
+    conn = connect(path)
+    try:
+        row = conn.execute("""
+            SELECT quota_remaining, quota_seen_at FROM api_runs
+            WHERE quota_seen_at IS NOT NULL ORDER BY quota_seen_at DESC LIMIT 1;
+        """).fetchone()
+    finally:
+        conn.close()
+    if row is None or not same_utc_day(row[1], time.time()):
+        return None
+    return row[0]
+
+
+class ApiMetrics:
+    # Thread-safe counters for one client session, written out by save()
+    def __init__(self, path=METRICS_PATH, script=None):
+        self.path = path
+        self.script = script or os.path.basename(sys.argv[0]) or "python"
+        self.started_at = time.time()
+        self.requests = Counter()
+        self.cache_hits = Counter()
+        self.errors = Counter()
+        self.retries = Counter()
+        self.throttled = Counter()
+        self.bytes = Counter()
+        self.total_ms = Counter()
+        self.max_ms = Counter()
+        self.buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS_MS))
+        self.last_error = {}
+        self.quota_remaining = None
+        self.quota_limit = None
+        self.quota_seen_at = None
+        self._lock = threading.Lock()
+
+    def record_cache_hit(self, endpoint):
+        with self._lock:
+            self.cache_hits[endpoint] += 1
+
+    def record_attempt(self, endpoint, seconds, attempt, status=None, size=0, headers=None, error=None):
+        # One HTTP attempt: status is None when the request never got a response
+        ms = seconds * 1000
+        with self._lock:
+            self.requests[endpoint] += 1
+            self.total_ms[endpoint] += ms
+            self.max_ms[endpoint] = max(self.max_ms[endpoint], ms)
+            self.buckets[endpoint][bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            self.bytes[endpoint] += size
+            if attempt:
+                self.retries[endpoint] += 1
+            if status == 429:
+                self.throttled[endpoint] += 1
+            if error is not None or (status is not None and status >= 400):
+                self.errors[endpoint] += 1
+                self.last_error[endpoint] = str(error) if error is not None else f"HTTP {status}"
+            if headers and headers.get(QUOTA_HEADER) is not None:
+                try:
+                    # Concurrent responses can arrive out of order; the quota only goes down
+                    remaining = int(headers[QUOTA_HEADER])
+                    self.quota_remaining = remaining if self.quota_remaining is None else min(self.quota_remaining, remaining)
+                    self.quota_limit = int(headers[QUOTA_LIMIT_HEADER]) if headers.get(QUOTA_LIMIT_HEADER) else None
+                    self.quota_seen_at = time.time()
+                except ValueError:
+                    pass
+
+    def save(self):
+        endpoints = sorted(set(self.requests) | set(self.cache_hits))
+        if not endpoints:
+            return
+        conn = connect(self.path)
+        try:
+            with conn:
+                run_id = conn.execute(
+                    "INSERT INTO api_runs (script, started_at, finished_at, quota_remaining, quota_limit, quota_seen_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?);",
+                    (self.script, self.started_at, time.time(), self.quota_remaining, self.quota_limit,
+                     self.quota_seen_at),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO api_endpoint_metrics VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);",
+                    [(run_id, endpoint, self.requests[endpoint], self.cache_hits[endpoint], self.errors[endpoint],
+                      self.retries[endpoint], self.throttled[endpoint], self.bytes[endpoint],
+                      round(self.total_ms[endpoint], 1), round(self.max_ms[endpoint], 1),
+                      self.last_error.get(endpoint)) for endpoint in endpoints],
+                )
+                conn.executemany(
+                    "INSERT INTO api_latency_buckets VALUES (?, ?, ?, ?);",
+                    [(run_id, endpoint, bound, count)
+                     for endpoint in endpoints
+                     for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets[endpoint]) if count],
+                )
+        finally:
+            conn.close()
+
+    def report(self):
+        endpoints = sorted(self.requests)
+        if not endpoints:
+            return
+        print(f"\n📡 API calls: {sum(self.requests.values())} requests, "
+              f"{sum(self.bytes.values()) / 1e6:.1f} MB received")
+        for endpoint in endpoints:
+            requests = self.requests[endpoint]
+            print(f"   {endpoint:<22} {requests:>6} requests {self.total_ms[endpoint] / requests:8.1f} ms avg "
+                  f"{self.max_ms[endpoint]:8.1f} ms max {self.retries[endpoint]:>4} retries "
+                  f"{self.errors[endpoint]:>4} errors")
+        if self.quota_remaining is not None:
+            limit = f" of {self.quota_limit}" if self.quota_limit else ""
+            print(f"   Daily quota remaining: {self.quota_remaining}{limit}")
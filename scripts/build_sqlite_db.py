@@ -1,52 +1,329 @@
 import sqlite3
-import pandas as pd
 import os
+from datetime import datetime, timezone
 
-# Folder with CSVs
-DATA_FOLDER = "data"
-DB_NAME = "football_data.sqlite"
+from aggregates import (AFFECTED_SQL, AGGREGATES, DIRTY_FIXTURES, DIRTY_TABLE, SCOPE_KEYS, TEAM_MATCH,
+                        TRACKED_TABLES, definition_hash, dirty_table_sql, team_match_sql, trigger_sql)
+from schema import SCHEMA, column_types, normalize
+from serving import SERVE_DB, optimize, write_snapshot
+from staging import iter_batches, list_tables, path_digest, read_sample
+from statistics_model import FACT_TABLE, TYPE_TABLE, WIDE_VIEW, migrate_wide, wide_columns, wide_view_sql
+from upsert import TABLE_KEYS
 
-# Inference function for SQL types
-def infer_sql_type(series):
-    if pd.api.types.is_integer_dtype(series):
-        return "INTEGER"
-    elif pd.api.types.is_float_dtype(series):
-        return "REAL"
+# Folder with the staged tables (CSV files and/or Parquet datasets, see staging.py)
+DATA_FOLDER = os.getenv("DATA_FOLDER", "data")
+DB_NAME = os.getenv("DB_NAME", "football_data.sqlite")
+
+# FULL_REBUILD=1 drops and reloads every table instead of upserting changed rows
+FULL_REBUILD = os.getenv("FULL_REBUILD", "0") == "1"
+
+# Watermark per table: path_digest of the staged file last loaded, so any rewrite
+# (even one with the same number of rows) is reloaded; row_count is informational
+META_TABLE = "_build_meta"
+
+# Tables are streamed in fixed-size chunks; column types are inferred from the first SAMPLE_ROWS
+CHUNK_ROWS = int(os.getenv("CHUNK_ROWS", "50000"))
+SAMPLE_ROWS = int(os.getenv("SAMPLE_ROWS", "10000"))
+CACHE_SIZE_KB = int(os.getenv("CACHE_SIZE_KB", "65536"))
+
+
+def quote(name):
+    return f'"{name}"'
+
+
+def ensure_meta_table(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {META_TABLE} (
+            table_name TEXT PRIMARY KEY,
+            file_hash  TEXT NOT NULL,
+            row_count  INTEGER NOT NULL,
+            loaded_at  TEXT NOT NULL
+        );
+    """)
+
+
+def loaded_hash(cursor, table_name):
+    row = cursor.execute(f"SELECT file_hash FROM {META_TABLE} WHERE table_name = ?;", (table_name,)).fetchone()
+    return row[0] if row else None
+
+
+def record_meta(cursor, table_name, digest, row_count):
+    cursor.execute(
+        f"INSERT OR REPLACE INTO {META_TABLE} (table_name, file_hash, row_count, loaded_at) VALUES (?, ?, ?, ?);",
+        (table_name, digest, row_count, datetime.now(timezone.utc).isoformat())
+    )
+
+
+def track_changes(cursor, table_name):
+    # Log fixtures touched by upserts so the aggregates refresh only their groups
+    if table_name in TRACKED_TABLES:
+        cursor.execute(dirty_table_sql())
+        for statement in trigger_sql(table_name):
+            cursor.execute(statement)
+
+
+def table_info(cursor, table_name):
+    # Column name -> (declared type, position in the primary key; 0 when not part of it)
+    return {name: (col_type, pk) for _, name, col_type, _, _, pk in cursor.execute(f'PRAGMA table_info("{table_name}");')}
+
+
+def schema_matches(cursor, table_name, keys):
+    # False when the table is missing, keyed differently or has drifted from SCHEMA
+    info = table_info(cursor, table_name)
+    if not info:
+        return False
+    current_keys = [name for name, (_, pk) in sorted(info.items(), key=lambda item: item[1][1]) if pk]
+    if current_keys != keys:
+        return False
+    declared = SCHEMA.get(table_name, {}).get("columns", {})
+    return all(info[col][0] == sql_type for col, sql_type in declared.items() if col in info)
+
+
+def table_columns(table_name, types):
+    # Every column declared in SCHEMA plus the staged extras: staging written before
+    # a column was added (fixture_dim.csv without the goals) still builds a table the
+    # views and aggregates can query, with NULLs until the data arrives
+    return {**SCHEMA.get(table_name, {}).get("columns", {}), **types}
+
+
+def create_table(cursor, table_name, types, keys):
+    spec = SCHEMA.get(table_name, {})
+    cursor.execute(f'DROP TABLE IF EXISTS "{table_name}";')
+    col_defs = [f"{quote(col)} {sql_type}" for col, sql_type in table_columns(table_name, types).items()]
+    if keys:
+        col_defs.append(f"PRIMARY KEY ({', '.join(map(quote, keys))})")
+    options = " WITHOUT ROWID" if spec.get("without_rowid") and keys else ""
+    cursor.execute(f'CREATE TABLE "{table_name}" ({", ".join(col_defs)}){options};')
+    print(f"✅ Created table: {table_name}")
+
+
+def create_indexes(cursor, table_name):
+    # Secondary indexes are built after the bulk load rather than maintained row by row
+    for index_cols in SCHEMA.get(table_name, {}).get("indexes", []):
+        index_name = f"idx_{table_name}_{'_'.join(index_cols).lower()}"
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {quote(index_name)} ON {quote(table_name)} ({', '.join(map(quote, index_cols))});")
+
+
+def prepare_table(cursor, table_name, types, keys):
+    # Recreate when missing or out of date with SCHEMA; otherwise add any new declared
+    # or staged columns. Returns True when the table was (re)created empty.
+    if FULL_REBUILD or not schema_matches(cursor, table_name, keys):
+        create_table(cursor, table_name, types, keys)
+        return True
+    info = table_info(cursor, table_name)
+    for col, sql_type in table_columns(table_name, types).items():
+        if col not in info:
+            cursor.execute(f'ALTER TABLE "{table_name}" ADD COLUMN "{col}" {sql_type};')
+            print(f"➕ Added column {col} to {table_name}")
+    return False
+
+
+def tune_for_load(conn):
+    # Bulk-load settings: the build can always be re-run, so durability is traded for speed
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=OFF;")
+    conn.execute(f"PRAGMA cache_size=-{CACHE_SIZE_KB};")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+
+
+def finish_load(conn):
+    # Fold the WAL back in so the published file is a single self-contained database
+    conn.execute("PRAGMA journal_mode=DELETE;")
+    conn.execute("PRAGMA synchronous=FULL;")
+
+
+def records(df):
+    # Python-native row tuples with NULL as None, which executemany binds directly
+    columns = []
+    for col in df.columns:
+        series = df[col]
+        if series.hasnans:
+            series = series.astype(object).where(series.notna(), None)
+        columns.append(series.tolist())
+    return zip(*columns)
+
+
+def write_rows(cursor, table_name, df, keys, fresh):
+    cols = [quote(col) for col in df.columns]
+    non_keys = [quote(col) for col in df.columns if col not in keys]
+    values = ", ".join("?" * len(cols))
+    if fresh or not keys:
+        # Empty table: plain bulk insert, later duplicates in the staged data still win
+        stmt = f"INSERT OR REPLACE INTO {quote(table_name)} ({', '.join(cols)}) VALUES ({values})"
+    elif non_keys:
+        # INSERT ... ON CONFLICT only writes rows that are new or whose values changed
+        stmt = (
+            f"INSERT INTO {quote(table_name)} ({', '.join(cols)}) VALUES ({values})"
+            f" ON CONFLICT ({', '.join(map(quote, keys))}) DO UPDATE SET "
+            + ", ".join(f"{col} = excluded.{col}" for col in non_keys)
+            + f" WHERE ({', '.join(non_keys)}) IS NOT ({', '.join(f'excluded.{col}' for col in non_keys)})"
+        )
     else:
-        return "TEXT"
-
-# Connect to the SQLite DB
-conn = sqlite3.connect(DB_NAME)
-cursor = conn.cursor()
-
-# Process each CSV file
-for filename in os.listdir(DATA_FOLDER):
-    if filename.endswith(".csv"):
-        table_name = os.path.splitext(filename)[0]
-        file_path = os.path.join(DATA_FOLDER, filename)
-        print(f"\n📄 Processing {filename} -> table: {table_name}")
-
-        # Read the CSV
-        df = pd.read_csv(file_path)
-
-        # Drop table if it exists
-        cursor.execute(f"DROP TABLE IF EXISTS {table_name};")
-        print(f"Dropped table {table_name}")
-
-        # Create table based on inferred schema
-        col_defs = []
-        for col in df.columns:
-            sql_type = infer_sql_type(df[col])
-            col_defs.append(f'"{col}" {sql_type}')
-        create_stmt = f"CREATE TABLE {table_name} ({', '.join(col_defs)});"
-        cursor.execute(create_stmt)
-        print(f"✅ Created table: {table_name}")
-
-        # Insert data
-        df.to_sql(table_name, conn, if_exists="append", index=False)
-        print(f"📥 Inserted {len(df)} rows into {table_name}")
-
-# Finish
-conn.commit()
-conn.close()
-print(f"\n✅ All tables inserted into {DB_NAME}")
+        stmt = f"INSERT OR IGNORE INTO {quote(table_name)} ({', '.join(cols)}) VALUES ({values})"
+
+    # rowcount leaves out the change-log rows the triggers write
+    cursor.executemany(stmt + ";", records(df))
+    return max(cursor.rowcount, 0)
+
+
+def delete_missing(cursor, table_name, keys):
+    # The staged file holds the whole table: rows whose key it no longer has are gone
+    match = " AND ".join(f"s.{quote(key)} = {quote(table_name)}.{quote(key)}" for key in keys)
+    cursor.execute(f"DELETE FROM {quote(table_name)} WHERE NOT EXISTS (SELECT 1 FROM temp.staged_keys s WHERE {match});")
+    return cursor.rowcount
+
+
+def load_table(conn, table_name, file_path):
+    cursor = conn.cursor()
+    digest = path_digest(file_path)
+    keys = TABLE_KEYS.get(table_name, [])
+    if not FULL_REBUILD and loaded_hash(cursor, table_name) == digest and schema_matches(cursor, table_name, keys):
+        print(f"⏭️ {table_name} unchanged since last build, skipped")
+        return
+
+    # Infer column types from a sample; the full file is only ever read chunk by chunk
+    sample = read_sample(file_path, SAMPLE_ROWS)
+    types = column_types(table_name, sample)
+    del sample
+
+    # One transaction per table: schema changes, upsert, deletes and watermark land together
+    row_count = changed = deleted = 0
+    with conn:
+        if keys:
+            fresh = prepare_table(cursor, table_name, types, keys)
+        else:
+            # No natural key known for this file: fall back to a full reload
+            create_table(cursor, table_name, types, keys)
+            fresh = True
+        if fresh and table_name in TRACKED_TABLES:
+            # Reloaded from scratch: no change log, so the aggregates are rebuilt in full
+            cursor.execute(f"DELETE FROM {META_TABLE} WHERE table_name = ?;", (TEAM_MATCH,))
+        elif not fresh:
+            track_changes(cursor, table_name)
+        # Keys seen in the staged file, to find the rows it dropped once it is read
+        upsert_only = keys and not fresh
+        if upsert_only:
+            key_defs = ", ".join(f"{quote(key)} {types.get(key, 'TEXT')}" for key in keys)
+            cursor.execute("DROP TABLE IF EXISTS temp.staged_keys;")
+            cursor.execute(f"CREATE TEMP TABLE staged_keys ({key_defs}, PRIMARY KEY ({', '.join(map(quote, keys))}));")
+
+        for chunk in iter_batches(file_path, CHUNK_ROWS):
+            chunk = normalize(chunk, types)
+            if keys:
+                chunk = chunk.dropna(subset=keys)
+            changed += write_rows(cursor, table_name, chunk, keys, fresh)
+            row_count += len(chunk)
+            if upsert_only:
+                cursor.executemany(f"INSERT OR IGNORE INTO temp.staged_keys VALUES ({', '.join('?' * len(keys))});",
+                                   records(chunk[keys]))
+        if upsert_only:
+            deleted = delete_missing(cursor, table_name, keys)
+            cursor.execute("DROP TABLE temp.staged_keys;")
+        create_indexes(cursor, table_name)
+        track_changes(cursor, table_name)
+        record_meta(cursor, table_name, digest, row_count)
+    print(f"📥 Upserted {changed} changed rows into {table_name}, deleted {deleted} ({row_count} rows staged)")
+
+
+def create_views(conn):
+    # statistics_dim keeps its old wide shape as a pivot of statistics_fact; the
+    # column list follows stat_type_dim, so it is regenerated on every build
+    cursor = conn.cursor()
+    objects = dict(cursor.execute("SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view');"))
+    if objects.get(FACT_TABLE) != "table" or objects.get(TYPE_TABLE) != "table":
+        return
+    stat_types = cursor.execute(f'SELECT StatTypeID, ColumnName FROM "{TYPE_TABLE}" ORDER BY StatTypeID;').fetchall()
+    with conn:
+        # Databases built before the long model still hold statistics_dim as a table
+        if WIDE_VIEW in objects:
+            cursor.execute(f'DROP {objects[WIDE_VIEW].upper()} "{WIDE_VIEW}";')
+        cursor.execute(f"DELETE FROM {META_TABLE} WHERE table_name = ?;", (WIDE_VIEW,))
+        cursor.execute(wide_view_sql(stat_types))
+    print(f"🪟 Created view {WIDE_VIEW} ({len(wide_columns(stat_types))} stat columns)")
+
+
+def refresh_aggregates(conn):
+    # Rebuild team_match and the AGGREGATES in full when they are missing or their
+    # definitions changed; otherwise recompute only the groups of dirty fixtures
+    cursor = conn.cursor()
+    objects = {row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table';")}
+    if not {"fixture_dim", "statistics_fact", "stat_type_dim"} <= objects:
+        return
+    digest = definition_hash()
+    full = FULL_REBUILD or loaded_hash(cursor, TEAM_MATCH) != digest
+    with conn:
+        cursor.execute(dirty_table_sql())
+        if full:
+            for name in [TEAM_MATCH, *AGGREGATES]:
+                cursor.execute(f"DROP TABLE IF EXISTS {quote(name)};")
+            cursor.execute(f"CREATE TABLE {quote(TEAM_MATCH)} AS {team_match_sql()};")
+            cursor.execute(f"CREATE INDEX idx_team_match_fixtureid ON {quote(TEAM_MATCH)} (FixtureID);")
+            for name, spec in AGGREGATES.items():
+                cursor.execute(f"CREATE TABLE {quote(name)} AS {spec['select'].format(where='1')};")
+                cursor.execute(f"CREATE UNIQUE INDEX {quote(f'idx_{name}_key')} ON {quote(name)} "
+                               f"({', '.join(map(quote, spec['keys']))});")
+                for index_cols in spec["indexes"]:
+                    cursor.execute(f"CREATE INDEX {quote(f'idx_{name}_' + '_'.join(index_cols).lower())} "
+                                   f"ON {quote(name)} ({', '.join(map(quote, index_cols))});")
+            for scope, scope_keys in SCOPE_KEYS.items():
+                cursor.execute(f"CREATE INDEX {quote(f'idx_team_match_{scope}')} ON {quote(TEAM_MATCH)} "
+                               f"({', '.join(map(quote, scope_keys))});")
+        else:
+            if cursor.execute(f'SELECT COUNT(*) FROM "{DIRTY_TABLE}";').fetchone()[0] == 0:
+                print("⏭️ Aggregates up to date")
+                return
+            # Affected groups are collected before team_match is rewritten
+            for scope, sql in AFFECTED_SQL.items():
+                cursor.execute(f"DROP TABLE IF EXISTS temp.affected_{scope};")
+                cursor.execute(f"CREATE TEMP TABLE affected_{scope} AS {sql};")
+            cursor.execute(f"DELETE FROM {quote(TEAM_MATCH)} WHERE FixtureID IN {DIRTY_FIXTURES};")
+            cursor.execute(f"INSERT INTO {quote(TEAM_MATCH)} {team_match_sql(only_dirty=True)};")
+            for name, spec in AGGREGATES.items():
+                scope_keys = ", ".join(SCOPE_KEYS[spec["scope"]])
+                where = f"({scope_keys}) IN (SELECT {scope_keys} FROM temp.affected_{spec['scope']})"
+                cursor.execute(f"DELETE FROM {quote(name)} WHERE {where};")
+                cursor.execute(f"INSERT INTO {quote(name)} {spec['select'].format(where=where)};")
+        changed = cursor.execute(f'SELECT COUNT(DISTINCT FixtureID) FROM "{DIRTY_TABLE}";').fetchone()[0]
+        cursor.execute(f'DELETE FROM "{DIRTY_TABLE}";')
+        record_meta(cursor, TEAM_MATCH, digest, cursor.execute(f"SELECT COUNT(*) FROM {quote(TEAM_MATCH)};").fetchone()[0])
+
+    sizes = ", ".join(f"{name} {cursor.execute(f'SELECT COUNT(*) FROM {quote(name)};').fetchone()[0]}" for name in AGGREGATES)
+    print(f"📊 {'Rebuilt' if full else f'Refreshed {changed} changed fixtures in'} aggregates: {sizes}")
+
+
+def main():
+    # Statistics staged wide by older fetchers are converted to the long tables first
+    migrate_wide(DATA_FOLDER)
+
+    # Connect to the SQLite DB
+    conn = sqlite3.connect(DB_NAME)
+    tune_for_load(conn)
+    with conn:
+        ensure_meta_table(conn.cursor())
+
+    # The WAL is folded back in even when a step fails, so a half-finished build
+    # never leaves football_data.sqlite depending on its -wal file
+    try:
+        # Process each staged table (fetcher bookkeeping files start with "_")
+        for table_name, file_path in list_tables(DATA_FOLDER).items():
+            print(f"\n📄 Processing {os.path.basename(file_path)} -> table: {table_name}")
+            load_table(conn, table_name, file_path)
+        create_views(conn)
+        refresh_aggregates(conn)
+
+        # Finish. Leaving WAL mode rewrites the database file, so it happens before
+        # the snapshot: readers take the snapshot only while it is the newer file.
+        optimize(conn)
+        finish_load(conn)
+        size = write_snapshot(conn)
+    except BaseException:
+        finish_load(conn)
+        raise
+    finally:
+        conn.close()
+    print(f"\n✅ All tables inserted into {DB_NAME}")
+    print(f"📦 Serving snapshot written to {SERVE_DB} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
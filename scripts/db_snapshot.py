@@ -0,0 +1,128 @@
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+
+# Text snapshot of a built database, published instead of the binary:
+#   schema.sql      - CREATE statements for every table, index and view
+#   <table>.csv     - rows sorted by primary key, NULL written as NULL_MARKER
+#   manifest.json   - row count and content hash per table
+# Files are plain and sorted, so a rebuild that changes a few rows changes a few
+# lines, and git stores each version as a small delta (it zlib-compresses objects
+# itself; pre-compressed files would defeat its delta compression).
+# The builder's _-prefixed bookkeeping and its change-log triggers are left out.
+NULL_MARKER = r"\N"
+SCHEMA_FILE = "schema.sql"
+MANIFEST_FILE = "manifest.json"
+FETCH_ROWS = int(os.getenv("SNAPSHOT_FETCH_ROWS", "10000"))
+
+csv.field_size_limit(sys.maxsize)
+
+
+def schema_objects(conn):
+    # (type, name, sql) for user tables first, then indexes and views, in creation order
+    return conn.execute("""
+        SELECT type, name, sql FROM sqlite_master
+        WHERE type IN ('table', 'index', 'view') AND sql IS NOT NULL
+          AND name NOT LIKE 'sqlite\\_%' ESCAPE '\\'
+          AND name NOT LIKE '\\_%' ESCAPE '\\' AND tbl_name NOT LIKE '\\_%' ESCAPE '\\'
+        ORDER BY CASE type WHEN 'table' THEN 0 WHEN 'index' THEN 1 ELSE 2 END, rowid;
+    """).fetchall()
+
+
+def sort_columns(conn, table_name):
+    # Primary key columns, or every column for tables without one
+    info = conn.execute(f'PRAGMA table_info("{table_name}");').fetchall()
+    pk = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+    return pk or [row[1] for row in info]
+
+
+def dump_table(conn, table_name, path):
+    cursor = conn.execute(f'SELECT * FROM "{table_name}" ORDER BY '
+                          + ", ".join(f'"{col}"' for col in sort_columns(conn, table_name)))
+    digest = hashlib.sha256()
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow([col[0] for col in cursor.description])
+        while batch := cursor.fetchmany(FETCH_ROWS):
+            writer.writerows([NULL_MARKER if value is None else value for value in row] for row in batch)
+            rows += len(batch)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return {"rows": rows, "sha256": digest.hexdigest()}
+
+
+def dump_snapshot(db_path, folder):
+    # Write the snapshot of db_path into folder, removing files of dropped tables
+    os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(f"file:{os.path.abspath(db_path)}?mode=ro", uri=True)
+    try:
+        objects = schema_objects(conn)
+        with open(os.path.join(folder, SCHEMA_FILE), "w", encoding="utf-8") as f:
+            f.writelines(f"{sql};\n" for _, _, sql in objects)
+        manifest = {name: dump_table(conn, name, os.path.join(folder, f"{name}.csv"))
+                    for kind, name, _ in objects if kind == "table"}
+    finally:
+        conn.close()
+    for file_name in os.listdir(folder):
+        if file_name.endswith(".csv") and file_name[:-4] not in manifest:
+            os.remove(os.path.join(folder, file_name))
+    with open(os.path.join(folder, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return manifest
+
+
+def untyped_value(value):
+    # Columns declared without a type (CREATE TABLE AS over expressions) have no
+    # affinity to turn text back into numbers, so do it here
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def rebuild_db(folder, db_path):
+    # Recreate a database from a snapshot; values get their column's type back
+    # through SQLite type affinity
+    with open(os.path.join(folder, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        with open(os.path.join(folder, SCHEMA_FILE), encoding="utf-8") as f:
+            conn.executescript(f.read())
+        for table_name, expected in manifest.items():
+            with open(os.path.join(folder, f"{table_name}.csv"), newline="", encoding="utf-8") as f:
+                reader = csv.reader(f)
+                header = next(reader)
+                declared = {row[1]: row[2] for row in conn.execute(f'PRAGMA table_info("{table_name}");')}
+                untyped = [not declared[col] for col in header]
+                columns = ", ".join(f'"{col}"' for col in header)
+                insert = f'INSERT INTO "{table_name}" ({columns}) VALUES ({", ".join("?" * len(header))})'
+                rows = conn.executemany(insert, (
+                    [None if value == NULL_MARKER else untyped_value(value) if bare else value
+                     for value, bare in zip(row, untyped)]
+                    for row in reader
+                )).rowcount
+            if rows != expected["rows"]:
+                raise ValueError(f"{table_name}: snapshot has {rows} rows, manifest says {expected['rows']}")
+            print(f"✔️ Restored {table_name}: {rows} rows")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+
+
+if __name__ == "__main__":
+    # python db_snapshot.py <snapshot folder> <database to create>
+    rebuild_db(sys.argv[1], sys.argv[2])
+    print(f"✅ Rebuilt {sys.argv[2]} from {sys.argv[1]}")
@@ -1,56 +1,480 @@
-import sqlite3
+import csv
+import hashlib
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import pandas as pd
-import gspread
-from gspread_dataframe import set_with_dataframe
 import requests
-import tempfile
+
+from aggregates import AGGREGATES, TEAM_MATCH
+from api_client import MAX_BACKOFF, RETRY_STATUSES, TokenBucket
+from db_snapshot import MANIFEST_FILE, SCHEMA_FILE, rebuild_db
+from serving import SERVE_DB, connect_readonly
+from staging import path_digest
+from statistics_model import WIDE_VIEW
+from upsert import TABLE_KEYS
 
 # --- Path to your downloaded credentials JSON ---
-credentials_path = "/Users/snatch/PycharmProjects/power_bi_project/2_0/data/client_secret_141496264794-p7g2i6j81m5jagj70ig75e47b29ju5j0.apps.googleusercontent.com.json"
+credentials_path = os.getenv(
+    "GOOGLE_CREDENTIALS",
+    "/Users/snatch/PycharmProjects/power_bi_project/2_0/data/client_secret_141496264794-p7g2i6j81m5jagj70ig75e47b29ju5j0.apps.googleusercontent.com.json"
+)
+authorized_user_path = os.getenv(
+    "GOOGLE_AUTHORIZED_USER",
+    "/Users/snatch/PycharmProjects/power_bi_project/2_0/data/authorized_user.json"
+)
 
-# --- Authenticate using the credentials file ---
-gc = gspread.oauth(
-    credentials_filename=credentials_path,
-    authorized_user_filename="/Users/snatch/PycharmProjects/power_bi_project/2_0/data/authorized_user.json"
+SPREADSHEET_URL = os.getenv(
+    "SPREADSHEET_URL",
+    "https://docs.google.com/spreadsheets/d/1fGHvWjDl8dR9JaRn0tes84BRbguJMGaHLrhhj4iJFmo/edit?usp=sharing"
 )
+# The remote copy is the text snapshot github_push_db.py publishes, rebuilt into a
+# database here; set SQLITE_URL to download a .sqlite published with
+# PUBLISH_MODE=binary instead.
+SNAPSHOT_URL = os.getenv("SNAPSHOT_URL", "https://github.com/pythonsnatcher/power_bi/raw/main/snapshot")
+SQLITE_URL = os.getenv("SQLITE_URL")
+
+# SQLITE_SOURCE=auto reads the builder's serving snapshot (SERVE_DB) or else the
+# local DB_FILE, read-only, and only falls back to the remote copy; "local" and
+# "remote" force one or the other.
+SQLITE_SOURCE = os.getenv("SQLITE_SOURCE", "auto")
+DB_FILE       = os.getenv("DB_FILE", os.getenv("DB_NAME", "football_data.sqlite"))
+DOWNLOAD_CHUNK   = int(os.getenv("SQLITE_DOWNLOAD_CHUNK", str(1 << 20)))
+DOWNLOAD_TIMEOUT = float(os.getenv("SQLITE_DOWNLOAD_TIMEOUT", "60"))
+
+# EXPORT_MODE=delta compares every table with the snapshot of what was last exported
+# and only sends the rows that changed; EXPORT_MODE=full rewrites every sheet.
+EXPORT_MODE  = os.getenv("EXPORT_MODE", "delta")
+SNAPSHOT_DIR = os.getenv("SHEETS_SNAPSHOT_DIR", os.path.join(os.getenv("OUTPUT_DIR", "data"), "_sheets_snapshot"))
+
+# Large tables are written as chunks of at most SHEETS_CHUNK_ROWS rows and
+# SHEETS_BATCH_CELLS cells per values.batchUpdate request, by SHEETS_WORKERS threads
+# sharing the per-user write quota. Each chunk is retried on its own, and finished
+# chunks are recorded in a progress marker so a failed export resumes where it stopped.
+BATCH_CELLS        = int(os.getenv("SHEETS_BATCH_CELLS", "50000"))
+CHUNK_ROWS         = int(os.getenv("SHEETS_CHUNK_ROWS", "2000"))
+WORKERS            = int(os.getenv("SHEETS_WORKERS", "4"))
+WRITES_PER_MINUTE  = int(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))
+MAX_RETRIES        = int(os.getenv("SHEETS_MAX_RETRIES", "5"))
+BACKOFF            = float(os.getenv("SHEETS_BACKOFF", "1.0"))
+
+# Key each sheet is read in order of and diffed by: the staged tables' natural keys,
+# the aggregates' grouping keys and one row per fixture and team for the others.
+# Tables not listed here are keyed on all their columns.
+EXPORT_KEYS = {
+    **TABLE_KEYS,
+    **{name: spec["keys"] for name, spec in AGGREGATES.items()},
+    TEAM_MATCH: ["FixtureID", "TeamID"],
+    WIDE_VIEW:  ["FixtureID", "TeamID"],
+}
+
+
+def open_spreadsheet():
+    import gspread
+
+    # --- Authenticate using the credentials file ---
+    gc = gspread.oauth(credentials_filename=credentials_path, authorized_user_filename=authorized_user_path)
+    return gc.open_by_url(SPREADSHEET_URL)
+
+
+def source_state_path():
+    return os.path.join(SNAPSHOT_DIR, "source.json")
+
+
+def load_source_state():
+    # ETag/Last-Modified of the cached download and the digest of the DB last exported
+    path = source_state_path()
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_source_state(state):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = source_state_path()
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def stream_to(response, path):
+    # Stream a response body to path, replacing it only once complete
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for block in response.iter_content(DOWNLOAD_CHUNK):
+                f.write(block)
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def download_db(state):
+    # --- Load SQLite from GitHub ---
+    # Kept between runs next to the snapshot, so a conditional request can answer
+    # 304 instead of re-sending the file; a changed file is streamed to disk
+    path = os.path.join(SNAPSHOT_DIR, "source.sqlite")
+    headers = {}
+    if os.path.exists(path):
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+    with requests.get(SQLITE_URL, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 304:
+            print("⏭️ Remote database not modified since the last download")
+            return path
+        response.raise_for_status()
+        stream_to(response, path)
+        state["etag"] = response.headers.get("ETag")
+        state["last_modified"] = response.headers.get("Last-Modified")
+    print(f"📥 Downloaded {SQLITE_URL} ({os.path.getsize(path):,} bytes)")
+    return path
+
+
+def download_snapshot(state):
+    # Fetch the published snapshot and rebuild it into source.sqlite; the tables kept
+    # from the last download are only fetched again when their manifest hash moved
+    path = os.path.join(SNAPSHOT_DIR, "source.sqlite")
+    folder = os.path.join(SNAPSHOT_DIR, "source_snapshot")
+    response = requests.get(f"{SNAPSHOT_URL}/{MANIFEST_FILE}", timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    manifest = response.json()
+    cached = state.get("manifest") or {}
+    if os.path.exists(path) and manifest == cached:
+        print("⏭️ Remote snapshot not modified since the last download")
+        return path
+
+    names = [SCHEMA_FILE] + [f"{table}.csv" for table, entry in manifest.items()
+                             if cached.get(table) != entry or not os.path.exists(os.path.join(folder, f"{table}.csv"))]
+    for name in names:
+        with requests.get(f"{SNAPSHOT_URL}/{name}", stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+            response.raise_for_status()
+            stream_to(response, os.path.join(folder, name))
+    for name in os.listdir(folder):
+        if name.endswith(".csv") and name[:-4] not in manifest:
+            os.remove(os.path.join(folder, name))
+    with open(os.path.join(folder, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f)
+    rebuild_db(folder, path)
+    state["manifest"] = manifest
+    print(f"📥 Downloaded {len(names) - 1} of {len(manifest)} tables from {SNAPSHOT_URL}")
+    return path
+
+
+def locate_db(state):
+    # (path, immutable): the snapshot and the download are only ever replaced, never
+    # modified in place, so they can be read without locking
+    if SQLITE_SOURCE != "remote":
+        snapshot_is_current = os.path.exists(SERVE_DB) and (
+            not os.path.exists(DB_FILE) or os.path.getmtime(SERVE_DB) >= os.path.getmtime(DB_FILE))
+        if snapshot_is_current:
+            print(f"📁 Reading serving snapshot {SERVE_DB}")
+            return SERVE_DB, True
+        if SQLITE_SOURCE == "local" or os.path.exists(DB_FILE):
+            print(f"📁 Reading local database {DB_FILE}")
+            return DB_FILE, False
+    return (download_db(state) if SQLITE_URL else download_snapshot(state)), True
+
+
+def read_tables(conn):
+    # Table/view name -> DataFrame. Views too (statistics_dim is a view), but not
+    # the builder's _-prefixed bookkeeping
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE '\\_%' ESCAPE '\\' ORDER BY name;")]
+    tables = {}
+    for name in names:
+        order = ", ".join(f'"{key}"' for key in EXPORT_KEYS.get(name, []))
+        tables[name] = pd.read_sql_query(f'SELECT * FROM "{name}"' + (f" ORDER BY {order}" if order else ""), conn)
+    return tables
+
+
+def to_values(df):
+    # Header + rows as the strings a sheet shows; NULL becomes an empty cell
+    cells = df.astype(object).where(df.notna(), "")
+    return [list(map(str, df.columns))] + [[str(value) for value in row] for row in cells.itertuples(index=False)]
+
+
+def column_letter(col):
+    letters = ""
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def a1_range(title, first_row, rows, width):
+    # first_row is 0-based; A1 rows are 1-based
+    sheet = "'" + title.replace("'", "''") + "'"
+    return f"{sheet}!A{first_row + 1}:{column_letter(width)}{first_row + rows}"
+
+
+def row_keys(table, header):
+    # Positions of the columns identifying a row of `table`
+    keys = EXPORT_KEYS.get(table, [])
+    if not keys or not set(keys) <= set(header):
+        return list(range(len(header)))
+    return [header.index(key) for key in keys]
+
+
+def changed_blocks(old, new, keys):
+    # Lays the rows of `new` out on the sheet holding `old` (header first in both;
+    # `old` is empty for a blank sheet) and returns (layout, runs of rows to write as
+    # (first row, rows)). Rows are matched on the `keys` positions and a key keeps the
+    # row it already has, so only changed, added and removed keys are written: added
+    # keys take the rows of removed ones, then go after the last row, and removed
+    # rows nobody takes are blanked.
+    width = max(len(new[0]), len(old[0]) if old else 0)
+    blank = [""] * width
+    old = [row + [""] * (width - len(row)) for row in old]
+    new = [row + [""] * (width - len(row)) for row in new]
+    slots = {tuple(row[i] for i in keys): position for position, row in enumerate(old[1:], 1) if any(row)}
+    layout = [new[0]] + [None] * max(0, len(old) - 1)
+    added = []
+    for row in new[1:]:
+        position = slots.pop(tuple(row[i] for i in keys), None)
+        if position is None:
+            added.append(row)
+        else:
+            layout[position] = row
+    free = [position for position, row in enumerate(layout) if row is None]
+    for position, row in zip(free, added):
+        layout[position] = row
+    layout = [blank if row is None else row for row in layout] + added[len(free):]
+    while len(layout) > 1 and not any(layout[-1]):
+        layout.pop()
+
+    padded = layout + [blank] * max(0, len(old) - len(layout))
+    blocks = []
+    start = None
+    for i, row in enumerate(padded + [None]):
+        same = row is not None and i < len(old) and old[i] == row
+        if row is not None and not same:
+            start = i if start is None else start
+        elif start is not None:
+            blocks.append((start, padded[start:i]))
+            start = None
+    return layout, blocks
+
+
+def load_snapshot(table):
+    path = os.path.join(SNAPSHOT_DIR, f"{table}.csv")
+    if not os.path.exists(path):
+        return None
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+
+def save_snapshot(table, values):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = os.path.join(SNAPSHOT_DIR, f"{table}.csv")
+    with open(path + ".tmp", "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(values)
+    os.replace(path + ".tmp", path)
+
+
+def snapshot_tables():
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return set()
+    return {os.path.splitext(name)[0] for name in os.listdir(SNAPSHOT_DIR) if name.endswith(".csv")}
+
+
+def values_digest(values):
+    return hashlib.sha256(json.dumps(values, separators=(",", ":")).encode()).hexdigest()
+
+
+def progress_path(table):
+    return os.path.join(SNAPSHOT_DIR, f"{table}.progress.json")
+
+
+def load_progress(table):
+    # {"digest": hash of the values being written, "done": [chunk keys]} of an
+    # export of `table` that did not finish
+    path = progress_path(table)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_progress(table, progress):
+    os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+    path = progress_path(table)
+    with open(path + ".tmp", "w") as f:
+        json.dump(progress, f)
+    os.replace(path + ".tmp", path)
+
+
+def clear_progress(table):
+    if os.path.exists(progress_path(table)):
+        os.remove(progress_path(table))
+
+
+def chunk_key(batch):
+    return "|".join(item["range"] for item in batch)
+
+
+def batched(data):
+    # Split value ranges into values.batchUpdate bodies of about BATCH_CELLS cells
+    batch, cells = [], 0
+    for item in data:
+        size = sum(len(row) for row in item["values"])
+        if batch and cells + size > BATCH_CELLS:
+            yield batch
+            batch, cells = [], 0
+        batch.append(item)
+        cells += size
+    if batch:
+        yield batch
+
+
+def sheet_updates(spreadsheet, worksheets, table, values, full, resuming):
+    # (value ranges that bring the sheet for `table` from its snapshot to `values`,
+    # the sheet's rows afterwards)
+    old = None if full else load_snapshot(table)
+    ws = worksheets.get(table)
+    if ws is None:
+        ws = spreadsheet.add_worksheet(title=table[:100], rows=max(len(values) + 10, 100),
+                                       cols=max(len(values[0]) + 5, 20))
+        worksheets[table] = ws
+        print(f"➕ Added worksheet {table}")
+        old = []
+    elif old is None or old[0] != values[0]:
+        # Unknown contents or a new header: rewrite the whole sheet (a resumed
+        # rewrite already cleared it and must keep the chunks it wrote)
+        if not resuming:
+            ws.clear()
+        old = []
+    layout, blocks = changed_blocks(old, values, row_keys(table, values[0]))
+    rows, width = len(layout), len(layout[0])
+    if ws.row_count < rows or ws.col_count < width:
+        ws.resize(rows=max(ws.row_count, rows + 10), cols=max(ws.col_count, width))
+
+    # Changed runs of rows, each cut into chunks of at most CHUNK_ROWS rows
+    data = []
+    for start, block in blocks:
+        for offset in range(0, len(block), CHUNK_ROWS):
+            chunk = block[offset:offset + CHUNK_ROWS]
+            data.append({"range": a1_range(ws.title, start + offset, len(chunk), len(chunk[0])), "values": chunk})
+    return data, layout
+
+
+def error_status(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def write_chunk(spreadsheet, limiter, batch):
+    # One values.batchUpdate, retried with backoff on quota errors, 5xx and dropped connections
+    for attempt in range(MAX_RETRIES + 1):
+        limiter.acquire()
+        try:
+            return spreadsheet.values_batch_update({"valueInputOption": "USER_ENTERED", "data": batch})
+        except Exception as e:
+            transient = error_status(e) in RETRY_STATUSES or isinstance(e, (requests.ConnectionError, requests.Timeout))
+            if not transient or attempt == MAX_RETRIES:
+                raise
+            time.sleep(min(BACKOFF * 2 ** attempt + random.uniform(0, BACKOFF), MAX_BACKOFF))
+
+
+def export(spreadsheet, tables, full=False, workers=WORKERS):
+    # Sync one worksheet per table; returns the number of rows written
+    worksheets = {ws.title: ws for ws in spreadsheet.worksheets()}
+
+    # Worksheets are only removed for tables this export created and that are gone now
+    for table in sorted(snapshot_tables() - set(tables)):
+        if table in worksheets and len(worksheets) > 1:
+            spreadsheet.del_worksheet(worksheets.pop(table))
+            print(f"🗑️ Deleted worksheet {table}")
+        os.remove(os.path.join(SNAPSHOT_DIR, f"{table}.csv"))
+        clear_progress(table)
+
+    # Plan every table's chunks first (sheet adds/clears/resizes are cheap, serial calls)
+    pending = {}
+    for table, df in tables.items():
+        values = to_values(df)
+        digest = values_digest(values)
+        progress = load_progress(table)
+        resuming = progress is not None and progress["digest"] == digest and table in worksheets
+        # A progress marker for other values means the sheet is half-written: start over
+        data, layout = sheet_updates(spreadsheet, worksheets, table, values,
+                                     full or (progress is not None and not resuming), resuming)
+        done = set(progress["done"]) if resuming else set()
+        chunks = [batch for batch in batched(data) if chunk_key(batch) not in done]
+        if not chunks:
+            print(f"⏭️ {table} unchanged" if not data else f"⏭️ {table} already written by the previous run")
+            save_snapshot(table, layout)
+            clear_progress(table)
+            continue
+        if done:
+            print(f"↩️ Resuming {table}: {len(done)} chunks already written")
+        save_progress(table, {"digest": digest, "done": sorted(done)})
+        pending[table] = {"layout": layout, "digest": digest, "done": done, "chunks": chunks, "left": len(chunks),
+                          "rows": sum(len(item["values"]) for batch in chunks for item in batch)}
+
+    # Write all chunks through a small pool across worksheets
+    limiter = TokenBucket(WRITES_PER_MINUTE)
+    failed = {}
+    written = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(write_chunk, spreadsheet, limiter, batch): (table, batch)
+                   for table, plan in pending.items() for batch in plan["chunks"]}
+        for future in as_completed(futures):
+            table, batch = futures[future]
+            plan = pending[table]
+            try:
+                future.result()
+            except Exception as e:
+                failed.setdefault(table, e)
+                continue
+            plan["done"].add(chunk_key(batch))
+            plan["left"] -= 1
+            save_progress(table, {"digest": plan["digest"], "done": sorted(plan["done"])})
+            if not plan["left"]:
+                # The snapshot only moves once the sheet has all the new values
+                save_snapshot(table, plan["layout"])
+                clear_progress(table)
+                written += plan["rows"]
+                print(f"✔️ Exported {table}: {plan['rows']} rows")
+
+    for table, error in failed.items():
+        print(f"⚠️ {table} partly exported ({pending[table]['left']} chunks left): {error}")
+    if failed:
+        raise RuntimeError(f"{len(failed)} tables did not finish; re-run to resume from the progress markers.")
+    return written
+
+
+def main():
+    full = EXPORT_MODE == "full"
+    state = load_source_state()
+    db_path, immutable = locate_db(state)
+    digest = path_digest(db_path)
+    if not full and digest == state.get("exported"):
+        save_source_state(state)
+        print("⏭️ Database unchanged since the last export, nothing to do.")
+        return
+
+    conn = connect_readonly(db_path, immutable=immutable)
+    try:
+        tables = read_tables(conn)
+    finally:
+        conn.close()
+
+    spreadsheet = open_spreadsheet()
+    written = export(spreadsheet, tables, full=full)
+    # Only a fully successful export (export raises otherwise) moves the marker
+    state["exported"] = digest
+    save_source_state(state)
+    print(f"✅ All tables exported to Google Sheets ({written} rows written).")
+
 
-# --- Open spreadsheet by URL ---
-spreadsheet = gc.open_by_url("https://docs.google.com/spreadsheets/d/1fGHvWjDl8dR9JaRn0tes84BRbguJMGaHLrhhj4iJFmo/edit?usp=sharing")
-
-# --- Delete all worksheets except the first ---
-worksheets = spreadsheet.worksheets()
-for ws in worksheets[1:]:
-    spreadsheet.del_worksheet(ws)
-
-# --- Load SQLite from GitHub (without saving to disk) ---
-sqlite_url = "https://github.com/pythonsnatcher/power_bi/raw/main/football_data.sqlite"
-response = requests.get(sqlite_url)
-sqlite_bytes = response.content
-
-with tempfile.NamedTemporaryFile(delete=False) as tmp:
-    tmp.write(sqlite_bytes)
-    tmp_path = tmp.name
-
-conn = sqlite3.connect(tmp_path)
-
-# --- Get all tables ---
-cursor = conn.cursor()
-cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-tables = [row[0] for row in cursor.fetchall()]
-
-# --- Export first table to existing first worksheet ---
-first_table = tables[0]
-df = pd.read_sql_query(f"SELECT * FROM {first_table}", conn)
-first_ws = worksheets[0]
-first_ws.clear()
-first_ws.update_title(first_table[:100])
-set_with_dataframe(first_ws, df)
-
-# --- Export remaining tables to new worksheets ---
-for table in tables[1:]:
-    print(f"Exporting {table}...")
-    df = pd.read_sql_query(f"SELECT * FROM {table}", conn)
-    new_ws = spreadsheet.add_worksheet(title=table[:100], rows=max(len(df)+10, 100), cols=max(len(df.columns)+5, 20))
-    set_with_dataframe(new_ws, df)
-
-print("✅ All tables exported to Google Sheets.")
+if __name__ == "__main__":
+    main()
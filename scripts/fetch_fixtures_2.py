@@ -1,94 +1,112 @@
 import os
-import requests
+import time
 import pandas as pd
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-API_KEY = os.getenv("API_FOOTBALL_KEY")
-if not API_KEY:
-    raise ValueError("Please set API_FOOTBALL_KEY in your .env file.")
-
-# Hardcoded variables
-SEASON = 2025
-LEAGUE_ID = 351
-OUTPUT_DIR = "data"
-OUTPUT_FILE = os.path.join(OUTPUT_DIR, "fixture_dim.csv")
-
-HEADERS = {
-    "x-rapidapi-key": API_KEY,
-    "x-rapidapi-host": "api-football-v1.p.rapidapi.com"
-}
-PARAMS = {
-    "season": SEASON,
-    "league": LEAGUE_ID
-}
-
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-# Fetch data from API
-resp = requests.get("https://api-football-v1.p.rapidapi.com/v3/fixtures",
-                    headers=HEADERS, params=PARAMS)
-resp.raise_for_status()
-payload = resp.json().get("response", [])
-
-rows = []
-for entry in payload:
-    fixture = entry.get("fixture", {})
-    league = entry.get("league", {})
-    teams = entry.get("teams", {})
-
-    rows.append({
-        "FixtureID": fixture.get("id"),
-        "Date": fixture.get("date"),
-        "Timestamp": fixture.get("timestamp"),
-        "VenueID": fixture.get("venue", {}).get("id"),
-        "HomeTeamID": teams.get("home", {}).get("id"),
-        "AwayTeamID": teams.get("away", {}).get("id"),
-        "Status": fixture.get("status", {}).get("short"),
-        "Round": league.get("round"),
-        "LeagueID": league.get("id"),
-        "Season": league.get("season")
-    })
-
-df_new = pd.DataFrame(rows)
-print(f"\n✔️ Fetched {len(df_new)} fixtures.")
-
-# Deduplication helper function
-def row_to_tuple(row):
-    keys = ["FixtureID", "Date", "Timestamp", "VenueID", "HomeTeamID", "AwayTeamID",
-            "Status", "Round", "LeagueID", "Season"]
-    return tuple(row[key] if key in row else None for key in keys)
-
-new_set = set(row_to_tuple(row) for _, row in df_new.iterrows())
-
-# Load existing data if exists
-existing_set = set()
-if os.path.exists(OUTPUT_FILE):
-    df_existing = pd.read_csv(OUTPUT_FILE)
-    existing_set = set(row_to_tuple(row) for _, row in df_existing.iterrows())
-
-# Combine sets to deduplicate
-combined_set = existing_set.union(new_set)
-
-# Convert back to DataFrame
-all_keys = ["FixtureID", "Date", "Timestamp", "VenueID", "HomeTeamID", "AwayTeamID",
-            "Status", "Round", "LeagueID", "Season"]
-df_combined = pd.DataFrame([dict(zip(all_keys, t)) for t in combined_set], columns=all_keys)
-
-# Sort by FixtureID for consistent order
-df_combined.sort_values("FixtureID", inplace=True)
-
-# User menu
-print("\nOptions:\n1. Display top 100 rows\n2. Save to CSV")
-#choice = input("Enter choice (1 or 2): ")
-choice = "2"
-
-
-if choice == "1":
-    print(df_combined.head(100))
-elif choice == "2":
-    df_combined.to_csv(OUTPUT_FILE, index=False)
-    print(f"📁 Saved to {OUTPUT_FILE}")
-else:
-    print("❌ Invalid choice.")
+
+from api_client import ApiClient
+from flatten import columns, to_frame
+from staging import merge_table, read_table, table_path, write_table
+from upsert import TABLE_KEYS, upsert
+
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "data")
+OUTPUT_FILE = table_path(OUTPUT_DIR, "fixture_dim")
+LEAGUE_FILE = os.getenv("LEAGUE_FILE", table_path(OUTPUT_DIR, "league_dim"))
+
+# Backfill matrix: FIXTURE_LEAGUES=351,39 (or "all" for every league in league_dim)
+# crossed with FIXTURE_SEASONS=2023,2024,2025
+FIXTURE_LEAGUES = os.getenv("FIXTURE_LEAGUES", "351")
+FIXTURE_SEASONS = os.getenv("FIXTURE_SEASONS", "2025")
+
+# Each league/season partition is written to its own file as soon as it arrives.
+# A partition file is reused (the checkpoint) when its season is over, or when it
+# is younger than PARTITION_MAX_AGE_HOURS, so an interrupted backfill resumes
+# where it stopped while the current season still gets refreshed.
+PARTITION_DIR = os.path.join(OUTPUT_DIR, "_fixture_parts")
+PARTITION_MAX_AGE_HOURS = float(os.getenv("PARTITION_MAX_AGE_HOURS", "12"))
+FINAL_STATUSES = {"FT", "AET", "PEN", "AWD", "WO", "CANC", "ABD"}
+
+COLUMNS = columns("fixture_dim")
+
+
+def partitions():
+    if FIXTURE_LEAGUES == "all":
+        if not os.path.exists(LEAGUE_FILE):
+            raise FileNotFoundError(f"{LEAGUE_FILE} not found; run fetch_leagues.py first.")
+        leagues = sorted(read_table(LEAGUE_FILE, columns=["LeagueID"])["LeagueID"].dropna().astype(int).unique())
+    else:
+        leagues = [int(x) for x in FIXTURE_LEAGUES.split(",")]
+    seasons = [int(x) for x in FIXTURE_SEASONS.split(",")]
+    return [{"league": int(league), "season": season} for league in leagues for season in seasons]
+
+
+def partition_file(params):
+    return os.path.join(PARTITION_DIR, f"league={params['league']}_season={params['season']}.csv")
+
+
+def is_checkpointed(params):
+    path = partition_file(params)
+    if not os.path.exists(path):
+        return False
+    # Checkpoints written before a column was added to COLUMNS are fetched again
+    part = pd.read_csv(path)
+    if not set(COLUMNS) <= set(part.columns):
+        return False
+    if time.time() - os.path.getmtime(path) < PARTITION_MAX_AGE_HOURS * 3600:
+        return True
+    return not part.empty and part["Status"].isin(FINAL_STATUSES).all()
+
+
+def write_partition(params, df):
+    # Write to a temp file and rename, so a crash never leaves a half-written checkpoint
+    path = partition_file(params)
+    df.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+
+def main():
+    os.makedirs(PARTITION_DIR, exist_ok=True)
+
+    matrix = partitions()
+    todo = [params for params in matrix if not is_checkpointed(params)]
+    print(f"📋 {len(matrix)} league/season partitions, {len(matrix) - len(todo)} already checkpointed")
+
+    # Fetch outstanding partitions concurrently under the shared rate limit
+    failed = 0
+    with ApiClient() as client:
+        for params, payload, error in client.fetch_all("fixtures", todo):
+            if error is not None:
+                failed += 1
+                print(f"⚠️ Skipped league {params['league']} season {params['season']} due to error: {error}")
+                continue
+            df = to_frame("fixture_dim", payload.get("response", []))
+            write_partition(params, df)
+            print(f"✔️ Fetched {len(df)} fixtures for league {params['league']} season {params['season']}")
+
+    # Merge every available partition into fixture_dim in one pass
+    parts = [pd.read_csv(partition_file(params)) for params in matrix if os.path.exists(partition_file(params))]
+    parts = [part for part in parts if not part.empty]
+    df_new = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=COLUMNS)
+    df_new = upsert(None, df_new, TABLE_KEYS["fixture_dim"])
+    print(f"\n✔️ {len(df_new)} fixtures across {len(parts)} partitions ({failed} partitions failed).")
+
+    # Upsert into existing data on FixtureID (last write wins, so Status updates replace old rows)
+    df_combined = merge_table(OUTPUT_FILE, df_new, TABLE_KEYS["fixture_dim"])
+
+    # User menu
+    print("\nOptions:\n1. Display top 100 rows\n2. Save to staging")
+    #choice = input("Enter choice (1 or 2): ")
+    choice = "2"
+
+    if choice == "1":
+        print(df_combined.head(100))
+    elif choice == "2":
+        write_table(OUTPUT_FILE, df_combined)
+        print(f"📁 Saved to {OUTPUT_FILE}")
+    else:
+        print("❌ Invalid choice.")
+
+    if failed:
+        raise SystemExit(f"❌ {failed} partitions failed; re-run to resume from the checkpoints.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,27 @@
-from dotenv import load_dotenv
 import os
-import requests
-import pandas as pd
 
-# Load .env
-load_dotenv()
-
-API_KEY     = os.getenv("API_FOOTBALL_KEY")
-if not API_KEY:
-    raise ValueError("Please set API_FOOTBALL_KEY in your .env file.")
+from api_client import ApiClient
+from flatten import to_frame
+from staging import table_path, write_table
 
 SEASON      = int(os.getenv("FOOTBALL_SEASON", "2025"))
 OUTPUT_DIR  = os.getenv("OUTPUT_DIR", "data")
-OUTPUT_FILE = os.path.join(OUTPUT_DIR, "league_dim.csv")
+OUTPUT_FILE = table_path(OUTPUT_DIR, "league_dim")
 
-HEADERS = {
-    "x-rapidapi-key": API_KEY,
-    "x-rapidapi-host": "api-football-v1.p.rapidapi.com"
-}
 PARAMS = {"season": SEASON}
 
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 # Fetch and normalize
-resp = requests.get("https://api-football-v1.p.rapidapi.com/v3/leagues",
-                    headers=HEADERS, params=PARAMS)
-resp.raise_for_status()
-payload = resp.json().get("response", [])
+with ApiClient() as client:
+    data = client.get("leagues", PARAMS)
+# An errors block comes with an empty response; staging it would empty league_dim
+if data.get("errors"):
+    raise SystemExit(f"❌ /leagues failed: {data['errors']}")
+payload = data.get("response", [])
 
-rows = []
-for entry in payload:
-    league = entry["league"]
-    rows.append({
-        "LeagueID":   league["id"],
-        "LeagueName": league["name"],
-        "Season":     SEASON
-    })
+df = to_frame("league_dim", payload).assign(Season=SEASON)
 
 # Save minimal dimension
-pd.DataFrame(rows).to_csv(OUTPUT_FILE, index=False)
-print(f"Saved {len(rows)} leagues → {OUTPUT_FILE}")
+write_table(OUTPUT_FILE, df)
+print(f"Saved {len(df)} leagues → {OUTPUT_FILE}")
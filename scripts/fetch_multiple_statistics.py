@@ -1,88 +1,190 @@
 import os
-import requests
-import pandas as pd
-from dotenv import load_dotenv
 import time
 
-# Load environment variables
-load_dotenv()
+import numpy as np
+import pandas as pd
 
-API_KEY     = os.getenv("API_FOOTBALL_KEY")
-if not API_KEY:
-    raise ValueError("Please set API_FOOTBALL_KEY in your .env file.")
+from api_client import ApiClient
+from response_cache import FOREVER
+from staging import read_table, table_path
+from statistics_model import FACT_TABLE, flatten, migrate_wide, save_statistics
 
-FIXTURE_FILE = os.getenv("FIXTURE_FILE", "data/fixture_dim.csv")
+FIXTURE_FILE = os.getenv("FIXTURE_FILE", table_path("data", "fixture_dim"))
 OUTPUT_DIR   = os.getenv("OUTPUT_DIR", "../data")
-OUTPUT_FILE  = os.path.join(OUTPUT_DIR, "statistics_dim.csv")
-
-HEADERS = {
-    "x-rapidapi-key": API_KEY,
-    "x-rapidapi-host": "api-football-v1.p.rapidapi.com"
-}
+OUTPUT_FILE  = table_path(OUTPUT_DIR, FACT_TABLE)
+STATE_FILE   = os.path.join(OUTPUT_DIR, "_statistics_fetch_state.csv")
+
+# Incremental mode only requests finished fixtures that are missing from the
+# output or whose status/kick-off changed since they were last fetched.
+# Set INCREMENTAL=0 to re-request every fixture.
+INCREMENTAL = os.getenv("INCREMENTAL", "1") == "1"
+# The API publishes statistics a while after full time, so a fixture that came back
+# without them is asked again on every run until STATS_RETRY_HOURS after kick-off
+RETRY_HOURS = float(os.getenv("STATS_RETRY_HOURS", "48"))
+FINISHED_STATUSES = {"FT", "AET", "PEN"}
+STATE_COLUMNS = ["FixtureID", "Status", "Timestamp"]
+
+# STATS_SEASONS=2024,2025 limits the run to those seasons; with Parquet staging only
+# their partitions of fixture_dim are read
+STATS_SEASONS = os.getenv("STATS_SEASONS")
+
+# STATS_MODE=batched asks /fixtures?ids=a-b-c for up to BATCH_SIZE fixtures per call,
+# which embeds each fixture's statistics; fixtures a batch does not return, or returns
+# without statistics, are then fetched one by one from /fixtures/statistics.
+# STATS_MODE=single only uses the latter.
+STATS_MODE = os.getenv("STATS_MODE", "batched")
+MAX_BATCH_SIZE = 20
+BATCH_SIZE = min(MAX_BATCH_SIZE, int(os.getenv("STATS_BATCH_SIZE", str(MAX_BATCH_SIZE))))
+if BATCH_SIZE <= 0:
+    raise ValueError(f"STATS_BATCH_SIZE must be between 1 and {MAX_BATCH_SIZE}")
+
+
+def differs(a, b):
+    # Element-wise a != b, with a missing value on both sides counting as equal
+    return a.ne(b) & ~(a.isna() & b.isna())
+
+
+def select_pending(fixtures_df):
+    # -> (fixtures to fetch, IDs among them whose cached answer is stale: Status or
+    # Timestamp changed, or the last answer had no stats)
+    finished = fixtures_df[fixtures_df["Status"].isin(FINISHED_STATUSES)]
+
+    # Fetched-key index: distinct (FixtureID, TeamID) pairs already in statistics_fact
+    if os.path.exists(OUTPUT_FILE):
+        fetched = read_table(OUTPUT_FILE, columns=["FixtureID", "TeamID"]).drop_duplicates()
+        teams_fetched = fetched.groupby("FixtureID").size()
+    else:
+        teams_fetched = pd.Series(dtype="int64")
+    missing = (finished["FixtureID"].map(teams_fetched).fillna(0) < 2).to_numpy()
+
+    # Fixtures whose Status/Timestamp moved since the stats were fetched. A fixture
+    # in the state file that came back without stats is retried within RETRY_HOURS
+    # of kick-off, then left alone until it changes.
+    changed = np.zeros(len(finished), dtype=bool)
+    if os.path.exists(STATE_FILE):
+        state = pd.read_csv(STATE_FILE)
+        merged = finished[STATE_COLUMNS].merge(state, on="FixtureID", how="left", suffixes=("", "_last"))
+        seen = merged["FixtureID"].isin(state["FixtureID"]).to_numpy()
+        changed = seen & (differs(merged["Status"], merged["Status_last"])
+                          | differs(merged["Timestamp"], merged["Timestamp_last"])).to_numpy()
+        recent = (pd.to_numeric(finished["Timestamp"], errors="coerce") >= time.time() - RETRY_HOURS * 3600).to_numpy()
+        missing = missing & (~seen | recent)
+        changed = changed | (seen & missing)
+
+    return finished[missing | changed], set(finished.loc[changed, "FixtureID"])
+
+
+def save_state(fixtures_df, fetched_ids):
+    # Remember the status each fixture had when its stats were fetched
+    if "Status" not in fixtures_df.columns:
+        return
+    fetched_state = fixtures_df.loc[fixtures_df["FixtureID"].isin(fetched_ids), STATE_COLUMNS]
+    if os.path.exists(STATE_FILE):
+        previous = pd.read_csv(STATE_FILE)
+        fetched_state = pd.concat([previous[~previous["FixtureID"].isin(fetched_ids)], fetched_state])
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    fetched_state.sort_values("FixtureID").to_csv(STATE_FILE, index=False)
+
+
+def fetch_single(client, fixture_ids, ttl):
+    # One /fixtures/statistics call per fixture -> [(fixture_id, response)]
+    responses = []
+    params_list = [{"fixture": fixture_id} for fixture_id in fixture_ids]
+    for params, payload, error in client.fetch_all("fixtures/statistics", params_list, ttl=ttl):
+        fixture_id = params["fixture"]
+        if error is not None:
+            print(f"⚠️ Skipped fixture {fixture_id} due to error: {error}")
+            continue
+        responses.append((fixture_id, payload.get("response", [])))
+        print(f"✔️ Fetched stats for fixture {fixture_id}")
+    return responses
+
+
+def fetch_batched(client, fixture_ids, ttl):
+    # /fixtures?ids= in batches; each returned fixture's embedded "statistics" block
+    # has the same per-team shape as a /fixtures/statistics response. A missing or
+    # empty block counts as not returned: the batch answer may simply omit it.
+    responses = []
+    missing = []
+    batches = [fixture_ids[i:i + BATCH_SIZE] for i in range(0, len(fixture_ids), BATCH_SIZE)]
+    params_list = [{"ids": "-".join(str(fixture_id) for fixture_id in batch)} for batch in batches]
+    for params, payload, error in client.fetch_all("fixtures", params_list, ttl=ttl):
+        batch = [int(x) for x in params["ids"].split("-")]
+        if error is None and payload.get("errors"):
+            error = payload["errors"]
+        if error is not None:
+            print(f"⚠️ Batch of {len(batch)} fixtures failed ({error}); fetching them one by one")
+            missing += batch
+            continue
+        returned = {}
+        for entry in payload.get("response", []):
+            if entry.get("statistics"):
+                returned[entry.get("fixture", {}).get("id")] = entry["statistics"]
+        responses += [(fixture_id, returned[fixture_id]) for fixture_id in batch if fixture_id in returned]
+        not_returned = [fixture_id for fixture_id in batch if fixture_id not in returned]
+        missing += not_returned
+        print(f"✔️ Fetched stats for {len(batch) - len(not_returned)} of {len(batch)} fixtures in one call")
+    if missing:
+        print(f"🔁 {len(missing)} fixtures missing from batches; falling back to /fixtures/statistics")
+        responses += fetch_single(client, missing, ttl)
+    return responses
+
+
+# Statistics staged wide by older versions are converted to the long tables first
+migrate_wide(OUTPUT_DIR)
 
 # Read fixture IDs
 if not os.path.exists(FIXTURE_FILE):
     raise FileNotFoundError(f"{FIXTURE_FILE} not found.")
 
-fixtures_df = pd.read_csv(FIXTURE_FILE)
-fixture_ids = fixtures_df["FixtureID"].dropna().astype(int).tolist()
-
-print(f"📋 Found {len(fixture_ids)} fixtures")
-
-rows = []
-for fixture_id in fixture_ids:
-    try:
-        url = "https://api-football-v1.p.rapidapi.com/v3/fixtures/statistics"
-        params = {"fixture": fixture_id}
-        resp = requests.get(url, headers=HEADERS, params=params)
-        resp.raise_for_status()
-        time.sleep(1)
-
-        stat_data = resp.json().get("response", [])
-        for team_stats in stat_data:
-            team_id = team_stats["team"]["id"]
-            stats = team_stats["statistics"]
-            time.sleep(1)
-
-            row = {"FixtureID": fixture_id, "TeamID": team_id}
-            for stat in stats:
-                key = stat["type"].replace(" ", "_").replace("%", "Percent")
-                row[key] = stat["value"]
-                time.sleep(1)
-            rows.append(row)
-        print(f"✔️ Fetched stats for fixture {fixture_id}")
-
-    except Exception as e:
-        print(f"⚠️ Skipped fixture {fixture_id} due to error: {e}")
-
-df_new = pd.DataFrame(rows)
-
-# Deduplicate and merge with existing data
-def row_to_tuple(row):
-    return tuple(row[col] if col in row else None for col in sorted(row.keys()))
-
-new_set = set(row_to_tuple(row) for _, row in df_new.iterrows())
-
-existing_set = set()
-if os.path.exists(OUTPUT_FILE):
-    df_existing = pd.read_csv(OUTPUT_FILE)
-    existing_set = set(row_to_tuple(row) for _, row in df_existing.iterrows())
-
-combined_set = existing_set.union(new_set)
-all_columns = sorted({key for row in rows for key in row.keys()} | {"FixtureID", "TeamID"})
-df_combined = pd.DataFrame([dict(zip(all_columns, t)) for t in combined_set], columns=all_columns)
-
-df_combined.sort_values(by=["FixtureID", "TeamID"], inplace=True)
+# Only the columns the selection needs are read
+filters = [("Season", "in", [int(x) for x in STATS_SEASONS.split(",")])] if STATS_SEASONS else None
+fixtures_df = read_table(FIXTURE_FILE, columns=STATE_COLUMNS, filters=filters)
+fixtures_df = fixtures_df.dropna(subset=["FixtureID"]).astype({"FixtureID": int})
+print(f"📋 Found {len(fixtures_df)} fixtures")
+
+changed_ids = set()
+if INCREMENTAL and "Status" in fixtures_df.columns:
+    fixtures_df, changed_ids = select_pending(fixtures_df)
+    print(f"🔎 {len(fixtures_df)} finished fixtures missing or changed since last run")
+
+fixture_ids = fixtures_df["FixtureID"].tolist()
+if not fixture_ids:
+    print("✅ Statistics already up to date.")
+    raise SystemExit(0)
+
+with ApiClient() as client:
+    # Stats of a finished fixture never change, so incremental runs cache them for good.
+    # Fixtures whose status or kick-off changed, or that are retried for missing
+    # stats, skip the cache (ttl=0): their cached answer is the one that went stale.
+    ttl = FOREVER if INCREMENTAL else None
+    fetch = fetch_batched if STATS_MODE == "batched" else fetch_single
+    responses = fetch(client, [fixture_id for fixture_id in fixture_ids if fixture_id not in changed_ids], ttl)
+    responses += fetch(client, [fixture_id for fixture_id in fixture_ids if fixture_id in changed_ids], 0)
+fetched_ids = [fixture_id for fixture_id, _ in responses]
+
+# One row per fixture, team and stat type
+df_new = flatten(responses)
+if df_new.empty:
+    # Fixtures that came back without stats are still recorded: they are retried
+    # for RETRY_HOURS after kick-off, and after that only when they change
+    save_state(fixtures_df, fetched_ids)
+    print("⚠️ No statistics returned; leaving existing output untouched.")
+    raise SystemExit(0)
+
+print(f"\n✔️ {len(df_new)} stat values across {df_new['StatType'].nunique()} stat types")
 
 # Save or display
-print("\nOptions:\n1. Display all rows\n2. Save to CSV")
+print("\nOptions:\n1. Display all rows\n2. Save to staging")
 choice = 2
 
 if choice == 1:
-    print(df_combined)
+    print(df_new)
 elif choice == 2:
+    # Upsert into statistics_fact on (FixtureID, TeamID, StatTypeID)
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    df_combined.to_csv(OUTPUT_FILE, index=False)
-    print(f"📁 Saved to {OUTPUT_FILE}")
+    df_combined, stat_types = save_statistics(OUTPUT_DIR, df_new)
+    print(f"📁 Saved {len(df_combined)} rows to {OUTPUT_FILE} ({len(stat_types)} stat types)")
+    save_state(fixtures_df, fetched_ids)
 else:
     print("❌ Invalid choice.")
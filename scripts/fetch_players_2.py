@@ -1,84 +1,82 @@
 import os
-import requests
-import pandas as pd
-from dotenv import load_dotenv
-
-# Load .env variables
-load_dotenv()
-API_KEY = os.getenv("API_FOOTBALL_KEY")
-OUTPUT_DIR = os.getenv("OUTPUT_DIR", "../data")
-OUTPUT_FILE = os.path.join(OUTPUT_DIR, "player_dim.csv")
-
-headers = {
-    "x-rapidapi-key": API_KEY,
-    "x-rapidapi-host": "api-football-v1.p.rapidapi.com"
-}
-
-LEAGUE_ID = 10  # Change as needed
-SEASON = 2025
-
-players = []
-
-# API endpoint: /players?league={league}&season={season}
-url = f"https://api-football-v1.p.rapidapi.com/v3/players"
-params = {"league": LEAGUE_ID, "season": SEASON}
-
-response = requests.get(url, headers=headers, params=params)
-response.raise_for_status()
-data = response.json().get("response", [])
-
-for entry in data:
-    player_info = entry.get("player", {})
-    stats = entry.get("statistics")[0] if entry.get("statistics") else {}
+from contextlib import ExitStack
 
-    team_info = stats.get("team", {}) if stats else {}
-
-    players.append({
-        "PlayerID": player_info.get("id"),
-        "PlayerName": player_info.get("name"),
-        "TeamID": team_info.get("id"),
-        "Nationality": player_info.get("nationality"),
-        "Position": stats.get("games", {}).get("position") if stats else None,
-        "DateOfBirth": player_info.get("birth", {}).get("date") if player_info.get("birth") else None,
-        "Height": player_info.get("height"),
-        "Weight": player_info.get("weight"),
-    })
-
-df_new = pd.DataFrame(players)
-print(f"\n✔️ Fetched {len(df_new)} players from API.")
-
-# Deduplication helper function (convert row to tuple)
-def row_to_tuple(row):
-    keys = ["PlayerID", "PlayerName", "TeamID", "Nationality", "Position", "DateOfBirth", "Height", "Weight"]
-    return tuple(row[key] if key in row else None for key in keys)
-
-new_set = set(row_to_tuple(row) for _, row in df_new.iterrows())
-
-# Load existing players if file exists
-existing_set = set()
-if os.path.exists(OUTPUT_FILE):
-    df_existing = pd.read_csv(OUTPUT_FILE)
-    existing_set = set(row_to_tuple(row) for _, row in df_existing.iterrows())
-
-# Combine sets to deduplicate
-combined_set = existing_set.union(new_set)
+import pandas as pd
 
-# Convert back to DataFrame
-all_keys = ["PlayerID", "PlayerName", "TeamID", "Nationality", "Position", "DateOfBirth", "Height", "Weight"]
-df_combined = pd.DataFrame([dict(zip(all_keys, t)) for t in combined_set], columns=all_keys)
+from api_client import ApiClient
+from flatten import empty_frame, to_frame
+from staging import merge_table, table_path, write_table
+from upsert import TABLE_KEYS, upsert
 
-# Sort by PlayerID for consistent ordering
-df_combined.sort_values("PlayerID", inplace=True)
+OUTPUT_DIR = os.getenv("OUTPUT_DIR", "../data")
+OUTPUT_FILE = table_path(OUTPUT_DIR, "player_dim")
+# Pages are appended to one file per season as they arrive, then merged into
+# OUTPUT_FILE oldest season first, so a player's newest season sets their team
+STAGING_FILE = os.path.join(OUTPUT_DIR, "_player_dim.partial.{season}.csv")
+
+# Comma-separated leagues and seasons to walk, e.g. PLAYER_LEAGUES=10,39 PLAYER_SEASONS=2024,2025
+LEAGUE_IDS = [int(x) for x in os.getenv("PLAYER_LEAGUES", "10").split(",")]
+SEASONS = [int(x) for x in os.getenv("PLAYER_SEASONS", "2025").split(",")]
+
+# The staging file is merged MERGE_CHUNK_ROWS rows at a time, so it is never held in memory whole
+MERGE_CHUNK_ROWS = int(os.getenv("MERGE_CHUNK_ROWS", "50000"))
+
+def write_page(staging, params, payload, error):
+    # Stream one page straight to the staging file; returns (rows written, total pages)
+    label = f"league {params['league']} season {params['season']} page {params.get('page', 1)}"
+    if error is not None:
+        print(f"⚠️ Skipped {label} due to error: {error}")
+        return 0, 0
+    df = to_frame("player_dim", payload.get("response", []))
+    df.to_csv(staging, header=False, index=False)
+    print(f"✔️ Fetched {len(df)} players for {label}")
+    return len(df), payload.get("paging", {}).get("total", 1)
+
+
+os.makedirs(OUTPUT_DIR, exist_ok=True)
+fetched = 0
+
+with ApiClient() as client, ExitStack() as stack:
+    staging = {}
+    for season in SEASONS:
+        path = STAGING_FILE.format(season=season)
+        staging[season] = stack.enter_context(open(path, "w", newline="", encoding="utf-8"))
+        empty_frame("player_dim").to_csv(staging[season], index=False)
+
+    # /players is paginated: page 1 of every league/season tells us how many pages follow
+    first_pages = [{"league": league, "season": season} for league in LEAGUE_IDS for season in SEASONS]
+    remaining = []
+    for params, payload, error in client.fetch_all("players", first_pages):
+        count, total_pages = write_page(staging[params["season"]], params, payload, error)
+        fetched += count
+        remaining += [dict(params, page=page) for page in range(2, total_pages + 1)]
+
+    # Later pages are independent, so they all go through the pool together
+    for params, payload, error in client.fetch_all("players", remaining):
+        count, _ = write_page(staging[params["season"]], params, payload, error)
+        fetched += count
+
+print(f"\n✔️ Fetched {fetched} players from API.")
+
+# Upsert into existing players on PlayerID (last write wins), one chunk of pages at a time
+keys = TABLE_KEYS["player_dim"]
+df_combined = merge_table(OUTPUT_FILE, empty_frame("player_dim"), keys)
+for season in sorted(SEASONS):
+    for chunk in pd.read_csv(STAGING_FILE.format(season=season), chunksize=MERGE_CHUNK_ROWS):
+        df_combined = upsert(df_combined, chunk, keys)
 
 # User menu
-print("\nOptions:\n1. Display top 100 rows\n2. Save to CSV\n")
-choice = input("Enter choice (1 or 2): ")
+print("\nOptions:\n1. Display top 100 rows\n2. Save to staging\n")
+#choice = input("Enter choice (1 or 2): ")
+choice = "2"
 
 if choice == "1":
     print(df_combined.head(100))
 elif choice == "2":
     os.makedirs(OUTPUT_DIR, exist_ok=True)
-    df_combined.to_csv(OUTPUT_FILE, index=False)
+    write_table(OUTPUT_FILE, df_combined)
     print(f"📁 Data saved to {OUTPUT_FILE}")
+    for season in SEASONS:
+        os.remove(STAGING_FILE.format(season=season))
 else:
     print("❌ Invalid choice.")
@@ -0,0 +1,78 @@
+import os
+import pandas as pd
+
+from api_client import ApiClient
+from flatten import empty_frame, to_frame
+from staging import merge_table, read_table, table_path, write_table
+from upsert import TABLE_KEYS
+
+# One /v3/teams request per league/season feeds both team_dim and stadium_dim
+OUTPUT_DIR   = os.getenv("OUTPUT_DIR", "../data")
+TEAM_FILE    = table_path(OUTPUT_DIR, "team_dim")
+STADIUM_FILE = table_path(OUTPUT_DIR, "stadium_dim")
+LEAGUE_FILE  = os.getenv("LEAGUE_FILE", table_path(OUTPUT_DIR, "league_dim"))
+
+# TEAM_LEAGUES=351,39 overrides the leagues read from league_dim;
+# TEAM_SEASONS=2024,2025 overrides the season listed for each league
+TEAM_LEAGUES = os.getenv("TEAM_LEAGUES")
+TEAM_SEASONS = os.getenv("TEAM_SEASONS")
+DEFAULT_SEASON = int(os.getenv("FOOTBALL_SEASON", "2025"))
+
+
+def league_seasons():
+    if TEAM_LEAGUES:
+        pairs = pd.DataFrame({"LeagueID": [int(x) for x in TEAM_LEAGUES.split(",")], "Season": DEFAULT_SEASON})
+    elif os.path.exists(LEAGUE_FILE):
+        pairs = read_table(LEAGUE_FILE, columns=["LeagueID", "Season"])
+    else:
+        raise FileNotFoundError(f"{LEAGUE_FILE} not found; run fetch_leagues.py or set TEAM_LEAGUES.")
+    if TEAM_SEASONS:
+        seasons = pd.DataFrame({"Season": [int(x) for x in TEAM_SEASONS.split(",")]})
+        pairs = pairs[["LeagueID"]].merge(seasons, how="cross")
+    pairs = pairs.dropna().astype(int).drop_duplicates()
+    return [{"league": league, "season": season} for league, season in pairs.itertuples(index=False)]
+
+
+params_list = league_seasons()
+print(f"📋 Fetching teams and venues for {len(params_list)} league/season pairs")
+
+teams = []
+stadiums = []
+with ApiClient() as client:
+    for params, payload, error in client.fetch_all("teams", params_list):
+        if error is not None:
+            print(f"⚠️ Skipped league {params['league']} season {params['season']} due to error: {error}")
+            continue
+
+        # Each entry carries both the team and its home venue
+        entries = payload.get("response", [])
+        teams.append(to_frame("team_dim", entries))
+        stadiums.append(to_frame("stadium_dim", entries))
+
+df_teams = pd.concat(teams, ignore_index=True) if teams else empty_frame("team_dim")
+df_stadiums = pd.concat(stadiums, ignore_index=True) if stadiums else empty_frame("stadium_dim")
+print(f"\n✔️ Fetched {len(df_teams)} teams and {len(df_stadiums)} stadiums from API.")
+
+# Upsert both dimensions on their natural keys (last write wins)
+team_combined = merge_table(TEAM_FILE, df_teams, TABLE_KEYS["team_dim"])
+stadium_combined = merge_table(STADIUM_FILE, df_stadiums, TABLE_KEYS["stadium_dim"])
+
+# Create UUID column (Country_TeamID)
+team_combined["UUID"] = team_combined["Country"].astype(str) + "_" + team_combined["TeamID"].astype(str)
+
+print(f"📁 Merged {len(team_combined)} teams and {len(stadium_combined)} stadiums in total.")
+
+# User menu
+print("\nOptions:\n1. Display top 100 rows\n2. Save to staging\n")
+choice = "2"
+
+if choice == "1":
+    print(team_combined.head(100))
+    print(stadium_combined.head(100))
+elif choice == "2":
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    write_table(TEAM_FILE, team_combined)
+    write_table(STADIUM_FILE, stadium_combined)
+    print(f"📁 Data saved to {TEAM_FILE} and {STADIUM_FILE}")
+else:
+    print("❌ Invalid choice.")
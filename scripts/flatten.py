@@ -0,0 +1,242 @@
+import os
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# pyarrow is optional: without it every spec is flattened by the Python engine
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
+# Declarative flattening of API-Football payloads into DataFrames, shared by the
+# fetchers. Each spec maps output columns to dotted paths into one "response"
+# entry ("fixture.venue.id"; a number indexes a list, "statistics.0.team.id") and
+# a type: int64, float64, string, bool, or None for values kept as they come
+# (mixed "55%"/55 stats, "180 cm" heights) and parsed later by schema.normalize.
+# A spec with a "record" path yields one row per item of that list instead, with
+# "meta" columns read from the enclosing entry. A missing key or a null anywhere
+# on a path gives a null, never an error.
+#
+# to_frame() flattens one page of entries at a time, column by column:
+#   arrow  - the entries are converted in one pass to a pyarrow struct array that
+#            holds only the declared paths, with the declared types, and each
+#            column is pulled out of it; needs pyarrow, record specs excluded
+#   python - one list comprehension per path level and column
+#   auto   - arrow for pages of at least FLATTEN_ARROW_MIN_ROWS entries; below
+#            that its fixed cost per page is more than the python engine's total
+# A page that does not match its declared types (the API sending "12" where an int
+# was declared) falls back to python.
+#
+# Either way typed columns come out in the nullable pandas dtype of their type
+# below, so a missing value is <NA> and never turns an int column into floats; a
+# python page whose values do not fit their type keeps them as they came, for
+# schema.normalize to parse.
+FLATTEN_ENGINE = os.getenv("FLATTEN_ENGINE", "auto")
+ARROW_MIN_ROWS = int(os.getenv("FLATTEN_ARROW_MIN_ROWS", "1000"))
+
+PANDAS_TYPES = {"int64": pd.Int64Dtype(), "float64": pd.Float64Dtype(), "string": pd.StringDtype(),
+                "bool": pd.BooleanDtype()}
+
+SPECS = {
+    "league_dim": {
+        "endpoint": "leagues",
+        "columns": {
+            "LeagueID":   ("league.id",   "int64"),
+            "LeagueName": ("league.name", "string"),
+        },
+    },
+    "team_dim": {
+        "endpoint": "teams",
+        "columns": {
+            "TeamID":    ("team.id",       "int64"),
+            "TeamName":  ("team.name",     "string"),
+            "ShortName": ("team.code",     "string"),
+            "Country":   ("team.country",  "string"),
+            "Founded":   ("team.founded",  "int64"),
+            "National":  ("team.national", "bool"),
+        },
+    },
+    # Same /teams entries: the team's home venue, when it has one
+    "stadium_dim": {
+        "endpoint": "teams",
+        "columns": {
+            "VenueID":  ("venue.id",       "int64"),
+            "Name":     ("venue.name",     "string"),
+            "City":     ("venue.city",     "string"),
+            "Capacity": ("venue.capacity", "int64"),
+            "Surface":  ("venue.surface",  "string"),
+            "Address":  ("venue.address",  "string"),
+        },
+        "required": ["VenueID"],
+    },
+    # The first statistics block is the player's current team
+    "player_dim": {
+        "endpoint": "players",
+        "columns": {
+            "PlayerID":    ("player.id",                   "int64"),
+            "PlayerName":  ("player.name",                 "string"),
+            "TeamID":      ("statistics.0.team.id",        "int64"),
+            "Nationality": ("player.nationality",          "string"),
+            "Position":    ("statistics.0.games.position", "string"),
+            "DateOfBirth": ("player.birth.date",           "string"),
+            "Height":      ("player.height",               None),
+            "Weight":      ("player.weight",               None),
+        },
+    },
+    "fixture_dim": {
+        "endpoint": "fixtures",
+        "columns": {
+            "FixtureID":  ("fixture.id",           "int64"),
+            "Date":       ("fixture.date",         "string"),
+            "Timestamp":  ("fixture.timestamp",    "int64"),
+            "VenueID":    ("fixture.venue.id",     "int64"),
+            "HomeTeamID": ("teams.home.id",        "int64"),
+            "AwayTeamID": ("teams.away.id",        "int64"),
+            "Status":     ("fixture.status.short", "string"),
+            "Round":      ("league.round",         "string"),
+            "LeagueID":   ("league.id",            "int64"),
+            "Season":     ("league.season",        "int64"),
+            "HomeGoals":  ("goals.home",           "int64"),
+            "AwayGoals":  ("goals.away",           "int64"),
+        },
+    },
+    # /fixtures/statistics entries (one per team) with the requested fixture's ID
+    # added as "fixture_id"; one row per team and stat
+    "fixture_statistics": {
+        "endpoint": "fixtures/statistics",
+        "record": "statistics",
+        "meta": {
+            "FixtureID": ("fixture_id", "int64"),
+            "TeamID":    ("team.id",    "int64"),
+        },
+        "columns": {
+            "StatType": ("type",  "string"),
+            "Value":    ("value", None),
+        },
+    },
+}
+
+
+def parse_path(path):
+    return [int(part) if part.isdigit() else part for part in path.split(".")]
+
+
+def columns(name):
+    spec = SPECS[name]
+    return list(spec.get("meta", {})) + list(spec["columns"])
+
+
+def empty_frame(name):
+    spec = SPECS[name]
+    return pd.DataFrame({column: typed([], sql_type)
+                         for column, (_, sql_type) in {**spec.get("meta", {}), **spec["columns"]}.items()})
+
+
+def typed(values, sql_type):
+    # Values as an array of their type's PANDAS_TYPES dtype, or as they came
+    if sql_type is None:
+        return values
+    try:
+        return pd.array(values, dtype=PANDAS_TYPES[sql_type])
+    except (TypeError, ValueError):
+        return values
+
+
+def pluck(items, path):
+    # Values at `path` in every item, one level of nesting at a time
+    values = items
+    for part in parse_path(path):
+        if isinstance(part, int):
+            values = [value[part] if isinstance(value, list) and len(value) > part else None for value in values]
+        else:
+            values = [value.get(part) if isinstance(value, dict) else None for value in values]
+    return values
+
+
+def python_frame(spec, entries):
+    if "record" not in spec:
+        return pd.DataFrame({column: typed(pluck(entries, path), sql_type)
+                             for column, (path, sql_type) in spec["columns"].items()})
+    # One row per record; meta values are repeated for each record of their entry
+    records = [value if isinstance(value, list) else [] for value in pluck(entries, spec["record"])]
+    counts = [len(items) for items in records]
+    flat = [item for items in records for item in items]
+    data = {column: typed(np.repeat(np.array(pluck(entries, path), dtype=object), counts), sql_type)
+            for column, (path, sql_type) in spec.get("meta", {}).items()}
+    data.update({column: typed(pluck(flat, path), sql_type) for column, (path, sql_type) in spec["columns"].items()})
+    return pd.DataFrame(data)
+
+
+@lru_cache(maxsize=None)
+def arrow_types():
+    return {"int64": pa.int64(), "float64": pa.float64(), "string": pa.string(), "bool": pa.bool_()}
+
+
+@lru_cache(maxsize=None)
+def arrow_type(name):
+    # Struct type holding only the typed paths of the spec
+    def build(node):
+        if isinstance(node, pa.DataType):
+            return node
+        if 0 in node:
+            return pa.list_(build(node[0]))
+        return pa.struct([(key, build(child)) for key, child in node.items()])
+
+    tree = {}
+    for path, sql_type in SPECS[name]["columns"].values():
+        if sql_type is None:
+            continue
+        *parents, leaf = parse_path(path)
+        node = tree
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = arrow_types()[sql_type]
+    return build(tree)
+
+
+def arrow_column(array, path):
+    for part in parse_path(path):
+        if isinstance(part, int):
+            # list_element rejects short lists, so those become nulls first
+            long_enough = pc.greater(pc.list_value_length(array), part)
+            array = pc.list_element(pc.if_else(long_enough, array, pa.scalar(None, array.type)), part)
+        else:
+            array = pc.struct_field(array, [part])
+    return array
+
+
+def arrow_frame(name, entries):
+    # Typed columns convert to pandas in one go; untyped ones are put in place after
+    spec = SPECS[name]
+    array = pa.array(entries, type=arrow_type(name))
+    typed = {column: arrow_column(array, path) for column, (path, sql_type) in spec["columns"].items() if sql_type}
+    pandas_types = {arrow_types()[sql_type]: dtype for sql_type, dtype in PANDAS_TYPES.items()}
+    frame = pa.table(typed).to_pandas(types_mapper=pandas_types.get)
+    for position, (column, (path, sql_type)) in enumerate(spec["columns"].items()):
+        if not sql_type:
+            frame.insert(position, column, pluck(entries, path))
+    return frame
+
+
+def to_frame(name, entries, engine=None):
+    # One page of response entries -> DataFrame with the spec's columns
+    spec = SPECS[name]
+    if not entries:
+        return empty_frame(name)
+    engine = engine or FLATTEN_ENGINE
+    if engine == "auto":
+        engine = "arrow" if len(entries) >= ARROW_MIN_ROWS else "python"
+    frame = None
+    if engine == "arrow" and pa is not None and "record" not in spec:
+        try:
+            frame = arrow_frame(name, entries)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            frame = None
+    if frame is None:
+        frame = python_frame(spec, entries)
+    if spec.get("required"):
+        frame = frame.dropna(subset=spec["required"]).reset_index(drop=True)
+    return frame
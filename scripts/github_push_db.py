@@ -1,8 +1,13 @@
+import hashlib
 import os
+import tempfile
+import time
 from dotenv import load_dotenv
 from git import Repo, GitCommandError
 import shutil
 
+from db_snapshot import MANIFEST_FILE, SCHEMA_FILE, dump_snapshot
+
 # Load environment variables
 print("Loading environment variables...")
 load_dotenv()
@@ -14,58 +19,183 @@ GITHUB_REPO     = os.getenv("GITHUB_REPO")
 REPO_PATH       = os.getenv("REPO_PATH", "./temp_repo")
 DB_FILE         = os.getenv("DB_FILE", "/Users/snatch/PycharmProjects/power_bi_project/2_0/football_data.sqlite")
 
+# PUBLISH_MODE=snapshot, the default, commits a sorted text dump of every table
+# (db_snapshot.py) under PUBLISH_SNAPSHOT_DIR, so history grows with the rows that
+# changed, and removes a .sqlite published earlier so nobody downloads a stale copy.
+# Whoever needs the binary rebuilds it from a checkout of the snapshot:
+#   python db_snapshot.py snapshot football_data.sqlite
+# (the exporter's remote fallback does the same). PUBLISH_MODE=binary commits the
+# .sqlite file itself and PUBLISH_MODE=both commits both; every build rewrites the
+# file's header and statistics, so each data change adds a whole new copy to history.
+# Nothing is committed when the snapshot's schema and table hashes are unchanged
+# since the last publish, however the .sqlite bytes moved.
+PUBLISH_MODE = os.getenv("PUBLISH_MODE", "snapshot")
+SNAPSHOT_DIR = os.getenv("PUBLISH_SNAPSHOT_DIR", "snapshot")
+PUBLISH_BRANCH = os.getenv("PUBLISH_BRANCH", "main")
+
+# Identity of the publish commits; a CI runner or fresh machine has no git config
+GIT_USER_NAME  = os.getenv("GIT_USER_NAME", GITHUB_USERNAME or "football-data-publisher")
+GIT_USER_EMAIL = os.getenv("GIT_USER_EMAIL", f"{GIT_USER_NAME}@users.noreply.github.com")
+
 print(f"GITHUB_USERNAME: {GITHUB_USERNAME}")
 print(f"GITHUB_TOKEN: {'[HIDDEN]' if GITHUB_TOKEN else None}")
 print(f"GITHUB_REPO: {GITHUB_REPO}")
 print(f"REPO_PATH: {REPO_PATH}")
 print(f"DB_FILE: {DB_FILE}")
+print(f"PUBLISH_MODE: {PUBLISH_MODE}")
+
 
-# Check for missing variables
-if not all([GITHUB_USERNAME, GITHUB_TOKEN, GITHUB_REPO]):
-    raise ValueError("Missing one or more required .env variables: GITHUB_USERNAME, GITHUB_TOKEN, GITHUB_REPO")
-
-# Build secure repo URL
-try:
-    secure_url = GITHUB_REPO.replace(
-        "https://", f"https://{GITHUB_USERNAME}:{GITHUB_TOKEN}@"
-    )
-    print(f"Secure URL built: {secure_url.split('@')[1]}")
-except Exception as e:
-    raise RuntimeError(f"Failed to build secure GitHub URL: {e}")
-
-# Clone the repo or pull it if already exists
-if os.path.exists(REPO_PATH):
-    print("Repo path exists. Trying to open and pull...")
+def remote_url():
+    # Credentials are only needed for an https remote; a local path or file:// URL
+    # (e.g. a bare repo to test against) is used as is
+    if not GITHUB_REPO:
+        raise ValueError("Missing required .env variable: GITHUB_REPO")
+    if not GITHUB_REPO.startswith("https://"):
+        return GITHUB_REPO
+    if not all([GITHUB_USERNAME, GITHUB_TOKEN]):
+        raise ValueError("Missing one or more required .env variables: GITHUB_USERNAME, GITHUB_TOKEN, GITHUB_REPO")
+
+    # Build secure repo URL
     try:
-        repo = Repo(REPO_PATH)
-        origin = repo.remotes.origin
-        origin.pull()
-        print("Repo pulled successfully.")
+        secure_url = GITHUB_REPO.replace(
+            "https://", f"https://{GITHUB_USERNAME}:{GITHUB_TOKEN}@"
+        )
+        print(f"Secure URL built: {secure_url.split('@')[1]}")
+        return secure_url
     except Exception as e:
-        raise RuntimeError(f"Failed to pull repo: {e}")
-else:
-    print("Cloning GitHub repo...")
+        raise RuntimeError(f"Failed to build secure GitHub URL: {e}")
+
+
+def artifact_paths():
+    # The paths this publish mode writes: the only things checked out, staged and committed
+    paths = []
+    if PUBLISH_MODE in ("binary", "both"):
+        paths.append(os.path.basename(DB_FILE))
+    if PUBLISH_MODE in ("snapshot", "both"):
+        paths.append(SNAPSHOT_DIR)
+    return paths
+
+
+def sync_repo(url):
+    # Persistent shallow, sparse working copy of PUBLISH_BRANCH: only the tip commit
+    # is fetched and only the artifacts are checked out, so syncing costs the same
+    # however much history the remote has
+    if os.path.exists(REPO_PATH):
+        print("Repo path exists. Fetching the branch tip...")
+        repo = Repo(REPO_PATH)
+        repo.remotes.origin.set_url(url)
+    else:
+        print("Creating shallow working copy...")
+        repo = Repo.init(REPO_PATH)
+        repo.create_remote("origin", url)
     try:
-        repo = Repo.clone_from(secure_url, REPO_PATH)
-        print("Repo cloned successfully.")
+        repo.git.sparse_checkout("set", "--no-cone", *(f"/{path}" for path in artifact_paths()))
+        repo.git.symbolic_ref("HEAD", f"refs/heads/{PUBLISH_BRANCH}")
+        # A remote with no commits yet has nothing to fetch
+        if repo.git.ls_remote("--heads", "origin", PUBLISH_BRANCH):
+            repo.git.fetch("--depth=1", "--filter=blob:none", "origin", PUBLISH_BRANCH)
+            # This copy only ever holds what the last publish wrote, so it simply follows the remote
+            repo.git.reset("--hard", "FETCH_HEAD")
+        print("Repo synced successfully.")
     except GitCommandError as e:
-        raise RuntimeError(f"Git clone failed: {e}")
-
-# Copy the database file into the repo
-dest_path = os.path.join(REPO_PATH, os.path.basename(DB_FILE))
-print(f"Copying DB file from {DB_FILE} to {dest_path}...")
-try:
-    shutil.copy2(DB_FILE, dest_path)
-    print("Database file copied.")
-except Exception as e:
-    raise RuntimeError(f"Failed to copy DB file: {e}")
-
-# Commit and push changes
-print("Staging and committing changes...")
-try:
-    repo.git.add(A=True)
-    repo.index.commit("Update football_data.sqlite")
-    repo.remotes.origin.push()
-    print("Changes pushed to GitHub.")
-except Exception as e:
-    raise RuntimeError(f"Git push failed: {e}")
+        raise RuntimeError(f"Failed to sync repo: {e}")
+    return repo
+
+
+def published_digest_path():
+    # Digest of the last published snapshot; kept in .git so it never gets committed
+    return os.path.join(REPO_PATH, ".git", "published_db.sha256")
+
+
+def snapshot_digest(folder):
+    # The database's content: schema.sql plus manifest.json's per-table hashes
+    digest = hashlib.sha256(PUBLISH_MODE.encode())
+    for name in (SCHEMA_FILE, MANIFEST_FILE):
+        with open(os.path.join(folder, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def write_artifact(snapshot):
+    if PUBLISH_MODE in ("binary", "both"):
+        # Copy the database file into the repo
+        dest_path = os.path.join(REPO_PATH, os.path.basename(DB_FILE))
+        print(f"Copying DB file from {DB_FILE} to {dest_path}...")
+        try:
+            shutil.copy2(DB_FILE, dest_path)
+            print("Database file copied.")
+        except Exception as e:
+            raise RuntimeError(f"Failed to copy DB file: {e}")
+    if PUBLISH_MODE in ("snapshot", "both"):
+        # The working copy's snapshot is replaced whole, dropped tables included
+        folder = os.path.join(REPO_PATH, SNAPSHOT_DIR)
+        shutil.rmtree(folder, ignore_errors=True)
+        shutil.copytree(snapshot, folder)
+        print(f"Snapshot copied into {folder}.")
+
+
+def report(timings):
+    print("Publish timings: " + " | ".join(f"{step} {seconds:.2f}s" for step, seconds in timings.items()))
+
+
+def main():
+    with tempfile.TemporaryDirectory() as snapshot:
+        publish(snapshot)
+
+
+def publish(snapshot):
+    timings = {}
+    start = time.perf_counter()
+    print(f"Dumping {DB_FILE}...")
+    manifest = dump_snapshot(DB_FILE, snapshot)
+    print(f"Snapshot written: {len(manifest)} tables, {sum(t['rows'] for t in manifest.values())} rows.")
+    timings["dump"] = time.perf_counter() - start
+    digest = snapshot_digest(snapshot)
+    marker = published_digest_path()
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if f.read().strip() == digest:
+                print("Database content unchanged since the last publish. Nothing to commit.")
+                return
+
+    start = time.perf_counter()
+    repo = sync_repo(remote_url())
+    timings["sync"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    write_artifact(snapshot)
+    # Stage only the artifacts, never whatever else is lying around in REPO_PATH
+    repo.git.add("-A", "--", *artifact_paths())
+    if PUBLISH_MODE == "snapshot":
+        # A .sqlite from an earlier binary publish would no longer be updated
+        repo.git.rm("--cached", "--sparse", "--ignore-unmatch", "--quiet", "--", os.path.basename(DB_FILE))
+    changed = repo.git.diff("--cached", "--name-only").splitlines()
+    timings["stage"] = time.perf_counter() - start
+
+    # Commit and push changes
+    if not changed:
+        print("Published files unchanged. Nothing to commit.")
+    else:
+        print("Committing and pushing changes...")
+        try:
+            start = time.perf_counter()
+            message = {"binary": "Update football_data.sqlite",
+                       "snapshot": f"Update football_data snapshot ({len(changed)} files changed)",
+                       "both": f"Update football_data.sqlite and snapshot ({len(changed)} files changed)"}[PUBLISH_MODE]
+            repo.git.execute(["git", "-c", f"user.name={GIT_USER_NAME}", "-c", f"user.email={GIT_USER_EMAIL}",
+                              "commit", "-m", message])
+            timings["commit"] = time.perf_counter() - start
+            start = time.perf_counter()
+            repo.remotes.origin.push(refspec=f"HEAD:refs/heads/{PUBLISH_BRANCH}").raise_if_error()
+            timings["push"] = time.perf_counter() - start
+            print("Changes pushed to GitHub.")
+        except Exception as e:
+            raise RuntimeError(f"Git push failed: {e}")
+
+    with open(marker, "w") as f:
+        f.write(digest)
+    report(timings)
+
+
+if __name__ == "__main__":
+    main()
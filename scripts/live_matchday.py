@@ -0,0 +1,177 @@
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from api_client import ApiClient
+from build_sqlite_db import create_views, quote, refresh_aggregates, track_changes, write_rows
+from fetch_fixtures_2 import FINAL_STATUSES
+from flatten import to_frame
+from schema import column_types, normalize
+from serving import write_snapshot
+from statistics_model import FACT_TABLE, TYPE_COLUMNS, TYPE_TABLE, assign_stat_types, flatten
+from upsert import TABLE_KEYS
+
+# Live matchday mode: keeps fixture_dim and statistics_fact in the built database
+# current while games are being played, instead of re-running the season-wide
+# fetchers. Today's fixtures (UTC) are listed with one /fixtures?date= call, re-read
+# every LIVE_DISCOVER_MINUTES for kick-off changes. Every LIVE_POLL_SECONDS the
+# fixtures that have kicked off and are not final yet are requested through
+# /fixtures?ids= (20 per call), whose answer carries status, score and statistics;
+# changed rows are upserted straight into DB_NAME, the aggregates of the touched
+# fixtures are refreshed and a new serving snapshot is written. A fixture is
+# dropped from polling once it reaches a final status, and the run ends when all
+# of today's fixtures have. The staged tables are left alone: the next regular
+# fetch + build brings them in line.
+DB_NAME = os.getenv("DB_NAME", "football_data.sqlite")
+
+# LIVE_LEAGUES=351,39 (defaults to FIXTURE_LEAGUES), or "all" for every league in league_dim
+LIVE_LEAGUES          = os.getenv("LIVE_LEAGUES", os.getenv("FIXTURE_LEAGUES", "351"))
+LIVE_POLL_SECONDS     = float(os.getenv("LIVE_POLL_SECONDS", "180"))
+LIVE_DISCOVER_MINUTES = float(os.getenv("LIVE_DISCOVER_MINUTES", "60"))
+# Stop after this many polls (0 = when today's fixtures are all final)
+LIVE_MAX_POLLS        = int(os.getenv("LIVE_MAX_POLLS", "0"))
+# LIVE_SNAPSHOT=0 skips rewriting the serving snapshot after each changed poll
+LIVE_SNAPSHOT         = os.getenv("LIVE_SNAPSHOT", "1") == "1"
+
+MAX_IDS = 20
+# Postponed fixtures are not polled; the next discovery picks them up if they are moved to today
+DONE_STATUSES = FINAL_STATUSES | {"PST"}
+NOT_STARTED = {"TBD", "NS"}
+
+
+def connect_db():
+    if not os.path.exists(DB_NAME):
+        raise FileNotFoundError(f"{DB_NAME} not found; run build_sqlite_db.py first.")
+    # The builder may hold the write lock for a while; wait for it rather than fail
+    conn = sqlite3.connect(DB_NAME, timeout=300)
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table';")}
+    missing = {"fixture_dim", FACT_TABLE, TYPE_TABLE} - tables
+    if missing:
+        raise RuntimeError(f"{DB_NAME} has no {', '.join(sorted(missing))}; run build_sqlite_db.py first.")
+    return conn
+
+
+def league_ids(conn):
+    if LIVE_LEAGUES == "all":
+        return {row[0] for row in conn.execute("SELECT DISTINCT LeagueID FROM league_dim;")}
+    return {int(x) for x in LIVE_LEAGUES.split(",")}
+
+
+def upsert_rows(cursor, table_name, df):
+    # Same typed ON CONFLICT upsert the builder uses; only rows whose values changed
+    # are written, and the change-log triggers mark their fixtures for the aggregates
+    keys = TABLE_KEYS[table_name]
+    df = normalize(df, column_types(table_name, df)).dropna(subset=keys)
+    if df.empty:
+        return 0
+    track_changes(cursor, table_name)
+    return write_rows(cursor, table_name, df, keys, fresh=False)
+
+
+def save(conn, entries):
+    # /fixtures entries -> changed fixture_dim and statistics_fact rows; returns the count
+    fixtures = to_frame("fixture_dim", entries)
+    long = flatten([(entry["fixture"]["id"], entry.get("statistics") or []) for entry in entries])
+    added = False
+    with conn:
+        cursor = conn.cursor()
+        changed = upsert_rows(cursor, "fixture_dim", fixtures)
+        if not long.empty:
+            stat_types = pd.read_sql(f"SELECT {', '.join(TYPE_COLUMNS)} FROM {quote(TYPE_TABLE)};", conn)
+            fact, stat_types, added = assign_stat_types(long, stat_types)
+            if added:
+                upsert_rows(cursor, TYPE_TABLE, stat_types)
+            changed += upsert_rows(cursor, FACT_TABLE, fact)
+    if added:
+        # A stat type the API just started sending becomes a statistics_dim column
+        create_views(conn)
+    return changed
+
+
+def discover(client, leagues, day):
+    # Today's fixtures in the tracked leagues: FixtureID -> (Status, Timestamp).
+    # ttl=0: a cached schedule would hide kick-off changes.
+    payload = client.get("fixtures", {"date": day}, ttl=0)
+    entries = [entry for entry in payload.get("response", []) if entry.get("league", {}).get("id") in leagues]
+    return entries, {entry["fixture"]["id"]: (entry["fixture"]["status"]["short"], entry["fixture"]["timestamp"])
+                     for entry in entries}
+
+
+def merge_tracked(tracked, discovered):
+    # Games already in play stay tracked until final, even when a new discovery no
+    # longer lists them (kicked off before midnight UTC)
+    in_play = {fixture_id: (status, kickoff) for fixture_id, (status, kickoff) in tracked.items()
+               if status not in DONE_STATUSES | NOT_STARTED}
+    return {**in_play, **discovered}
+
+
+def poll(client, fixture_ids):
+    # Status, score and statistics of the given fixtures, MAX_IDS per request.
+    # ttl=0: a cached answer is the one this poll is meant to replace.
+    batches = [fixture_ids[i:i + MAX_IDS] for i in range(0, len(fixture_ids), MAX_IDS)]
+    entries = []
+    params_list = [{"ids": "-".join(map(str, batch))} for batch in batches]
+    for params, payload, error in client.fetch_all("fixtures", params_list, ttl=0):
+        if error is not None or payload.get("errors"):
+            print(f"⚠️ Poll of {params['ids']} failed: {error or payload['errors']}")
+            continue
+        entries += payload.get("response", [])
+    return entries
+
+
+def main():
+    conn = connect_db()
+    leagues = league_ids(conn)
+    tracked = {}
+    day = None
+    discovered_at = 0.0
+    polls = 0
+
+    with ApiClient() as client:
+        while True:
+            now = time.time()
+            today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+            requests_before = sum(client.metrics.requests.values())
+            changed = 0
+
+            if today != day or now - discovered_at >= LIVE_DISCOVER_MINUTES * 60:
+                entries, discovered = discover(client, leagues, today)
+                changed += save(conn, entries)
+                tracked = merge_tracked(tracked, discovered)
+                day, discovered_at = today, now
+                print(f"📋 {len(discovered)} fixtures today in {len(leagues)} leagues, {len(tracked)} tracked")
+
+            due = sorted(fixture_id for fixture_id, (status, kickoff) in tracked.items()
+                         if status not in DONE_STATUSES and kickoff is not None and kickoff <= now)
+            finished = 0
+            if due:
+                entries = poll(client, due)
+                changed += save(conn, entries)
+                for entry in entries:
+                    fixture = entry["fixture"]
+                    tracked[fixture["id"]] = (fixture["status"]["short"], fixture["timestamp"])
+                    finished += fixture["status"]["short"] in DONE_STATUSES
+
+            if changed:
+                refresh_aggregates(conn)
+                if LIVE_SNAPSHOT:
+                    write_snapshot(conn)
+            polls += 1
+            pending = sum(status not in DONE_STATUSES for status, _ in tracked.values())
+            print(f"🔁 Poll {polls}: {len(due)} in play, {finished} finished, {changed} rows changed, "
+                  f"{sum(client.metrics.requests.values()) - requests_before} requests, {pending} still to finish")
+
+            if not pending:
+                print("✅ All of today's fixtures are final.")
+                break
+            if LIVE_MAX_POLLS and polls >= LIVE_MAX_POLLS:
+                break
+            time.sleep(max(0.0, LIVE_POLL_SECONDS - (time.time() - now)))
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import Counter
+
+# On-disk cache of API-Football responses, keyed on base URL + endpoint + params
+# (a stub server's answers never stand in for the real API's).
+# Bodies are stored zlib-compressed in SQLite; API_CACHE=0 turns it off.
+CACHE_ENABLED = os.getenv("API_CACHE", "1") == "1"
+CACHE_PATH    = os.getenv("API_CACHE_PATH", ".cache/api_responses.sqlite")
+CACHE_MAX_MB  = int(os.getenv("API_CACHE_MAX_MB", "512"))
+
+FOREVER = float("inf")
+MINUTE = 60
+DAY = 24 * 60 * MINUTE
+
+# Default time-to-live per endpoint, in seconds
+ENDPOINT_TTLS = {
+    "leagues":             7 * DAY,
+    "teams":               3 * DAY,
+    "venues":              7 * DAY,
+    "players":             1 * DAY,
+    "fixtures":            6 * 60 * MINUTE,
+    "fixtures/statistics": 1 * MINUTE,
+}
+DEFAULT_TTL = 1 * DAY
+LIVE_TTL = 15
+
+FINISHED_STATUSES = {"FT", "AET", "PEN", "AWD", "WO", "CANC", "ABD"}
+LIVE_STATUSES = {"1H", "HT", "2H", "ET", "BT", "P", "SUSP", "INT", "LIVE"}
+
+EVICT_EVERY = 100
+
+
+def ttl_for(endpoint, params, data):
+    # Fixtures that are all finished never change again; anything live goes stale in seconds
+    endpoint = endpoint.strip("/")
+    default = ENDPOINT_TTLS.get(endpoint, DEFAULT_TTL)
+    if params and "live" in params:
+        return LIVE_TTL
+    if endpoint == "fixtures":
+        statuses = {entry.get("fixture", {}).get("status", {}).get("short") for entry in data.get("response", [])}
+        if statuses & LIVE_STATUSES:
+            return LIVE_TTL
+        if statuses and statuses <= FINISHED_STATUSES:
+            return FOREVER
+    return default
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, max_mb=CACHE_MAX_MB):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = Counter()
+        self.misses = Counter()
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key         TEXT PRIMARY KEY,
+                endpoint    TEXT NOT NULL,
+                params      TEXT NOT NULL,
+                body        BLOB NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                expires_at  REAL,
+                last_access REAL NOT NULL
+            );
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);")
+
+    @staticmethod
+    def make_key(endpoint, params, base_url=""):
+        params_json = json.dumps(params or {}, sort_keys=True, default=str)
+        url = f"{base_url.rstrip('/')}/{endpoint.strip('/')}"
+        return hashlib.sha1(f"{url}?{params_json}".encode()).hexdigest(), params_json
+
+    def get(self, endpoint, params, base_url=""):
+        key, _ = self.make_key(endpoint, params, base_url)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, expires_at FROM responses WHERE key = ?;", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] < now):
+                self.misses[endpoint] += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?;", (now, key))
+            self.hits[endpoint] += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def put(self, endpoint, params, data, ttl=None, base_url=""):
+        # An errors block (bad token, plan limits) answers nothing: asking again must reach the API
+        if data.get("errors"):
+            return
+        ttl = ttl_for(endpoint, params, data) if ttl is None else ttl
+        # An empty response may just mean "not available yet": never pin it forever
+        if not data.get("response"):
+            ttl = min(ttl, ENDPOINT_TTLS.get(endpoint.strip("/"), DEFAULT_TTL))
+        if ttl <= 0:
+            return
+
+        key, params_json = self.make_key(endpoint, params, base_url)
+        body = zlib.compress(json.dumps(data, separators=(",", ":")).encode(), 6)
+        now = time.time()
+        expires_at = None if ttl == FOREVER else now + ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?);",
+                (key, endpoint.strip("/"), params_json, body, len(body), now, expires_at, now)
+            )
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self):
+        # Drop expired entries, then least recently used ones until under 90% of the size cap
+        self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?;", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses;").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_access;"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        self._conn.executemany("DELETE FROM responses WHERE key = ?;", victims)
+
+    def report(self):
+        endpoints = sorted(set(self.hits) | set(self.misses))
+        total_hits, total_misses = sum(self.hits.values()), sum(self.misses.values())
+        if not endpoints:
+            return
+        print(f"\n🗄️ API cache: {total_hits} hits / {total_misses} misses")
+        for endpoint in endpoints:
+            hits, misses = self.hits[endpoint], self.misses[endpoint]
+            print(f"   {endpoint:<22} {hits:>6} hits {misses:>6} misses ({hits / (hits + misses):.0%} hit rate)")
+
+    def close(self):
+        with self._lock:
+            self._evict()
+            self._conn.close()
@@ -0,0 +1,261 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from api_client import QUOTA_RESERVE
+from api_metrics import remaining_quota
+from response_cache import ENDPOINT_TTLS
+from staging import count_rows as count_staged_rows, path_digest, table_path
+
+load_dotenv()
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR    = os.getenv("OUTPUT_DIR", "data")
+DB_NAME     = os.getenv("DB_NAME", "football_data.sqlite")
+TOTAL_RPM   = int(os.getenv("API_FOOTBALL_RPM", "30"))
+
+# "@db" stands for DB_NAME; every other input/output is a staged table in DATA_DIR
+# (a CSV file or a Parquet dataset, depending on STAGING_FORMAT)
+DB = "@db"
+TABLES = ["league_dim", "team_dim", "stadium_dim", "player_dim", "fixture_dim", "statistics_fact", "stat_type_dim"]
+
+# Pipeline DAG. A stage runs once all its deps have finished; stages are skipped when
+# neither the script nor the inputs changed since their last success. Fetch stages
+# without inputs are fingerprinted by their own outputs instead, and re-run once
+# their last success is older than max_age seconds (the API's refresh interval).
+# Low-priority API stages (slowly changing dimensions) are deferred to a later run
+# when today's remaining API quota is below API_QUOTA_RESERVE, and stop mid-run if
+# it drops below it; their dependents carry on with the staged data they have.
+# Opt-in stages need credentials and only run when asked for with --with or --only.
+# "env" lists the settings that decide what a stage fetches or writes; they are part
+# of its fingerprint, along with COMMON_ENV.
+STAGES = [
+    {"name": "leagues",      "script": "fetch_leagues.py",             "deps": [],
+     "inputs": [],                 "outputs": ["league_dim"],                   "api": True, "priority": "low",
+     "max_age": ENDPOINT_TTLS["leagues"], "env": ["FOOTBALL_SEASON"]},
+    {"name": "teams_venues", "script": "fetch_teams_venues.py",        "deps": ["leagues"],
+     "inputs": ["league_dim"], "outputs": ["team_dim", "stadium_dim"], "api": True, "priority": "low",
+     "env": ["TEAM_LEAGUES", "TEAM_SEASONS", "FOOTBALL_SEASON"]},
+    {"name": "players",      "script": "fetch_players_2.py",           "deps": [],
+     "inputs": [],                 "outputs": ["player_dim"],                   "api": True, "priority": "low",
+     "max_age": ENDPOINT_TTLS["players"], "env": ["PLAYER_LEAGUES", "PLAYER_SEASONS"]},
+    # A FIXTURE_LEAGUES=all backfill reads its league list from league_dim
+    {"name": "fixtures",     "script": "fetch_fixtures_2.py",
+     "deps": ["leagues"] if os.getenv("FIXTURE_LEAGUES") == "all" else [],
+     "inputs": [],                 "outputs": ["fixture_dim"],                  "api": True,
+     "max_age": ENDPOINT_TTLS["fixtures"], "env": ["FIXTURE_LEAGUES", "FIXTURE_SEASONS"]},
+    {"name": "statistics",   "script": "fetch_multiple_statistics.py", "deps": ["fixtures"],
+     "inputs": ["fixture_dim"], "outputs": ["statistics_fact", "stat_type_dim"], "api": True,
+     "env": ["STATS_SEASONS", "INCREMENTAL"]},
+    {"name": "build",        "script": "build_sqlite_db.py",
+     "deps": ["leagues", "teams_venues", "players", "fixtures", "statistics"],
+     "inputs": TABLES,             "outputs": [DB],
+     "env": ["FULL_REBUILD"]},
+    {"name": "publish",      "script": "github_push_db.py",            "deps": ["build"],
+     "inputs": [DB],               "outputs": [],                               "opt_in": True,
+     "env": ["GITHUB_REPO", "PUBLISH_BRANCH", "PUBLISH_MODE", "PUBLISH_SNAPSHOT_DIR"]},
+    {"name": "export",       "script": "export_to_google_sheets.py",   "deps": ["build"],
+     "inputs": [DB],               "outputs": [],                               "opt_in": True,
+     "env": ["SPREADSHEET_URL", "EXPORT_MODE"]},
+]
+# Settings every stage's fingerprint includes: the staging format decides the files
+# each stage reads and writes
+COMMON_ENV = ["STAGING_FORMAT"]
+
+STATE_FILE = os.path.join(DATA_DIR, "_pipeline_state.json")
+RUNS_FILE  = os.path.join(DATA_DIR, "_pipeline_runs.csv")
+LOG_DIR    = os.path.join(DATA_DIR, "_logs")
+
+_state_lock = threading.Lock()
+
+
+def resolve(path):
+    return DB_NAME if path == DB else table_path(DATA_DIR, path)
+
+
+def fingerprint(stage):
+    # Script + settings + inputs (outputs for stages without inputs); identical
+    # fingerprints mean re-running would redo the same work
+    parts = [path_digest(os.path.join(SCRIPTS_DIR, stage["script"]))]
+    parts += [f"{name}={os.getenv(name, '')}" for name in COMMON_ENV + stage.get("env", [])]
+    parts += [f"{path}:{path_digest(resolve(path))}" for path in stage["inputs"] or stage["outputs"]]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()
+
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def last_success(name):
+    # {"fingerprint", "finished_at"} of the stage's last success; older state files
+    # only hold the fingerprint
+    last = load_state().get(name) or {}
+    return {"fingerprint": last} if isinstance(last, str) else last
+
+
+def save_state(name, value):
+    with _state_lock:
+        state = load_state()
+        state[name] = value
+        with open(STATE_FILE, "w") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    if path != DB_NAME:
+        return count_staged_rows(path)
+    # SQLite output: rows across all published tables
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE '\\_%' ESCAPE '\\';")]
+        return sum(conn.execute(f'SELECT COUNT(*) FROM "{table}";').fetchone()[0] for table in tables)
+    finally:
+        conn.close()
+
+
+def run_stage(stage, env, force):
+    name = stage["name"]
+    last = last_success(name)
+    outputs_exist = all(os.path.exists(resolve(path)) for path in stage["outputs"])
+    recent = time.time() - last.get("finished_at", 0) < stage.get("max_age", float("inf"))
+    if not force and outputs_exist and recent and last.get("fingerprint") == fingerprint(stage):
+        return {"status": "skipped", "seconds": 0.0, "rows": sum(count_rows(resolve(p)) for p in stage["outputs"])}
+
+    low_priority = stage.get("priority") == "low"
+    quota = remaining_quota() if low_priority else None
+    if quota is not None and quota < QUOTA_RESERVE:
+        print(f"⏭️ {name}: deferred, {quota} API requests left today ({QUOTA_RESERVE} reserved)")
+        return {"status": "deferred", "seconds": 0.0, "rows": sum(count_rows(resolve(p)) for p in stage["outputs"])}
+    if low_priority:
+        env = dict(env, API_FOOTBALL_PRIORITY="low")
+
+    # Stages run in parallel, so each one logs to its own file
+    log_path = os.path.join(LOG_DIR, f"{name}.log")
+    print(f"▶️ {name}: running {stage['script']} (log: {log_path})")
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        proc = subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, stage["script"])],
+                              env=env, stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT)
+    seconds = time.perf_counter() - start
+
+    if proc.returncode != 0:
+        with open(log_path) as log:
+            tail = log.readlines()[-10:]
+        print(f"❌ {name} failed after {seconds:.1f}s:\n" + "".join(f"   {line}" for line in tail))
+        return {"status": "failed", "seconds": seconds, "rows": 0}
+
+    # Taken after the run: a stage fingerprinted by its outputs has just rewritten them
+    save_state(name, {"fingerprint": fingerprint(stage), "finished_at": time.time()})
+    rows = sum(count_rows(resolve(path)) for path in stage["outputs"])
+    print(f"✅ {name} finished in {seconds:.1f}s ({rows} rows)")
+    return {"status": "ok", "seconds": seconds, "rows": rows}
+
+
+def stage_env(stages, jobs):
+    # Concurrent fetch stages each get a share of the plan's requests-per-minute
+    api_stages = sum(1 for stage in stages if stage.get("api"))
+    env = dict(os.environ)
+    env.update({
+        "OUTPUT_DIR": DATA_DIR,
+        "DATA_FOLDER": DATA_DIR,
+        "FIXTURE_FILE": table_path(DATA_DIR, "fixture_dim"),
+        "LEAGUE_FILE": table_path(DATA_DIR, "league_dim"),
+        "DB_NAME": DB_NAME,
+        "DB_FILE": os.path.abspath(DB_NAME),
+        "API_FOOTBALL_RPM": str(max(1, TOTAL_RPM // max(1, min(jobs, api_stages)))),
+        "PYTHONUNBUFFERED": "1",
+    })
+    return env
+
+
+def run_pipeline(stages, jobs, force):
+    selected = {stage["name"] for stage in stages}
+    env = stage_env(stages, jobs)
+    pending = {stage["name"]: stage for stage in stages}
+    results = {}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                deps = [results.get(dep) for dep in stage["deps"] if dep in selected]
+                if any(dep and dep["status"] in ("failed", "blocked") for dep in deps):
+                    results[name] = {"status": "blocked", "seconds": 0.0, "rows": 0}
+                    del pending[name]
+                    print(f"⏸️ {name}: blocked by a failed dependency")
+                elif all(deps):
+                    running[pool.submit(run_stage, stage, env, force)] = name
+                    del pending[name]
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+    return results
+
+
+def record_run(results, started_at):
+    new_file = not os.path.exists(RUNS_FILE)
+    with open(RUNS_FILE, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new_file:
+            writer.writerow(["RunStartedAt", "Stage", "Status", "Seconds", "Rows"])
+        for name, result in results.items():
+            writer.writerow([started_at, name, result["status"], round(result["seconds"], 2), result["rows"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the football data pipeline as a DAG.")
+    parser.add_argument("--only", help="comma-separated stages to run (their deps are assumed done)")
+    parser.add_argument("--skip", help="comma-separated stages to leave out")
+    parser.add_argument("--with", dest="with_stages", default=os.getenv("PIPELINE_WITH"),
+                        help="comma-separated opt-in stages to add (publish, export)")
+    parser.add_argument("--force", action="store_true", help="run stages even if their inputs are unchanged")
+    parser.add_argument("--jobs", type=int, default=int(os.getenv("PIPELINE_JOBS", "4")), help="stages run in parallel")
+    args = parser.parse_args()
+
+    names = [stage["name"] for stage in STAGES]
+    with_stages = set(args.with_stages.split(",")) if args.with_stages else set()
+    default = {stage["name"] for stage in STAGES if not stage.get("opt_in")} | with_stages
+    only = set(args.only.split(",")) if args.only else default
+    skip = set(args.skip.split(",")) if args.skip else set()
+    unknown = (only | skip | with_stages) - set(names)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+    stages = [stage for stage in STAGES if stage["name"] in only - skip]
+
+    os.makedirs(LOG_DIR, exist_ok=True)
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    start = time.perf_counter()
+    results = run_pipeline(stages, max(1, args.jobs), args.force)
+    record_run(results, started_at)
+
+    print(f"\n📊 Pipeline finished in {time.perf_counter() - start:.1f}s")
+    for name in names:
+        if name in results:
+            result = results[name]
+            print(f"   {name:<14} {result['status']:<8} {result['seconds']:8.1f}s {result['rows']:>10} rows")
+
+    if any(result["status"] in ("failed", "blocked") for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
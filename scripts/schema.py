@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+
+from upsert import TABLE_KEYS
+
+# Declared star schema for football_data.sqlite.
+#   columns       - declared SQL type per column; INTEGER/REAL columns are normalized
+#                   to numbers at load time ("55%" -> 55, "180 cm" -> 180, True -> 1)
+#   extra_type    - type for CSV columns not declared here (None = infer from the data)
+#   primary_key   - natural key shared with the CSV upsert
+#   indexes       - foreign-key / filter indexes used by the dashboard joins
+#   without_rowid - composite-key tables are stored clustered on their key
+SCHEMA = {
+    "league_dim": {
+        "columns": {
+            "LeagueID":   "INTEGER",
+            "LeagueName": "TEXT",
+            "Season":     "INTEGER",
+        },
+        "primary_key": TABLE_KEYS["league_dim"],
+        "without_rowid": True,
+    },
+    "team_dim": {
+        "columns": {
+            "TeamID":    "INTEGER",
+            "TeamName":  "TEXT",
+            "ShortName": "TEXT",
+            "Country":   "TEXT",
+            "Founded":   "INTEGER",
+            "National":  "INTEGER",
+            "UUID":      "TEXT",
+        },
+        "primary_key": TABLE_KEYS["team_dim"],
+    },
+    "stadium_dim": {
+        "columns": {
+            "VenueID":  "INTEGER",
+            "Name":     "TEXT",
+            "City":     "TEXT",
+            "Capacity": "INTEGER",
+            "Surface":  "TEXT",
+            "Address":  "TEXT",
+        },
+        "primary_key": TABLE_KEYS["stadium_dim"],
+    },
+    "player_dim": {
+        "columns": {
+            "PlayerID":    "INTEGER",
+            "PlayerName":  "TEXT",
+            "TeamID":      "INTEGER",
+            "Nationality": "TEXT",
+            "Position":    "TEXT",
+            "DateOfBirth": "TEXT",
+            "Height":      "INTEGER",  # cm
+            "Weight":      "INTEGER",  # kg
+        },
+        "primary_key": TABLE_KEYS["player_dim"],
+        "indexes": [["TeamID"]],
+    },
+    "fixture_dim": {
+        "columns": {
+            "FixtureID":  "INTEGER",
+            "Date":       "TEXT",
+            "Timestamp":  "INTEGER",
+            "VenueID":    "INTEGER",
+            "HomeTeamID": "INTEGER",
+            "AwayTeamID": "INTEGER",
+            "Status":     "TEXT",
+            "Round":      "TEXT",
+            "LeagueID":   "INTEGER",
+            "Season":     "INTEGER",
+            "HomeGoals":  "INTEGER",
+            "AwayGoals":  "INTEGER",
+        },
+        "primary_key": TABLE_KEYS["fixture_dim"],
+        "indexes": [["HomeTeamID"], ["AwayTeamID"], ["VenueID"], ["LeagueID", "Season"]],
+    },
+    # Long-format fixture statistics (see statistics_model.py); the wide
+    # statistics_dim is a view over these two
+    "stat_type_dim": {
+        "columns": {
+            "StatTypeID": "INTEGER",
+            "StatType":   "TEXT",
+            "ColumnName": "TEXT",
+        },
+        "primary_key": TABLE_KEYS["stat_type_dim"],
+    },
+    "statistics_fact": {
+        "columns": {
+            "FixtureID":  "INTEGER",
+            "TeamID":     "INTEGER",
+            "StatTypeID": "INTEGER",
+            "Value":      "REAL",  # percentages are stored as 0-100
+        },
+        "primary_key": TABLE_KEYS["statistics_fact"],
+        # One team's stats, and per-stat aggregation answered from the index alone
+        "indexes": [["TeamID", "StatTypeID"], ["StatTypeID", "TeamID", "Value"]],
+        "without_rowid": True,
+    },
+}
+
+
+# Inference function for SQL types
+def infer_sql_type(series):
+    if pd.api.types.is_integer_dtype(series):
+        return "INTEGER"
+    elif pd.api.types.is_float_dtype(series):
+        return "REAL"
+    else:
+        return "TEXT"
+
+
+def column_types(table_name, df):
+    # Declared type for every column in `df`, falling back to extra_type / inference
+    spec = SCHEMA.get(table_name, {})
+    declared = spec.get("columns", {})
+    extra_type = spec.get("extra_type")
+    return {col: declared.get(col) or extra_type or infer_sql_type(df[col]) for col in df.columns}
+
+
+def to_number(series):
+    # "55%" -> 55.0, "180 cm" -> 180.0, "True" -> 1.0; anything unparseable becomes NULL.
+    # Stat strings repeat a lot, so only the distinct values are parsed.
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.astype("float64")
+    codes, uniques = pd.factorize(series)
+    text = pd.Series(uniques, dtype="string").str.strip().replace({"True": "1", "False": "0", "true": "1", "false": "0"})
+    parsed = pd.to_numeric(text.str.extract(r"(-?\d+(?:\.\d+)?)", expand=False), errors="coerce")
+    values = np.full(len(codes), np.nan)
+    present = codes >= 0
+    values[present] = parsed.to_numpy(dtype="float64", na_value=np.nan)[codes[present]]
+    return pd.Series(values, index=series.index)
+
+
+def normalize(df, types):
+    # Convert every INTEGER/REAL column to real numbers before it reaches SQLite
+    df = df.copy()
+    for col, sql_type in types.items():
+        if sql_type == "INTEGER":
+            df[col] = to_number(df[col]).round().astype("Int64")
+        elif sql_type == "REAL":
+            df[col] = to_number(df[col])
+    return df
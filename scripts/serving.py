@@ -0,0 +1,50 @@
+import os
+import pathlib
+import sqlite3
+
+# Read-optimized copy of the built database for consumers (Sheets export, Power BI
+# over ODBC, ad-hoc queries). At the end of every build the builder refreshes the
+# planner statistics and writes a compacted VACUUM INTO snapshot to SERVE_DB, which
+# replaces the previous one with an atomic rename: the file is never modified in
+# place, so readers can open it immutable (no locking, no change checks) and never
+# wait on the builder. Readers that still have the old file open keep reading it.
+DB_NAME  = os.getenv("DB_NAME", "football_data.sqlite")
+SERVE_DB = os.getenv("SERVE_DB", f"{os.path.splitext(DB_NAME)[0]}.serve.sqlite")
+
+# ANALYZE samples at most this many rows per index; 0 scans everything
+ANALYSIS_LIMIT = int(os.getenv("ANALYSIS_LIMIT", "1000"))
+# Cap on the memory map readers ask for; by default the whole file is mapped
+MMAP_MAX_MB = int(os.getenv("MMAP_MAX_MB", "4096"))
+
+
+def optimize(conn):
+    # Planner statistics for the freshly loaded tables and indexes
+    conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT};")
+    conn.execute("ANALYZE;")
+    conn.execute("PRAGMA optimize;")
+    conn.commit()
+
+
+def write_snapshot(conn, path=SERVE_DB):
+    # Compacted, defragmented copy of conn's database, swapped in atomically
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn.execute("VACUUM INTO ?;", (tmp_path,))
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+def connect_readonly(path=SERVE_DB, immutable=True):
+    # Read-only connection with the whole file memory-mapped, so repeated queries
+    # read straight from the OS page cache. Only pass immutable=True for files that
+    # are replaced rather than modified (SERVE_DB, a downloaded copy): SQLite then
+    # skips locking and would not notice in-place changes.
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; run build_sqlite_db.py first.")
+    uri = f"{pathlib.Path(path).resolve().as_uri()}?mode=ro" + ("&immutable=1" if immutable else "")
+    conn = sqlite3.connect(uri, uri=True)
+    mmap_size = min(os.path.getsize(path), MMAP_MAX_MB * 1024 * 1024)
+    conn.execute(f"PRAGMA mmap_size={mmap_size};")
+    conn.execute("PRAGMA query_only=1;")
+    return conn
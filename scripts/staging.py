@@ -0,0 +1,235 @@
+import hashlib
+import os
+import shutil
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from schema import column_types, normalize
+from upsert import upsert
+
+load_dotenv()
+
+# Staging format of the fetcher outputs the builder loads: "csv" (one <table>.csv
+# file) or "parquet" (a <table>.parquet dataset directory, hive-partitioned by
+# PARTITION_COLUMNS, typed from SCHEMA). Parquet needs pyarrow.
+STAGING_FORMAT = os.getenv("STAGING_FORMAT", "csv")
+
+# One directory per season; inside it rows are sorted by CLUSTER_COLUMNS so row-group
+# min/max statistics let a league filter skip most of the file. (A directory per
+# league and season makes thousands of tiny files that cost more to open than to read.)
+PARTITION_COLUMNS = {
+    "fixture_dim": ["Season"],
+    "league_dim":  ["Season"],
+}
+CLUSTER_COLUMNS = {
+    "fixture_dim": ["LeagueID", "FixtureID"],
+}
+ROW_GROUP_ROWS = int(os.getenv("PARQUET_ROW_GROUP_ROWS", "16384"))
+
+FILTER_OPS = {
+    "=":  lambda s, v: s == v,
+    "==": lambda s, v: s == v,
+    "!=": lambda s, v: s != v,
+    "<":  lambda s, v: s < v,
+    "<=": lambda s, v: s <= v,
+    ">":  lambda s, v: s > v,
+    ">=": lambda s, v: s >= v,
+    "in": lambda s, v: s.isin(v),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("STAGING_FORMAT=parquet needs pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+
+def table_path(folder, table_name, fmt=None):
+    fmt = fmt or STAGING_FORMAT
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unknown STAGING_FORMAT {fmt!r}; use csv or parquet.")
+    return os.path.join(folder, f"{table_name}.{fmt}")
+
+
+def table_name(path):
+    return os.path.splitext(os.path.basename(path.rstrip(os.sep)))[0]
+
+
+def is_parquet(path):
+    return path.rstrip(os.sep).endswith(".parquet")
+
+
+def list_tables(folder):
+    # Table name -> staged path; bookkeeping entries start with "_". When a table is
+    # staged in both formats, the one matching STAGING_FORMAT wins.
+    tables = {}
+    for entry in sorted(os.listdir(folder)):
+        name, ext = os.path.splitext(entry)
+        if entry.startswith("_") or ext not in (".csv", ".parquet"):
+            continue
+        if name not in tables or ext == f".{STAGING_FORMAT}":
+            tables[name] = os.path.join(folder, entry)
+    return tables
+
+
+def arrow_schema(table, df):
+    # Explicit Arrow types from SCHEMA, so every partition file agrees on them
+    pa = _pyarrow()
+    arrow_types = {"INTEGER": pa.int64(), "REAL": pa.float64(), "TEXT": pa.string()}
+    types = column_types(table, df)
+    return types, pa.schema([(col, arrow_types[sql_type]) for col, sql_type in types.items()])
+
+
+def _partitioning(table):
+    cols = PARTITION_COLUMNS.get(table)
+    if not cols:
+        return None
+    pa = _pyarrow()
+    # Partition keys are all declared INTEGER
+    return pa.dataset.partitioning(pa.schema([(col, pa.int64()) for col in cols]), flavor="hive")
+
+
+def _dataset(path):
+    pa = _pyarrow()
+    return pa.dataset.dataset(path, format="parquet", partitioning=_partitioning(table_name(path)))
+
+
+def _expression(filters):
+    # filters: [(column, op, value), ...] ANDed together, or a list of such lists ORed
+    if not filters:
+        return None
+    return _pyarrow().parquet.filters_to_expression(filters)
+
+
+def _filter_groups(filters):
+    if not filters:
+        return []
+    return filters if isinstance(filters[0], list) else [filters]
+
+
+def _filter_frame(df, filters):
+    groups = _filter_groups(filters)
+    if not groups:
+        return df
+    mask = pd.Series(False, index=df.index)
+    for group in groups:
+        group_mask = pd.Series(True, index=df.index)
+        for col, op, value in group:
+            group_mask &= FILTER_OPS[op](df[col], value)
+        mask |= group_mask
+    return df[mask]
+
+
+def read_table(path, columns=None, filters=None):
+    # Parquet reads only the requested columns and skips partitions/row groups the
+    # filters rule out; CSV has to parse the file and filter afterwards.
+    if is_parquet(path):
+        table = _dataset(path).to_table(columns=columns, filter=_expression(filters))
+        return table.to_pandas()
+    usecols = None
+    if columns is not None:
+        filter_cols = [col for group in _filter_groups(filters) for col, _, _ in group]
+        usecols = list(dict.fromkeys(list(columns) + filter_cols))
+    df = _filter_frame(pd.read_csv(path, usecols=usecols), filters)
+    return df[columns] if columns is not None else df
+
+
+def iter_batches(path, batch_rows):
+    # Yields DataFrames of at most batch_rows rows without loading the whole table
+    if is_parquet(path):
+        for batch in _dataset(path).to_batches(batch_size=batch_rows):
+            if batch.num_rows:
+                yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=batch_rows)
+
+
+def read_sample(path, rows):
+    if is_parquet(path):
+        return next(iter_batches(path, rows), pd.DataFrame())
+    return pd.read_csv(path, nrows=rows)
+
+
+def count_rows(path):
+    if not os.path.exists(path):
+        return 0
+    if is_parquet(path):
+        # Parquet footers carry row counts, no data pages are read
+        return _dataset(path).count_rows()
+    return len(pd.read_csv(path, usecols=[0]))
+
+
+def merge_table(path, new, keys):
+    # Merge `new` into the staged table at `path` and return the combined frame.
+    # For a partitioned dataset only the partitions `new` touches are read back, so
+    # the result covers just those partitions, which is all write_table replaces.
+    if not os.path.exists(path):
+        return upsert(None, new, keys)
+    partition_cols = PARTITION_COLUMNS.get(table_name(path)) if is_parquet(path) else None
+    if partition_cols and not new.empty and set(partition_cols) <= set(new.columns):
+        touched = new[partition_cols].dropna().drop_duplicates().astype("int64")
+        filters = [[(col, "=", int(value)) for col, value in zip(partition_cols, row)]
+                   for row in touched.itertuples(index=False)]
+        existing = read_table(path, filters=filters) if filters else None
+    else:
+        existing = read_table(path)
+    return upsert(existing, new, keys)
+
+
+def write_table(path, df):
+    if not is_parquet(path):
+        df.to_csv(path, index=False)
+        return
+
+    pa = _pyarrow()
+    table = table_name(path)
+    types, schema = arrow_schema(table, df)
+    df = normalize(df, types)
+    cluster = [col for col in CLUSTER_COLUMNS.get(table, []) if col in df.columns]
+    if cluster:
+        df = df.sort_values(cluster, ignore_index=True)
+    for col, sql_type in types.items():
+        if sql_type == "TEXT":
+            df[col] = df[col].astype("string")
+    data = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    partitioning = _partitioning(table)
+    if partitioning is not None:
+        # Only the partitions present in df are replaced; the others are left as they are
+        pa.dataset.write_dataset(data, path, format="parquet", partitioning=partitioning,
+                                 basename_template="part-{i}.parquet",
+                                 max_rows_per_group=ROW_GROUP_ROWS, min_rows_per_group=min(ROW_GROUP_ROWS, 1024),
+                                 existing_data_behavior="delete_matching")
+        return
+
+    # Unpartitioned: write a fresh directory and swap it in
+    tmp_path, old_path = path + ".tmp", path + ".old"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    pa.parquet.write_table(data, os.path.join(tmp_path, "part-0.parquet"), row_group_size=ROW_GROUP_ROWS)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(tmp_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def path_digest(path):
+    # Content hash of a CSV file or of every file in a Parquet dataset directory
+    if not os.path.exists(path):
+        return "missing"
+    digest = hashlib.sha256()
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+    else:
+        files = [path]
+    for file_path in files:
+        digest.update(os.path.relpath(file_path, path).encode())
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,140 @@
+import os
+
+import pandas as pd
+
+from flatten import to_frame
+from schema import to_number
+from staging import merge_table, read_table, table_path, write_table
+from upsert import TABLE_KEYS
+
+# Fixture statistics are stored long: one statistics_fact row per fixture, team and
+# stat type with a numeric Value (percentages as 0-100), and stat_type_dim naming each
+# StatTypeID. A stat the API starts sending is just a new stat_type_dim row. The wide
+# statistics_dim shape older reports use is a view the builder generates from the two.
+FACT_TABLE = "statistics_fact"
+TYPE_TABLE = "stat_type_dim"
+WIDE_VIEW  = "statistics_dim"
+
+LONG_COLUMNS = ["FixtureID", "TeamID", "StatType", "Value"]
+FACT_COLUMNS = ["FixtureID", "TeamID", "StatTypeID", "Value"]
+TYPE_COLUMNS = ["StatTypeID", "StatType", "ColumnName"]
+
+# Stat columns of the old wide statistics_dim CSV. The view always has these, NULL
+# where no fixture has the stat yet, so reports keep their columns whatever the
+# data holds; stat types the API adds later get columns of their own.
+WIDE_COLUMNS = [
+    "Ball_Possession", "Blocked_Shots", "Corner_Kicks", "Fouls", "Goalkeeper_Saves", "Offsides",
+    "Passes_Percent", "Passes_accurate", "Red_Cards", "Shots_insidebox", "Shots_off_Goal", "Shots_on_Goal",
+    "Shots_outsidebox", "Total_Shots", "Total_passes", "Yellow_Cards", "expected_goals", "goals_prevented",
+]
+KEY_COLUMNS = ["FixtureID", "TeamID"]
+
+
+def column_name(stat_type):
+    # Column the stat had in the wide statistics_dim CSV
+    return stat_type.replace(" ", "_").replace("%", "Percent")
+
+
+def flatten(responses):
+    # (fixture_id, payload["response"]) pairs -> long FixtureID/TeamID/StatType/Value
+    # frame, flattened in one pass over every response (see flatten.py)
+    records = [dict(entry, fixture_id=fixture_id) for fixture_id, response in responses for entry in response]
+    long = to_frame("fixture_statistics", records)
+    if long.empty:
+        return pd.DataFrame(columns=LONG_COLUMNS)
+    long = long.astype({"FixtureID": "int64", "TeamID": "int64"}).assign(Value=to_number(long["Value"]))
+    # A stat the API reports as null is simply absent from the fact table
+    return long.dropna(subset=["Value"])
+
+
+def load_stat_types(folder):
+    path = table_path(folder, TYPE_TABLE)
+    if not os.path.exists(path):
+        return pd.DataFrame({"StatTypeID": pd.Series(dtype="int64"), "StatType": pd.Series(dtype="object"),
+                             "ColumnName": pd.Series(dtype="object")})
+    return read_table(path, columns=TYPE_COLUMNS)
+
+
+def assign_stat_types(long, stat_types):
+    # Map StatType names to StatTypeIDs; unseen types get the next free IDs, so
+    # IDs stay stable across runs. Returns (fact rows, stat types, any added).
+    known = dict(zip(stat_types["StatType"], stat_types["StatTypeID"].astype("int64")))
+    new_types = [stat_type for stat_type in pd.unique(long["StatType"]) if stat_type not in known]
+    if new_types:
+        start = max(known.values(), default=0) + 1
+        added = pd.DataFrame({
+            "StatTypeID": range(start, start + len(new_types)),
+            "StatType":   new_types,
+            "ColumnName": [column_name(stat_type) for stat_type in new_types],
+        })
+        stat_types = added if stat_types.empty else pd.concat([stat_types, added], ignore_index=True)
+        known.update(zip(added["StatType"], added["StatTypeID"]))
+    fact = long.assign(StatTypeID=long["StatType"].map(known).astype("int64"))[FACT_COLUMNS]
+    return fact, stat_types, bool(new_types)
+
+
+def save_statistics(folder, long):
+    # Upsert long rows into statistics_fact, registering new stat types first
+    fact, stat_types, added = assign_stat_types(long, load_stat_types(folder))
+    if added:
+        write_table(table_path(folder, TYPE_TABLE), stat_types)
+    fact_path = table_path(folder, FACT_TABLE)
+    combined = merge_table(fact_path, fact, TABLE_KEYS[FACT_TABLE])
+    write_table(fact_path, combined)
+    return combined, stat_types
+
+
+def migrate_wide(folder):
+    # One-off: melt a wide statistics_dim staged by older fetchers into the long
+    # tables, then park it as _statistics_dim.legacy.* so nothing loads it again
+    legacy = table_path(folder, WIDE_VIEW)
+    if not os.path.exists(legacy):
+        return
+    wide = read_table(legacy)
+    long = wide.melt(id_vars=["FixtureID", "TeamID"], var_name="ColumnName", value_name="Value")
+    long["StatType"] = long["ColumnName"].str.replace("Percent", "%").str.replace("_", " ")
+    long["Value"] = to_number(long["Value"])
+    long = long.dropna(subset=["FixtureID", "TeamID", "Value"]).astype({"FixtureID": "int64", "TeamID": "int64"})
+    save_statistics(folder, long[LONG_COLUMNS])
+    os.replace(legacy, os.path.join(folder, f"_{os.path.basename(legacy)}.legacy"))
+    print(f"🔁 Migrated {len(wide)} wide statistics rows into {FACT_TABLE} ({len(long)} values)")
+
+
+def wide_columns(stat_types):
+    # stat_types: (StatTypeID, ColumnName) pairs -> {view column: StatTypeID or None}.
+    # SQLite column names ignore case, so a ColumnName already taken by a key, a known
+    # column or a lower StatTypeID is suffixed with its own StatTypeID.
+    pairs = sorted((int(stat_type_id), column) for stat_type_id, column in stat_types)
+    columns = {column: None for column in WIDE_COLUMNS}
+    known = {column.casefold(): column for column in WIDE_COLUMNS}
+    taken = {column.casefold() for column in KEY_COLUMNS}
+    rest = []
+    for stat_type_id, column in pairs:
+        if column.casefold() in known and column.casefold() not in taken:
+            columns[known[column.casefold()]] = stat_type_id
+            taken.add(column.casefold())
+        else:
+            rest.append((stat_type_id, column))
+    taken |= set(known)
+    for stat_type_id, column in rest:
+        if column.casefold() in taken:
+            column = f"{column}_{stat_type_id}"
+        if column.casefold() in taken:
+            raise ValueError(f"{TYPE_TABLE} {stat_type_id}: no free {WIDE_VIEW} column for {column}")
+        columns[column] = stat_type_id
+        taken.add(column.casefold())
+    return columns
+
+
+def wide_view_sql(stat_types):
+    # stat_types: (StatTypeID, ColumnName) pairs -> CREATE VIEW statement pivoting
+    # statistics_fact back into one column per stat, columns in the old CSV order
+    pivots = {
+        column: f'MAX(CASE WHEN "StatTypeID" = {stat_type_id} THEN "Value" END) AS "{column}"'
+        if stat_type_id is not None else f'NULL AS "{column}"'
+        for column, stat_type_id in wide_columns(stat_types).items()
+    }
+    pivots.update({column: f'"{column}"' for column in KEY_COLUMNS})
+    select = ",\n    ".join(pivots[column] for column in sorted(pivots))
+    return (f'CREATE VIEW "{WIDE_VIEW}" AS\nSELECT\n    {select}\n'
+            f'FROM "{FACT_TABLE}"\nGROUP BY "FixtureID", "TeamID";')
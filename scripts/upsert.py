@@ -0,0 +1,26 @@
+import pandas as pd
+
+# Natural key of every table the fetchers write
+TABLE_KEYS = {
+    "fixture_dim":    ["FixtureID"],
+    "player_dim":     ["PlayerID"],
+    "stadium_dim":    ["VenueID"],
+    "team_dim":       ["TeamID"],
+    "statistics_fact": ["FixtureID", "TeamID", "StatTypeID"],
+    "stat_type_dim":  ["StatTypeID"],
+    "league_dim":     ["LeagueID", "Season"],
+}
+
+
+def upsert(existing, new, keys):
+    # Last write wins: a row in `new` replaces the row in `existing` with the same key.
+    # Columns are unioned, so a column only the newer rows carry is NaN on the older ones.
+    if existing is None or existing.empty:
+        combined = new
+    elif new.empty:
+        combined = existing
+    else:
+        combined = pd.concat([existing, new], ignore_index=True)
+    combined = combined.drop_duplicates(subset=keys, keep="last")
+    return combined.sort_values(keys, ignore_index=True)
+
@@ -0,0 +1,42 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+SCRIPTS = os.path.join(ROOT, "scripts")
+sys.path.insert(0, SCRIPTS)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# The staged CSVs committed next to the scripts, as older fetchers wrote them
+COMMITTED_CSVS = sorted(name for name in os.listdir(SCRIPTS) if name.endswith(".csv"))
+
+
+@pytest.fixture
+def staged(tmp_path):
+    # A copy of the committed CSVs; the builder migrates the wide statistics in place
+    folder = tmp_path / "data"
+    folder.mkdir()
+    for name in COMMITTED_CSVS:
+        shutil.copy(os.path.join(SCRIPTS, name), folder / name)
+    return folder
+
+
+@pytest.fixture
+def stub():
+    # Stub API-Football with a tenth of a season, on a free port
+    from stub_api import StubData, start
+    server = start(StubData(scale=0.1), port=0)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def run_script(script, env, cwd):
+    # Runs one of the scripts as its own process, as run_pipeline.py does
+    result = subprocess.run([sys.executable, os.path.join(SCRIPTS, script)], env=env, cwd=cwd,
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stdout[-3000:] + result.stderr[-3000:]
+    return result.stdout
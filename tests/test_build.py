@@ -0,0 +1,124 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import build_sqlite_db
+from conftest import run_script
+from aggregates import AGGREGATES, TEAM_MATCH
+from schema import SCHEMA
+from staging import list_tables
+from statistics_model import migrate_wide
+
+
+def build(folder, db_path):
+    migrate_wide(str(folder))
+    conn = sqlite3.connect(db_path)
+    with conn:
+        build_sqlite_db.ensure_meta_table(conn.cursor())
+    for table_name, file_path in list_tables(str(folder)).items():
+        build_sqlite_db.load_table(conn, table_name, file_path)
+    build_sqlite_db.create_views(conn)
+    build_sqlite_db.refresh_aggregates(conn)
+    return conn
+
+
+def count(conn, table):
+    return conn.execute(f'SELECT COUNT(*) FROM "{table}";').fetchone()[0]
+
+
+def test_committed_csvs_build(staged, tmp_path):
+    conn = build(staged, tmp_path / "football_data.sqlite")
+    assert count(conn, "fixture_dim") > 0
+    assert count(conn, "statistics_fact") > 0
+    assert count(conn, TEAM_MATCH) > 0
+    for name in AGGREGATES:
+        assert count(conn, name) > 0
+    conn.close()
+
+
+@pytest.mark.parametrize("table_name", ["fixture_dim", "team_dim", "player_dim", "stadium_dim", "league_dim"])
+def test_every_declared_column_is_created(staged, tmp_path, table_name):
+    # fixture_dim.csv predates HomeGoals/AwayGoals; the columns exist, empty
+    conn = build(staged, tmp_path / "football_data.sqlite")
+    info = build_sqlite_db.table_info(conn.cursor(), table_name)
+    for col, sql_type in SCHEMA[table_name]["columns"].items():
+        assert info[col][0] == sql_type
+    conn.close()
+
+
+def test_old_table_gains_declared_columns(staged, tmp_path):
+    db_path = tmp_path / "football_data.sqlite"
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE fixture_dim ("FixtureID" INTEGER, "Status" TEXT, PRIMARY KEY ("FixtureID"));')
+    conn.close()
+    conn = build(staged, db_path)
+    assert {"HomeGoals", "AwayGoals"} <= set(build_sqlite_db.table_info(conn.cursor(), "fixture_dim"))
+    conn.close()
+
+
+def test_rebuild_is_skipped(staged, tmp_path, capsys):
+    db_path = tmp_path / "football_data.sqlite"
+    build(staged, db_path).close()
+    capsys.readouterr()
+    conn = build(staged, db_path)
+    out = capsys.readouterr().out
+    assert "Upserted" not in out
+    assert "Aggregates up to date" in out
+    conn.close()
+
+
+def table_rows(conn, table):
+    return sorted(conn.execute(f'SELECT * FROM "{table}";').fetchall(), key=repr)
+
+
+def test_rows_dropped_from_staging_are_deleted(staged, tmp_path):
+    db_path = tmp_path / "football_data.sqlite"
+    build(staged, db_path).close()
+
+    # Drop a finished fixture and one team's statistics from the staged files
+    fixtures = pd.read_csv(staged / "fixture_dim.csv")
+    dropped = int(fixtures.loc[fixtures["Status"] == "FT", "FixtureID"].iloc[0])
+    fixtures[fixtures["FixtureID"] != dropped].to_csv(staged / "fixture_dim.csv", index=False)
+    facts = pd.read_csv(staged / "statistics_fact.csv")
+    fixture_id, team_id = facts.loc[facts["FixtureID"] != dropped, ["FixtureID", "TeamID"]].iloc[0]
+    keep = (facts["FixtureID"] != fixture_id) | (facts["TeamID"] != team_id)
+    facts[keep].to_csv(staged / "statistics_fact.csv", index=False)
+
+    conn = build(staged, db_path)
+    assert conn.execute("SELECT COUNT(*) FROM fixture_dim WHERE FixtureID = ?;", (dropped,)).fetchone()[0] == 0
+    assert count(conn, "fixture_dim") == fixtures["FixtureID"].nunique() - 1
+    assert count(conn, "statistics_fact") == len(facts[keep].drop_duplicates(["FixtureID", "TeamID", "StatTypeID"]))
+
+    # The incremental refresh ends where a build from scratch does
+    fresh = build(staged, tmp_path / "fresh.sqlite")
+    for table in [TEAM_MATCH, *AGGREGATES]:
+        assert table_rows(conn, table) == table_rows(fresh, table), table
+    conn.close()
+    fresh.close()
+
+
+def test_same_size_rewrite_is_reloaded(staged, tmp_path):
+    db_path = tmp_path / "football_data.sqlite"
+    build(staged, db_path).close()
+    fixtures = pd.read_csv(staged / "fixture_dim.csv")
+    fixture_id = int(fixtures.loc[0, "FixtureID"])
+    fixtures.loc[0, "Status"] = "PST"
+    fixtures.to_csv(staged / "fixture_dim.csv", index=False)
+
+    conn = build(staged, db_path)
+    assert conn.execute("SELECT Status FROM fixture_dim WHERE FixtureID = ?;", (fixture_id,)).fetchone()[0] == "PST"
+    conn.close()
+
+
+def test_exporter_reads_the_serving_snapshot_after_a_build(staged, tmp_path, monkeypatch):
+    import export_to_google_sheets as exporter
+
+    db_path, serve_db = tmp_path / "football_data.sqlite", tmp_path / "football_data.serve.sqlite"
+    env = dict(os.environ, DATA_FOLDER=str(staged), DB_NAME=str(db_path), SERVE_DB=str(serve_db))
+    run_script("build_sqlite_db.py", env, tmp_path)
+    monkeypatch.setattr(exporter, "SQLITE_SOURCE", "auto")
+    monkeypatch.setattr(exporter, "DB_FILE", str(db_path))
+    monkeypatch.setattr(exporter, "SERVE_DB", str(serve_db))
+    assert exporter.locate_db({}) == (str(serve_db), True)
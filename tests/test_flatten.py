@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from bench_flatten import pages, same
+from flatten import PANDAS_TYPES, SPECS, columns, pa, to_frame
+from stub_api import StubData
+
+ENGINES = ["python", pytest.param("arrow", marks=pytest.mark.skipif(pa is None, reason="needs pyarrow"))]
+
+
+@pytest.fixture(scope="module")
+def cases():
+    return pages(StubData(scale=0.1))
+
+
+def flatten_pages(case, page_list, engine):
+    name = case.split(",")[0]
+    frames = []
+    for page in page_list:
+        if name == "fixture_statistics":
+            entries = [dict(entry, fixture_id=fixture_id) for fixture_id, response in page for entry in response]
+        else:
+            entries = page["response"]
+        frames.append(to_frame(name, entries, engine=engine))
+    return pd.concat(frames, ignore_index=True)
+
+
+def declared_dtypes(name):
+    # Untyped columns keep whatever pandas makes of the values
+    spec = SPECS[name]
+    return {column: PANDAS_TYPES[sql_type]
+            for column, (_, sql_type) in {**spec.get("meta", {}), **spec["columns"]}.items() if sql_type}
+
+
+def dtypes(frame, name):
+    return frame.dtypes[list(declared_dtypes(name))].to_dict()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_specs_match_the_per_row_loops(cases, engine):
+    for case, (page_list, legacy) in cases.items():
+        name = case.split(",")[0]
+        frame = flatten_pages(case, page_list, engine)
+        assert list(frame.columns) == columns(name)
+        assert dtypes(frame, name) == declared_dtypes(name), case
+        expected = pd.concat([legacy(page) for page in page_list], ignore_index=True)
+        assert same(expected[frame.columns], frame), case
+
+
+@pytest.mark.skipif(pa is None, reason="needs pyarrow")
+def test_engines_give_the_same_frame(cases):
+    for case, (page_list, _) in cases.items():
+        pd.testing.assert_frame_equal(flatten_pages(case, page_list, "python"),
+                                      flatten_pages(case, page_list, "arrow"))
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_nulls_keep_int_columns_ints(engine):
+    entries = [{"fixture": {"id": 1, "status": {"short": "NS"}}, "goals": {"home": None, "away": None}},
+               {"fixture": {"id": 2, "status": {"short": "FT"}}, "goals": {"home": 2, "away": 0}}]
+    frame = to_frame("fixture_dim", entries, engine=engine)
+    assert frame["HomeGoals"].dtype == "Int64"
+    assert frame["HomeGoals"].isna().tolist() == [True, False]
+    assert frame.loc[1, "HomeGoals"] == 2
+    assert frame.to_csv(index=False).splitlines()[2].endswith(",2,0")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_mistyped_page_still_typed(engine):
+    # An id sent as a string does not fit the Arrow struct; the python engine parses it
+    entries = [{"team": {"id": "12", "name": "A", "national": False}}, {"team": {"id": 13, "name": "B"}}]
+    frame = to_frame("team_dim", entries, engine=engine)
+    assert frame["TeamID"].tolist() == [12, 13]
+    assert dtypes(frame, "team_dim") == declared_dtypes("team_dim")
+
+
+def test_empty_page_typed():
+    for name in SPECS:
+        assert dtypes(to_frame(name, []), name) == declared_dtypes(name)
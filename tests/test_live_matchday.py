@@ -0,0 +1,24 @@
+import live_matchday
+from api_client import ApiClient
+from response_cache import ResponseCache
+
+
+def client_for(stub, tmp_path):
+    return ApiClient(api_key="test", base_url=stub.base_url, requests_per_minute=1_000_000,
+                     cache=ResponseCache(str(tmp_path / "cache.sqlite")))
+
+
+def test_poll_is_never_answered_from_the_cache(stub, tmp_path):
+    data = stub.data
+    fixture_id = int(data.fixture_rows.index[0])
+    data.fixture_rows.loc[fixture_id, "Status"] = "1H"
+    with client_for(stub, tmp_path) as client:
+        assert live_matchday.poll(client, [fixture_id])[0]["fixture"]["status"]["short"] == "1H"
+        data.fixture_rows.loc[fixture_id, "Status"] = "2H"
+        assert live_matchday.poll(client, [fixture_id])[0]["fixture"]["status"]["short"] == "2H"
+
+
+def test_games_in_play_over_midnight_stay_tracked():
+    tracked = {1: ("2H", 100), 2: ("FT", 100), 3: ("NS", 100), 4: ("HT", 100)}
+    discovered = {4: ("2H", 100), 5: ("NS", 200)}
+    assert live_matchday.merge_tracked(tracked, discovered) == {1: ("2H", 100), 4: ("2H", 100), 5: ("NS", 200)}
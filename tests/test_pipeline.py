@@ -0,0 +1,110 @@
+import os
+import sys
+
+import pytest
+
+import run_pipeline
+
+# Stands in for a fetcher: counts its runs and stages the same league_dim every time
+FETCHER = """import os
+with open(os.path.join(os.environ["OUTPUT_DIR"], "runs.txt"), "a") as f:
+    f.write("run\\n")
+with open(os.path.join(os.environ["OUTPUT_DIR"], "league_dim.csv"), "w") as f:
+    f.write("LeagueID,Name\\n1,Liga\\n")
+"""
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    (data / "_logs").mkdir(parents=True)
+    (tmp_path / "fetch.py").write_text(FETCHER)
+    monkeypatch.setattr(run_pipeline, "SCRIPTS_DIR", str(tmp_path))
+    monkeypatch.setattr(run_pipeline, "DATA_DIR", str(data))
+    monkeypatch.setattr(run_pipeline, "STATE_FILE", str(data / "_pipeline_state.json"))
+    monkeypatch.setattr(run_pipeline, "RUNS_FILE", str(data / "_pipeline_runs.csv"))
+    monkeypatch.setattr(run_pipeline, "LOG_DIR", str(data / "_logs"))
+    monkeypatch.setenv("OUTPUT_DIR", str(data))
+    return data
+
+
+def fetch_stage(max_age=3600):
+    return {"name": "leagues", "script": "fetch.py", "deps": [], "inputs": [], "outputs": ["league_dim"],
+            "max_age": max_age}
+
+
+def runs(data):
+    return (data / "runs.txt").read_text().count("run")
+
+
+def test_stage_without_inputs_skipped_while_outputs_unchanged(pipeline):
+    stage = fetch_stage()
+    env = dict(os.environ, OUTPUT_DIR=str(pipeline))
+    assert run_pipeline.run_stage(stage, env, force=False)["status"] == "ok"
+    assert run_pipeline.run_stage(stage, env, force=False)["status"] == "skipped"
+    assert runs(pipeline) == 1
+
+    # Someone else rewrote the output: the stage's last run no longer describes it
+    (pipeline / "league_dim.csv").write_text("LeagueID,Name\n2,Cup\n")
+    assert run_pipeline.run_stage(stage, env, force=False)["status"] == "ok"
+    assert run_pipeline.run_stage(stage, env, force=True)["status"] == "ok"
+    assert runs(pipeline) == 3
+
+
+def test_stage_without_inputs_reruns_once_stale(pipeline):
+    stage = fetch_stage(max_age=0)
+    env = dict(os.environ, OUTPUT_DIR=str(pipeline))
+    run_pipeline.run_stage(stage, env, force=False)
+    assert run_pipeline.run_stage(stage, env, force=False)["status"] == "ok"
+    assert runs(pipeline) == 2
+
+
+def test_old_state_file_still_read(pipeline):
+    stage = fetch_stage()
+    env = dict(os.environ, OUTPUT_DIR=str(pipeline))
+    run_pipeline.run_stage(stage, env, force=False)
+    run_pipeline.save_state("leagues", run_pipeline.fingerprint(stage))
+    # No finished_at: treated as stale, so the stage runs and records it
+    assert run_pipeline.run_stage(stage, env, force=False)["status"] == "ok"
+    assert "finished_at" in run_pipeline.last_success("leagues")
+
+
+def selected_stages(monkeypatch, *argv):
+    selected = []
+    monkeypatch.setattr(sys, "argv", ["run_pipeline.py", *argv])
+    monkeypatch.setattr(run_pipeline, "run_pipeline",
+                        lambda stages, jobs, force: selected.extend(stage["name"] for stage in stages) or {})
+    run_pipeline.main()
+    return set(selected)
+
+
+def test_publish_and_export_are_opt_in(pipeline, monkeypatch):
+    monkeypatch.delenv("PIPELINE_WITH", raising=False)
+    assert not selected_stages(monkeypatch) & {"publish", "export"}
+    assert "build" in selected_stages(monkeypatch)
+    assert selected_stages(monkeypatch, "--with", "export") & {"publish", "export"} == {"export"}
+    assert selected_stages(monkeypatch, "--only", "publish") == {"publish"}
+    with pytest.raises(SystemExit):
+        selected_stages(monkeypatch, "--with", "tweet")
+
+
+def test_changed_settings_rerun_the_stage(pipeline, monkeypatch):
+    stage = dict(fetch_stage(), env=["FIXTURE_SEASONS"])
+    env = dict(os.environ, OUTPUT_DIR=str(pipeline))
+    monkeypatch.setenv("FIXTURE_SEASONS", "2025")
+    run_pipeline.run_stage(stage, env, force=False)
+    assert run_pipeline.run_stage(stage, env, force=False)["status"] == "skipped"
+
+    monkeypatch.setenv("FIXTURE_SEASONS", "2024,2025")
+    assert run_pipeline.run_stage(stage, env, force=False)["status"] == "ok"
+    monkeypatch.setenv("STAGING_FORMAT", "parquet")
+    assert run_pipeline.run_stage(stage, env, force=False)["status"] == "ok"
+    assert runs(pipeline) == 3
+
+
+def test_every_stage_setting_is_read_by_its_script():
+    for stage in run_pipeline.STAGES:
+        with open(os.path.join(run_pipeline.SCRIPTS_DIR, stage["script"])) as f:
+            source = f.read()
+        for name in stage.get("env", []):
+            assert f'"{name}"' in source, f"{stage['name']}: {name}"
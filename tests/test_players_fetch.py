@@ -0,0 +1,36 @@
+import pandas as pd
+
+from bench_pipeline import stage_env
+from conftest import run_script
+from staging import read_table, table_path
+from stub_api import SEASON
+
+
+def test_pages_merge_in_chunks(tmp_path, stub):
+    data = stub.data
+    env = dict(stage_env(str(tmp_path), stub, len(data.leagues)), MERGE_CHUNK_ROWS="7")
+    output = table_path(env["OUTPUT_DIR"], "player_dim")
+    players = pd.concat(data.players.values())
+
+    # A stale row for a player the API still lists, and one it no longer does
+    stale = pd.DataFrame({"PlayerID": [int(players["PlayerID"].iloc[0]), 999_999], "PlayerName": ["Old", "Gone"]})
+    (tmp_path / "data").mkdir()
+    stale.to_csv(output, index=False)
+
+    run_script("fetch_players_2.py", env, tmp_path)
+    merged = read_table(output)
+    assert merged["PlayerID"].is_unique
+    assert set(merged["PlayerID"]) == set(players["PlayerID"]) | {999_999}
+    names = merged.set_index("PlayerID")["PlayerName"]
+    assert names[int(players["PlayerID"].iloc[0])] == players["PlayerName"].iloc[0]
+
+
+def test_newest_season_sets_the_team(tmp_path, stub):
+    # Listed newest first, so the older season's pages are fetched and written last
+    data = stub.data
+    env = dict(stage_env(str(tmp_path), stub, len(data.leagues)), PLAYER_SEASONS=f"{SEASON},{SEASON - 1}")
+    run_script("fetch_players_2.py", env, tmp_path)
+    merged = read_table(table_path(env["OUTPUT_DIR"], "player_dim")).set_index("PlayerID")
+    players = pd.concat(data.players.values()).set_index("PlayerID")
+    assert (merged.loc[players.index, "TeamID"] == players["TeamID"]).all()
+    assert not list((tmp_path / "data").glob("_player_dim.partial*"))
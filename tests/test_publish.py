@@ -0,0 +1,96 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+from conftest import SCRIPTS, run_script
+from staging import path_digest
+from test_build import build
+
+
+@pytest.fixture
+def publish_env(staged, tmp_path):
+    remote = tmp_path / "remote.git"
+    subprocess.run(["git", "init", "--bare", "-q", "-b", "main", str(remote)], check=True)
+    db_path = tmp_path / "football_data.sqlite"
+    build(staged, db_path).close()
+    # No global or system git config, so no identity: like a fresh CI runner
+    env = {name: value for name, value in os.environ.items() if not name.startswith("GIT_")}
+    return dict(env, GITHUB_REPO=str(remote), REPO_PATH=str(tmp_path / "work"), DB_FILE=str(db_path),
+                HOME=str(tmp_path), GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1")
+
+
+def published_files(env):
+    result = subprocess.run(["git", "--git-dir", env["GITHUB_REPO"], "ls-tree", "-r", "--name-only", "main"],
+                            capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+def commit_count(env):
+    result = subprocess.run(["git", "--git-dir", env["GITHUB_REPO"], "rev-list", "--count", "main"],
+                            capture_output=True, text=True, check=True)
+    return int(result.stdout)
+
+
+def test_default_publishes_the_snapshot_only(publish_env, tmp_path):
+    run_script("github_push_db.py", publish_env, tmp_path)
+    files = published_files(publish_env)
+    assert "football_data.sqlite" not in files
+    assert "snapshot/manifest.json" in files
+
+
+@pytest.mark.parametrize("mode", ["snapshot", "both"])
+def test_rebuild_without_changes_publishes_nothing(publish_env, tmp_path, staged, mode):
+    env = dict(publish_env, PUBLISH_MODE=mode)
+    run_script("github_push_db.py", env, tmp_path)
+    # Rebuilding rewrites the .sqlite bytes (views, ANALYZE) but not its content
+    before = path_digest(env["DB_FILE"])
+    conn = build(staged, env["DB_FILE"])
+    conn.execute("ANALYZE;")
+    conn.commit()
+    conn.close()
+    assert path_digest(env["DB_FILE"]) != before
+    out = run_script("github_push_db.py", env, tmp_path)
+    assert "unchanged since the last publish" in out
+    assert commit_count(env) == 1
+
+
+def test_published_snapshot_rebuilds_the_database(publish_env, tmp_path):
+    run_script("github_push_db.py", publish_env, tmp_path)
+    clone = tmp_path / "clone"
+    subprocess.run(["git", "clone", "-q", publish_env["GITHUB_REPO"], str(clone)], check=True)
+    rebuilt = tmp_path / "rebuilt.sqlite"
+    subprocess.run([sys.executable, os.path.join(SCRIPTS, "db_snapshot.py"), str(clone / "snapshot"), str(rebuilt)],
+                   check=True, capture_output=True)
+    original = sqlite3.connect(publish_env["DB_FILE"])
+    copy = sqlite3.connect(rebuilt)
+    for table in ("fixture_dim", "statistics_fact", "team_season_agg"):
+        query = f'SELECT * FROM "{table}" ORDER BY 1, 2, 3;'
+        assert copy.execute(query).fetchall() == original.execute(query).fetchall()
+    original.close()
+    copy.close()
+
+
+def test_snapshot_mode_removes_a_stale_database(publish_env, tmp_path, staged):
+    run_script("github_push_db.py", dict(publish_env, PUBLISH_MODE="binary"), tmp_path)
+    assert published_files(publish_env) == {"football_data.sqlite"}
+
+    # A changed database published as a snapshot only
+    conn = build(staged, publish_env["DB_FILE"])
+    conn.execute("DELETE FROM fixture_dim WHERE FixtureID IN (SELECT FixtureID FROM fixture_dim LIMIT 1);")
+    conn.commit()
+    conn.close()
+    run_script("github_push_db.py", dict(publish_env, PUBLISH_MODE="snapshot"), tmp_path)
+    files = published_files(publish_env)
+    assert "football_data.sqlite" not in files
+    assert "snapshot/manifest.json" in files
+
+
+def test_commits_carry_the_configured_identity(publish_env, tmp_path):
+    run_script("github_push_db.py", dict(publish_env, GIT_USER_NAME="Publisher", GIT_USER_EMAIL="pub@example.com"),
+               tmp_path)
+    result = subprocess.run(["git", "--git-dir", publish_env["GITHUB_REPO"], "log", "-1", "--format=%an <%ae>", "main"],
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "Publisher <pub@example.com>"
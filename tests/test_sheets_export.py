@@ -0,0 +1,152 @@
+import http.server
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+import export_to_google_sheets as exporter
+from export_to_google_sheets import changed_blocks, read_tables, to_values
+from db_snapshot import dump_snapshot
+from fake_sheets import FakeSpreadsheet
+from test_build import build
+
+HEADER = ["FixtureID", "Status"]
+OLD = [HEADER, ["1", "FT"], ["2", "NS"], ["3", "NS"], ["4", "NS"]]
+
+
+def written_rows(blocks):
+    return {start + offset: row for start, rows in blocks for offset, row in enumerate(rows)}
+
+
+def test_unchanged_writes_nothing():
+    layout, blocks = changed_blocks(OLD, [row[:] for row in OLD], [0])
+    assert layout == OLD
+    assert blocks == []
+
+
+def test_changed_row_is_written_in_place():
+    new = [HEADER, ["1", "FT"], ["2", "FT"], ["3", "NS"], ["4", "NS"]]
+    layout, blocks = changed_blocks(OLD, new, [0])
+    assert written_rows(blocks) == {2: ["2", "FT"]}
+    assert layout == new
+
+
+def test_inserted_row_does_not_shift_the_others():
+    # Key 0 sorts first but goes after the last row instead of moving every row down
+    new = [HEADER, ["0", "NS"], ["1", "FT"], ["2", "NS"], ["3", "NS"], ["4", "NS"]]
+    layout, blocks = changed_blocks(OLD, new, [0])
+    assert written_rows(blocks) == {5: ["0", "NS"]}
+    assert layout == OLD + [["0", "NS"]]
+
+
+def test_deleted_row_is_blanked():
+    new = [HEADER, ["1", "FT"], ["3", "NS"], ["4", "NS"]]
+    layout, blocks = changed_blocks(OLD, new, [0])
+    assert written_rows(blocks) == {2: ["", ""]}
+    assert layout == [HEADER, ["1", "FT"], ["", ""], ["3", "NS"], ["4", "NS"]]
+
+
+def test_inserted_row_takes_a_deleted_row():
+    new = [HEADER, ["1", "FT"], ["3", "NS"], ["4", "NS"], ["5", "NS"]]
+    layout, blocks = changed_blocks(OLD, new, [0])
+    assert written_rows(blocks) == {2: ["5", "NS"]}
+
+
+def test_deleted_last_rows_are_blanked_and_dropped_from_the_layout():
+    new = [HEADER, ["1", "FT"], ["2", "NS"]]
+    layout, blocks = changed_blocks(OLD, new, [0])
+    assert written_rows(blocks) == {3: ["", ""], 4: ["", ""]}
+    assert layout == new
+
+
+def test_blank_sheet_is_written_in_full():
+    layout, blocks = changed_blocks([], OLD, [0])
+    assert layout == OLD
+    assert blocks == [(0, OLD)]
+
+
+def test_read_tables_orders_by_key():
+    conn = sqlite3.connect(":memory:")
+    conn.execute('CREATE TABLE fixture_dim ("FixtureID" INTEGER, "Status" TEXT);')
+    conn.executemany("INSERT INTO fixture_dim VALUES (?, ?);", [(3, "NS"), (1, "FT"), (2, "NS")])
+    assert read_tables(conn)["fixture_dim"]["FixtureID"].tolist() == [1, 2, 3]
+    conn.close()
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, "SNAPSHOT_DIR", str(tmp_path / "snapshot"))
+
+
+def sheet_rows(spreadsheet, name):
+    return sorted(tuple(row) for row in spreadsheet.worksheet(name).get_all_values()[1:] if any(row))
+
+
+def test_delta_export_writes_only_changed_keys(snapshot_dir):
+    spreadsheet = FakeSpreadsheet()
+    fixtures = pd.DataFrame({"FixtureID": range(1, 101), "Status": "NS"})
+    exporter.export(spreadsheet, {"fixture_dim": fixtures})
+
+    # One fixture finishes, one is removed and one is added in front of the others
+    refreshed = pd.concat([pd.DataFrame({"FixtureID": [0], "Status": ["NS"]}), fixtures[fixtures["FixtureID"] != 50]])
+    refreshed.loc[refreshed["FixtureID"] == 10, "Status"] = "FT"
+    cells_before = spreadsheet.cells_written
+    exporter.export(spreadsheet, {"fixture_dim": refreshed})
+    assert spreadsheet.cells_written - cells_before == 2 * 2
+    assert sheet_rows(spreadsheet, "fixture_dim") == sorted(map(tuple, to_values(refreshed)[1:]))
+
+    # The snapshot matches the sheet: exporting the same table again writes nothing
+    cells_before = spreadsheet.cells_written
+    exporter.export(spreadsheet, {"fixture_dim": refreshed})
+    assert spreadsheet.cells_written == cells_before
+
+
+@pytest.fixture
+def snapshot_server(tmp_path):
+    # Serves a published snapshot folder over HTTP, counting the files requested
+    folder = tmp_path / "published"
+    requested = []
+
+    class Handler(http.server.SimpleHTTPRequestHandler):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, directory=str(folder), **kwargs)
+
+        def log_message(self, *args):
+            requested.append(self.path)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield folder, f"http://127.0.0.1:{server.server_port}", requested
+    server.shutdown()
+    server.server_close()
+
+
+def test_remote_fallback_rebuilds_the_published_snapshot(staged, tmp_path, snapshot_dir, snapshot_server, monkeypatch):
+    folder, url, requested = snapshot_server
+    db_path = tmp_path / "football_data.sqlite"
+    build(staged, db_path).close()
+    dump_snapshot(str(db_path), str(folder))
+    monkeypatch.setattr(exporter, "SNAPSHOT_URL", url)
+    monkeypatch.setattr(exporter, "SQLITE_URL", None)
+    monkeypatch.setattr(exporter, "SQLITE_SOURCE", "remote")
+
+    state = {}
+    path, _ = exporter.locate_db(state)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT COUNT(*) FROM fixture_dim;").fetchone()[0] > 0
+    conn.close()
+
+    # One table changes: only it is downloaded again
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM league_dim WHERE LeagueID IN (SELECT LeagueID FROM league_dim LIMIT 1);")
+    conn.commit()
+    conn.close()
+    dump_snapshot(str(db_path), str(folder))
+    requested.clear()
+    exporter.locate_db(state)
+    assert sorted(path for path in requested if path.endswith(".csv")) == ["/league_dim.csv"]
+
+    requested.clear()
+    exporter.locate_db(state)
+    assert requested == ["/manifest.json"]
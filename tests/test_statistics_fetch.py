@@ -0,0 +1,124 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from bench_pipeline import stage_env
+from conftest import SCRIPTS, run_script
+from response_cache import ResponseCache
+from staging import read_table, table_path
+
+
+@pytest.fixture
+def env(tmp_path, stub):
+    data = stub.data
+    folder = tmp_path / "data"
+    folder.mkdir()
+    data.fixture_rows.reset_index(drop=True).to_csv(table_path(str(folder), "fixture_dim"), index=False)
+    return dict(stage_env(str(tmp_path), stub, len(data.leagues)),
+                API_CACHE="1", API_CACHE_PATH=str(tmp_path / "cache.sqlite"))
+
+
+def fact(env):
+    return read_table(table_path(env["OUTPUT_DIR"], "statistics_fact"))
+
+
+def test_cache_key_includes_base_url():
+    assert ResponseCache.make_key("fixtures", {"ids": "1"}, "http://localhost:1/v3") != \
+        ResponseCache.make_key("fixtures", {"ids": "1"}, "https://api-football-v1.p.rapidapi.com/v3")
+
+
+@pytest.mark.parametrize("mode", ["batched", "single"])
+def test_changed_fixture_is_refetched(env, stub, tmp_path, mode):
+    env["STATS_MODE"] = mode
+    run_script("fetch_multiple_statistics.py", env, tmp_path)
+    fixture_id = int(fact(env)["FixtureID"].iloc[0])
+
+    # The fixture is re-timed and its statistics corrected upstream
+    data = stub.data
+    stats = data.statistics[fixture_id]
+    data.statistics[fixture_id] = stats.assign(**{col: 99 for col in data.stat_columns if col.startswith("Total")})
+    data.fixture_rows.loc[fixture_id, "Timestamp"] += 3600
+    fixtures = pd.read_csv(env["FIXTURE_FILE"])
+    fixtures.loc[fixtures["FixtureID"] == fixture_id, "Timestamp"] += 3600
+    fixtures.to_csv(env["FIXTURE_FILE"], index=False)
+
+    requests_before = sum(stub.requests.values())
+    run_script("fetch_multiple_statistics.py", env, tmp_path)
+    assert sum(stub.requests.values()) - requests_before == 1
+    values = fact(env)
+    assert (values.loc[values["FixtureID"] == fixture_id, "Value"] == 99).any()
+
+
+def test_batch_without_statistics_falls_back(env, stub, tmp_path, monkeypatch):
+    # The batch answer leaves every statistics block empty
+    data = stub.data
+    batch_payload = data.fixtures_by_ids_payload
+    monkeypatch.setattr(data, "fixtures_by_ids_payload",
+                        lambda params: [dict(entry, statistics=[]) for entry in batch_payload(params)])
+    out = run_script("fetch_multiple_statistics.py", env, tmp_path)
+    assert "falling back to /fixtures/statistics" in out
+    assert set(fact(env)["FixtureID"]) == set(data.statistics) & set(
+        data.fixture_rows.loc[data.fixture_rows["Status"] == "FT", "FixtureID"])
+    assert stub.requests["fixtures/statistics"] > 0
+
+
+def test_batch_size_must_be_positive(env, tmp_path):
+    result = subprocess.run([sys.executable, os.path.join(SCRIPTS, "fetch_multiple_statistics.py")],
+                            env=dict(env, STATS_BATCH_SIZE="0"), cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode != 0
+    assert "STATS_BATCH_SIZE" in result.stderr
+
+
+def test_fixture_without_kickoff_time_is_not_refetched(env, stub, tmp_path):
+    fixtures = pd.read_csv(env["FIXTURE_FILE"])
+    fixtures["Timestamp"] = fixtures["Timestamp"].astype("float64")
+    fixtures.loc[fixtures["Status"] == "FT", "Timestamp"] = float("nan")
+    fixtures.to_csv(env["FIXTURE_FILE"], index=False)
+    run_script("fetch_multiple_statistics.py", env, tmp_path)
+
+    requests_before = sum(stub.requests.values())
+    out = run_script("fetch_multiple_statistics.py", env, tmp_path)
+    assert "already up to date" in out
+    assert sum(stub.requests.values()) == requests_before
+
+
+@pytest.mark.parametrize("mode", ["batched", "single"])
+def test_missing_statistics_are_retried_after_kick_off(env, stub, tmp_path, monkeypatch, mode):
+    # Fetched right after full time, before the API has published the statistics
+    data = stub.data
+    statistics = data.statistics
+    monkeypatch.setattr(data, "statistics", {})
+    env = dict(env, STATS_MODE=mode, STATS_RETRY_HOURS=str(10 ** 9))
+    out = run_script("fetch_multiple_statistics.py", env, tmp_path)
+    assert "No statistics returned" in out
+    assert os.path.exists(os.path.join(env["OUTPUT_DIR"], "_statistics_fetch_state.csv"))
+
+    # Published since: the next run asks again, past the cached empty answers
+    monkeypatch.setattr(data, "statistics", statistics)
+    run_script("fetch_multiple_statistics.py", env, tmp_path)
+    finished = data.fixture_rows.loc[list(statistics), "Status"].isin(["FT", "AET", "PEN"])
+    assert set(fact(env)["FixtureID"]) == set(finished[finished].index)
+
+
+def test_missing_statistics_are_given_up_after_the_window(env, stub, tmp_path, monkeypatch):
+    data = stub.data
+    monkeypatch.setattr(data, "statistics", {})
+    # Every fixture kicked off more than STATS_RETRY_HOURS ago
+    fixtures = data.fixture_rows.reset_index(drop=True)
+    fixtures.assign(Timestamp=fixtures["Timestamp"] - 10 ** 9).to_csv(env["FIXTURE_FILE"], index=False)
+    run_script("fetch_multiple_statistics.py", env, tmp_path)
+
+    requests_before = sum(stub.requests.values())
+    run_script("fetch_multiple_statistics.py", env, tmp_path)
+    assert sum(stub.requests.values()) == requests_before
+
+
+def test_error_answers_are_not_cached(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"))
+    cache.put("leagues", {"season": 2025}, {"errors": {"token": "Error/Missing application key"}, "response": []})
+    assert cache.get("leagues", {"season": 2025}) is None
+    cache.put("leagues", {"season": 2025}, {"errors": [], "response": [{"league": {"id": 1}}]})
+    assert cache.get("leagues", {"season": 2025}) is not None
@@ -0,0 +1,49 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from conftest import SCRIPTS
+from statistics_model import WIDE_COLUMNS, wide_columns
+from test_build import build
+
+
+def test_wide_view_keeps_every_committed_column(staged, tmp_path):
+    # Migrating the committed statistics_dim.csv gives back all of its columns,
+    # all-null ones (expected_goals, goals_prevented) included
+    committed = pd.read_csv(f"{SCRIPTS}/statistics_dim.csv")
+    conn = build(staged, tmp_path / "football_data.sqlite")
+    view = pd.read_sql_query('SELECT * FROM "statistics_dim";', conn)
+    conn.close()
+    assert list(view.columns) == list(committed.columns)
+    # The CSV repeats some rows; the view has one per fixture and team
+    assert len(view) == len(committed[["FixtureID", "TeamID"]].drop_duplicates())
+
+
+def test_known_columns_without_stat_types_are_null():
+    assert wide_columns([]) == {column: None for column in WIDE_COLUMNS}
+
+
+def test_column_collisions_are_suffixed():
+    columns = wide_columns([(1, "Fouls"), (2, "fouls"), (3, "TeamID"), (4, "New_Stat"), (5, "new_stat")])
+    assert columns["Fouls"] == 1
+    assert columns["fouls_2"] == 2
+    assert columns["TeamID_3"] == 3
+    assert columns["New_Stat"] == 4
+    assert columns["new_stat_5"] == 5
+
+
+def test_unresolvable_collision_fails():
+    with pytest.raises(ValueError):
+        wide_columns([(1, "Extra"), (2, "Extra_3"), (3, "Extra")])
+
+
+def test_view_builds_with_colliding_names():
+    from statistics_model import wide_view_sql
+
+    conn = sqlite3.connect(":memory:")
+    conn.execute('CREATE TABLE statistics_fact ("FixtureID" INTEGER, "TeamID" INTEGER, "StatTypeID" INTEGER, "Value" REAL);')
+    conn.execute(wide_view_sql([(1, "Fouls"), (2, "FOULS"), (3, "fixtureid")]))
+    names = [row[1] for row in conn.execute('PRAGMA table_info("statistics_dim");')]
+    assert len(names) == len({name.casefold() for name in names}) == len(WIDE_COLUMNS) + 4
+    conn.close()